@@ -1,59 +1,148 @@
-from typing import Dict, Any, Callable, List
+import operator
+from types import MappingProxyType
+from typing import Dict, Any, Callable, List, Mapping, Optional, Tuple, Union
+import numpy as np
+from catalog_index import set_diff
+
+LOGIC_BLOCKS: Dict[str, Callable[..., Any]] = {}
+# Read-only view handed to agents, so a caller cannot replace or drop a block for every other user of the registry.
+LOGIC_IMPL: Mapping[str, Callable[..., Any]] = MappingProxyType(LOGIC_BLOCKS)
+BLOCK_INPUTS: Dict[str, Tuple[str, ...]] = {}
+PAIRWISE_BLOCKS: set = set()
+BATCH_IMPLS: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+ProductTable = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+
+COMPARISON_KEYS = (
+    "product_name",
+    "concentration",
+    "skin_type",
+    "key_ingredients",
+    "benefits",
+    "how_to_use",
+    "side_effects",
+    "price_inr",
+)
+
+
+def logic_block(block_id: str, inputs: Tuple[str, ...], pairwise: bool = False) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Registers a pure block under block_id, declaring the product fields it reads."""
+
+    def register(fn: Callable[..., Any]) -> Callable[..., Any]:
+        LOGIC_BLOCKS[block_id] = fn
+        BLOCK_INPUTS[block_id] = tuple(inputs)
+        if pairwise:
+            PAIRWISE_BLOCKS.add(block_id)
+        return fn
+
+    return register
+
+
+def batch_impl(block_id: str) -> Callable[[Callable[..., Dict[str, Any]]], Callable[..., Dict[str, Any]]]:
+    """Registers a columnar implementation used by run_batch instead of looping over rows."""
+
+    def register(fn: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        BATCH_IMPLS[block_id] = fn
+        return fn
+
+    return register
+
+
+def to_columns(products: ProductTable, fields: Tuple[str, ...]) -> Dict[str, List[Any]]:
+    if isinstance(products, dict):
+        return {f: list(products[f]) for f in fields}
+    return {f: [p[f] for p in products] for f in fields}
+
+
+def to_rows(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+
+@logic_block("extract_benefits", inputs=("benefits",))
+def extract_benefits(product):
+    return {"benefits": list(product["benefits"])}
+
+
+@logic_block("usage_instructions", inputs=("how_to_use",))
+def usage_instructions(product):
+    return {"how_to_use": product["how_to_use"]}
+
+
+@logic_block("safety_notes", inputs=("side_effects",))
+def safety_notes(product):
+    return {"side_effects": product["side_effects"]}
+
+
+@logic_block("ingredient_summary", inputs=("key_ingredients",))
+def ingredient_summary(product):
+    return {"ingredients": list(product["key_ingredients"])}
+
+
+@logic_block("price_context", inputs=("price_inr",))
+def price_context(product):
+    return {"price_inr": int(product["price_inr"])}
+
+
+@logic_block("comparison_logic", inputs=COMPARISON_KEYS, pairwise=True)
+def comparison_logic(a, b):
+    diff = {}
+    for k in COMPARISON_KEYS:
+        diff[k] = {"A": a[k], "B": b[k], "equal": a[k] == b[k]}
+    return {"comparison": diff}
+
+
+@logic_block("attribute_diff", inputs=("key_ingredients", "skin_type", "benefits", "price_inr"), pairwise=True)
+def attribute_diff(a, b):
+    return {"diff": set_diff(a, b)}
+
+
+@batch_impl("price_context")
+def price_context_batch(columns: Dict[str, List[Any]]) -> Dict[str, Any]:
+    return {"price_inr": np.asarray(columns["price_inr"]).astype(np.int64)}
+
+
+@batch_impl("comparison_logic")
+def comparison_logic_batch(a: Dict[str, List[Any]], b: Dict[str, List[Any]]) -> Dict[str, Any]:
+    diff = {}
+    for k in COMPARISON_KEYS:
+        equal = np.fromiter(map(operator.eq, a[k], b[k]), dtype=bool, count=len(a[k]))
+        diff[k] = {"A": a[k], "B": b[k], "equal": equal}
+    return {"comparison": diff}
 
 
 class ContentLogicBlockAgent:
     """Creates reusable atomic logic blocks used by templates/pages."""
 
+    BLOCK_INPUTS = BLOCK_INPUTS
+
     def run(self) -> Dict[str, Any]:
-        registry: Dict[str, Callable[..., Any]] = {}
-
-        def extract_benefits(product):
-            return {"benefits": list(product["benefits"])}
-
-        def usage_instructions(product):
-            return {"how_to_use": product["how_to_use"]}
-
-        def safety_notes(product):
-            return {"side_effects": product["side_effects"]}
-
-        def ingredient_summary(product):
-            return {"ingredients": list(product["key_ingredients"])}
-
-        def price_context(product):
-            return {"price_inr": int(product["price_inr"])}
-
-        def comparison_logic(a, b):
-            diff = {}
-            keys = [
-                "product_name",
-                "concentration",
-                "skin_type",
-                "key_ingredients",
-                "benefits",
-                "how_to_use",
-                "side_effects",
-                "price_inr",
-            ]
-            for k in keys:
-                diff[k] = {"A": a[k], "B": b[k], "equal": a[k] == b[k]}
-            return {"comparison": diff}
-
-        registry["extract_benefits"] = extract_benefits
-        registry["usage_instructions"] = usage_instructions
-        registry["safety_notes"] = safety_notes
-        registry["ingredient_summary"] = ingredient_summary
-        registry["price_context"] = price_context
-        registry["comparison_logic"] = comparison_logic
-
-        
         return {
-            "blocks": list(registry.keys()),
-            "impl": registry,
+            "blocks": list(LOGIC_BLOCKS.keys()),
+            "impl": LOGIC_IMPL,
         }
 
     def block_ids(self) -> List[str]:
-        data = self.run()
-        return data["blocks"]
+        return list(LOGIC_BLOCKS.keys())
+
+    def get_impl(self) -> Mapping[str, Callable[..., Any]]:
+        return LOGIC_IMPL
 
-    def get_impl(self) -> Dict[str, Callable[..., Any]]:
-        return self.run()["impl"]
+    def run_batch(self, block_id: str, products: ProductTable, others: Optional[ProductTable] = None) -> Dict[str, Any]:
+        """Applies a block to a list of products or a columnar table and returns columnar output."""
+        fields = BLOCK_INPUTS[block_id]
+        columns = to_columns(products, fields)
+        if block_id in PAIRWISE_BLOCKS:
+            if others is None:
+                raise ValueError(f"Logic block {block_id} needs a second table of products")
+            other_columns = to_columns(others, fields)
+            if block_id in BATCH_IMPLS:
+                return BATCH_IMPLS[block_id](columns, other_columns)
+            rows = [LOGIC_BLOCKS[block_id](a, b) for a, b in zip(to_rows(columns), to_rows(other_columns))]
+        else:
+            if block_id in BATCH_IMPLS:
+                return BATCH_IMPLS[block_id](columns)
+            rows = [LOGIC_BLOCKS[block_id](p) for p in to_rows(columns)]
+        if not rows:
+            return {}
+        return {k: [r[k] for r in rows] for k in rows[0]}
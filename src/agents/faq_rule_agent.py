@@ -0,0 +1,93 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class FAQRuleAgent:
+    """Answers questions that map one-to-one onto product fields straight from the logic blocks."""
+
+    LIST_FIELDS = ("key_ingredients", "skin_type", "benefits")
+
+    # Phrases that name a field. A question is answered by lookup only when exactly one field matches.
+    FIELD_PATTERNS: List[Tuple[str, "re.Pattern[str]"]] = [
+        ("product_name", re.compile(r"\b(full name|name of the product|product name|called)\b")),
+        ("concentration", re.compile(r"\b(concentration|strength|percent(age)?)\b")),
+        ("skin_type", re.compile(r"\bskin types?\b")),
+        ("key_ingredients", re.compile(r"\b(ingredients?|contain|contains|include|includes)\b")),
+        ("benefits", re.compile(r"\b(benefits?|claims?)\b")),
+        ("how_to_use", re.compile(r"\b(apply|application|how (should|do) i use|when .* used?|directions|routine)\b")),
+        ("side_effects", re.compile(r"\b(side effects?|irritation|reactions?)\b")),
+        ("price_inr", re.compile(r"\b(price|cost|inr|rupees?)\b")),
+    ]
+    COUNT_RE = re.compile(r"^how many (key )?(ingredients|benefits|skin types)\b")
+    YES_NO_RE = re.compile(r"^(does|do|is|are(?! there)|can|will)\b")
+    WH_RE = re.compile(r"^(what|which|when|how|are there)\b")
+    # Negation, qualifiers and disjunction change what a lookup would answer; those questions go to the LLM.
+    HEDGE_RE = re.compile(r"\b(free of|without|not|no|never|only|unsuitable|safe to use with|or|avoid|except|instead)\b|n't\b")
+    # Units and currencies no field holds (price is in INR, concentration in percent).
+    FOREIGN_UNIT_RE = re.compile(r"\$|\b(usd|dollars?|eur|euros?|gbp|pounds?|ml|oz|ounces?|grams?|mg)\b")
+    # Words a question asking for a field itself may contain besides the field phrase, the product name and,
+    # for yes/no questions, the list value asked about. Any other word is a qualifier or a second entity.
+    FIELD_QUESTION_WORDS = frozenset(
+        "what which when how is are there does do can will should i it its this the a an of for in product list "
+        "listed stated noted any key suitable have has".split()
+    )
+
+    def __init__(self, logic_blocks: Dict[str, Any]):
+        self.logic_blocks = logic_blocks
+
+    def index(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {
+            "product_name": product["product_name"],
+            "concentration": product["concentration"],
+            "skin_type": list(product["skin_type"]),
+            "key_ingredients": self.logic_blocks["ingredient_summary"](product)["ingredients"],
+            "benefits": self.logic_blocks["extract_benefits"](product)["benefits"],
+            "how_to_use": self.logic_blocks["usage_instructions"](product)["how_to_use"],
+            "side_effects": self.logic_blocks["safety_notes"](product)["side_effects"],
+            "price_inr": self.logic_blocks["price_context"](product)["price_inr"],
+        }
+        terms: Dict[str, Tuple[str, str]] = {}
+        for field in self.LIST_FIELDS:
+            for value in fields[field]:
+                terms[str(value).lower()] = (field, str(value))
+        return {"fields": fields, "terms": terms}
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        return ", ".join(str(v) for v in value) if isinstance(value, list) else str(value)
+
+    def _unknown_words(self, q: str, product_name: str, terms: List[str] = ()) -> List[str]:
+        rest = q.replace(product_name.lower(), " ")
+        for pattern in [p for _, p in self.FIELD_PATTERNS] + [re.compile(rf"\b{re.escape(t)}\b") for t in terms]:
+            rest = pattern.sub(" ", rest)
+        return [w for w in re.findall(r"\w+", rest) if w not in self.FIELD_QUESTION_WORDS]
+
+    def answer(self, index: Dict[str, Any], question: str) -> Optional[Dict[str, str]]:
+        q = question.strip().lower()
+        fields = index["fields"]
+        if self.HEDGE_RE.search(q) or self.FOREIGN_UNIT_RE.search(q):
+            return None
+        named = [f for f, pattern in self.FIELD_PATTERNS if pattern.search(q)]
+
+        m = self.COUNT_RE.match(q)
+        if m:
+            if self._unknown_words(q[m.end():], fields["product_name"]):
+                return None
+            field = {"ingredients": "key_ingredients", "benefits": "benefits", "skin types": "skin_type"}[m.group(2)]
+            items = fields[field]
+            return {"a": f"{len(items)}: {self._text(items)}.", "source_field": field}
+
+        if self.YES_NO_RE.match(q):
+            hits = [(term, hit) for term, hit in index["terms"].items() if re.search(rf"\b{re.escape(term)}\b", q)]
+            hit_fields = {field for _, (field, _) in hits}
+            # Membership is answered only when the question names the field the value belongs to.
+            if len(hit_fields) == 1 and named == list(hit_fields):
+                if not self._unknown_words(q, fields["product_name"], [term for term, _ in hits]):
+                    field = named[0]
+                    return {"a": f"Yes. {self._text(fields[field])}.", "source_field": field}
+            return None
+
+        if self.WH_RE.match(q) and len(named) == 1 and not self._unknown_words(q, fields["product_name"]):
+            field = named[0]
+            return {"a": self._text(fields[field]), "source_field": field}
+        return None
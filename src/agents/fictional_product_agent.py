@@ -1,20 +1,90 @@
-from typing import Dict, Any
-import json
-from local_llm import LocalLLMProvider
+from typing import Dict, Any, List, Optional
+import asyncio
+from pydantic import ValidationError
+from local_llm import get_provider
+from validation_agent import validate_artifacts
+from prompts import competitor_prompt
+from config import COMPETITOR_POOL, COMPETITOR_BATCH_SIZE, COMPETITOR_RETRIES
 
 
 class FictionalProductAgent:
-    """Creates Product B following the ProductModel schema."""
+    """Creates Product B following the ProductModel schema, reusing pooled competitors when one fits."""
+
+    def __init__(self, pool: Any = None, use_pool: Optional[bool] = None, batch_size: int = COMPETITOR_BATCH_SIZE, retries: int = COMPETITOR_RETRIES):
+        if pool is None and (COMPETITOR_POOL if use_pool is None else use_pool):
+            from competitor_pool import CompetitorPool
+            pool = CompetitorPool()
+        self.pool = pool
+        self.batch_size = batch_size
+        self.retries = retries
 
     def run(self, base_schema: Dict[str, Any]) -> Dict[str, Any]:
-        llm = LocalLLMProvider()
-        prompt = (
-            "Invent a realistic competitor product following the provided ProductModel schema. "
-            "It must be comparable in category and price, have a different name, and reasonable variations "
-            "in ingredients or benefits. Return strict JSON with keys: product_name, concentration, skin_type, "
-            "key_ingredients, benefits, how_to_use, side_effects, price_inr, schema_version.\n"
-            f"Base schema: {json.dumps(base_schema, ensure_ascii=False)}"
-        )
-        text = llm.chat_json(prompt)
-        data = json.loads(text)
-        return data
+        if self.pool is None:
+            return self.generate(base_schema, 1)[0]
+        hit = self.pool.nearest(base_schema)
+        if hit is not None:
+            return hit
+        fresh = self.fill(base_schema)
+        return self.pool.nearest(base_schema) or fresh[0]
+
+    async def arun(self, base_schema: Dict[str, Any]) -> Dict[str, Any]:
+        if self.pool is None:
+            return (await self.agenerate(base_schema, 1))[0]
+        # Pool lookups and refills are short SQLite work around a rare LLM call; run them off the event loop.
+        return await asyncio.to_thread(self.run, base_schema)
+
+    def fill(self, base_schema: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generates a batch of competitors for base_schema's category and price range and stores them."""
+        competitors = self.generate(base_schema, self.batch_size)
+        self.pool.add(competitors, source=base_schema)
+        return competitors
+
+    def fill_gaps(self, products: List[Dict[str, Any]]) -> int:
+        """Tops up the pool so every product has a reusable competitor; returns the number of LLM batches run."""
+        batches = 0
+        for product in products:
+            if self.pool.nearest(product) is None:
+                self.fill(product)
+                batches += 1
+        return batches
+
+    def prompt(self, base_schema: Dict[str, Any], n: int = 1, rejected: Optional[str] = None) -> str:
+        return competitor_prompt(base_schema, n, rejected)
+
+    def _accept(self, data: Any, base_schema: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+        items = data.get("items") if n > 1 and isinstance(data, dict) else [data]
+        if not isinstance(items, list) or not items:
+            raise ValueError("expected a non-empty 'items' list")
+        competitors = []
+        for item in items[:n]:
+            if not isinstance(item, dict):
+                raise ValueError("competitor is not a JSON object")
+            item = {**item, "schema_version": item.get("schema_version") or "1.0"}
+            validate_artifacts({"product_b": item})
+            if item["product_name"] == base_schema["product_name"]:
+                raise ValueError("competitor reuses the base product name")
+            competitors.append(item)
+        return competitors
+
+    def generate(self, base_schema: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+        """Asks the LLM for n competitors, repairing near-JSON replies and re-prompting with the error on failure."""
+        llm = get_provider()
+        rejected: Optional[str] = None
+        for _ in range(self.retries + 1):
+            text = llm.chat_json(self.prompt(base_schema, n, rejected))
+            try:
+                return self._accept(llm.ensure_json(text), base_schema, n)
+            except (ValueError, ValidationError) as e:
+                rejected = str(e).splitlines()[0][:200]
+        raise ValueError(f"Competitor generation failed after {self.retries + 1} attempts: {rejected}")
+
+    async def agenerate(self, base_schema: Dict[str, Any], n: int) -> List[Dict[str, Any]]:
+        llm = get_provider()
+        rejected: Optional[str] = None
+        for _ in range(self.retries + 1):
+            text = await llm.achat_json(self.prompt(base_schema, n, rejected))
+            try:
+                return self._accept(llm.ensure_json(text), base_schema, n)
+            except (ValueError, ValidationError) as e:
+                rejected = str(e).splitlines()[0][:200]
+        raise ValueError(f"Competitor generation failed after {self.retries + 1} attempts: {rejected}")
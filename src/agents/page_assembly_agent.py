@@ -1,20 +1,38 @@
-from typing import Dict, Any, List, Tuple
-from local_llm import LocalLLMProvider
+import time
+import asyncio
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import numpy as np
+from local_llm import get_provider
+from llm_provider import LocalEmbedder
+from config import FAQ_MODE, FAQ_FAST_PATH, FAQ_GROUNDING_CHECK, SIMILARITY_MIN, FAQ_CONCURRENCY
+from observability import log_event
+from agents.faq_rule_agent import FAQRuleAgent
+from similarity_index import grounding_scores
+from prompts import select_field_prompt, answer_prompt, batched_answer_prompt
 
 
 class PageAssemblyAgent:
-    def __init__(self, logic_blocks: Dict[str, Any], templates: Dict[str, Any]):
+    CORPUS_CACHE_SIZE = 256
+
+    def __init__(
+        self,
+        logic_blocks: Dict[str, Any],
+        templates: Dict[str, Any],
+        faq_mode: str = FAQ_MODE,
+        fast_path: Optional[bool] = None,
+        faq_concurrency: int = FAQ_CONCURRENCY,
+    ):
+        if faq_mode not in ("llm", "embedding", "batched"):
+            raise ValueError(f"Unsupported FAQ mode: {faq_mode}")
         self.logic_blocks = logic_blocks["impl"]
         self.templates = templates["templates"]
+        self.faq_mode = faq_mode
+        self.faq_concurrency = max(1, faq_concurrency)
+        self.embedder = LocalEmbedder()
+        self.rules = FAQRuleAgent(self.logic_blocks) if (FAQ_FAST_PATH if fast_path is None else fast_path) else None
         self._corpus_cache: Dict[str, Tuple[List[Tuple[str, str, str]], np.ndarray]] = {}
 
-    def build_faq_page(self, product: Dict[str, Any], questions: Dict[str, Any]) -> Dict[str, Any]:
-        items = questions["items"]
-        faq_items = []
-        ing = self.logic_blocks["ingredient_summary"](product)
-        usage = self.logic_blocks["usage_instructions"](product)
-        safety = self.logic_blocks["safety_notes"](product)
-        llm = LocalLLMProvider()
+    def _faq_docs(self, product: Dict[str, Any]) -> List[Tuple[str, str, str]]:
         docs: List[Tuple[str, str, str]] = []
         docs.append(("product_name", product["product_name"], f"Product name: {product['product_name']}"))
         docs.append(("concentration", product["concentration"], f"Concentration: {product['concentration']}"))
@@ -24,29 +42,132 @@ class PageAssemblyAgent:
         docs.append(("how_to_use", product["how_to_use"], f"How to use: {product['how_to_use']}"))
         docs.append(("side_effects", product["side_effects"], f"Side effects: {product['side_effects']}"))
         docs.append(("price_inr", str(product["price_inr"]), f"Price INR: {product['price_inr']}"))
-        for q in items:
-            qt = q["question"]
-            selection_prompt = (
-                "Choose the most relevant field to answer the question from the provided list. "
-                "Return JSON with keys 'field' and 'answer'. Use only provided values.\n"
-                f"Fields: {json.dumps([{f:v} for f, v, _ in docs], ensure_ascii=False)}\n"
-                f"Question: {qt}"
-            )
-            text = llm.chat_json(selection_prompt)
-            data = llm.ensure_json(text)
-            field = data.get("field", docs[0][0])
-            value = data.get("answer", "")
-            answer_prompt = (
-                "Answer the user's question using only the provided field and value. "
-                "Keep the answer concise and grounded. If a yes/no is implied, answer directly. "
-                "Do not invent facts.\n"
-                f"Question: {qt}\n"
-                f"Field: {field}\n"
-                f"Value: {value}\n"
-            )
-            ans = llm.chat_json(answer_prompt).strip()
-            faq_items.append({"q": qt, "a": ans, "category": q["category"], "source_field": field})
+        return docs
+
+    def _select_field_llm(self, llm: Any, product: Dict[str, Any], docs: List[Tuple[str, str, str]], question: str) -> Tuple[str, str]:
+        data = llm.ensure_json(llm.chat_json(select_field_prompt(product, question)))
+        return data.get("field", docs[0][0]), data.get("answer", "")
+
+    async def _aselect_field_llm(self, llm: Any, product: Dict[str, Any], docs: List[Tuple[str, str, str]], question: str) -> Tuple[str, str]:
+        data = llm.ensure_json(await llm.achat_json(select_field_prompt(product, question)))
+        return data.get("field", docs[0][0]), data.get("answer", "")
+
+    def _corpus(self, product: Dict[str, Any]) -> Tuple[List[Tuple[str, str, str]], np.ndarray]:
+        docs = self._faq_docs(product)
+        key = "\n".join(text for _, _, text in docs)
+        cached = self._corpus_cache.get(key)
+        if cached is None:
+            if len(self._corpus_cache) >= self.CORPUS_CACHE_SIZE:
+                self._corpus_cache.pop(next(iter(self._corpus_cache)))
+            cached = (docs, self.embedder.embed_matrix([text for _, _, text in docs]))
+            self._corpus_cache[key] = cached
+        return cached
+
+    def _select_field_embedding(self, product: Dict[str, Any], question: str) -> Tuple[str, str] | None:
+        docs, matrix = self._corpus(product)
+        scores = self.embedder.score(question, matrix)
+        best = int(np.argmax(scores))
+        if scores[best] < SIMILARITY_MIN:
+            return None
+        return docs[best][0], docs[best][1]
+
+    def faq_prefetcher(self, product: Dict[str, Any]) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """An on_item callback for streamed questions: starts the field selection call of each question the
+        rules cannot answer, so build_faq_page finds it in flight. None when no call can be started early."""
+        llm = get_provider()
+        if self.faq_mode != "llm" or not hasattr(llm, "prefetch"):
+            return None
+        index = self.rules.index(product) if self.rules is not None else None
+
+        def on_item(item: Dict[str, Any]) -> None:
+            question = item.get("question") if isinstance(item, dict) else None
+            if not isinstance(question, str):
+                return
+            if index is not None and self.rules.answer(index, question) is not None:
+                return
+            llm.prefetch(select_field_prompt(product, question))
+
+        return on_item
+
+    def _answer(self, llm: Any, product: Dict[str, Any], question: str, field: str, value: str) -> str:
+        return llm.chat_json(answer_prompt(product, question, field, value)).strip()
+
+    def _answer_batched(self, llm: Any, product: Dict[str, Any], docs: List[Tuple[str, str, str]], items: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        prompt = batched_answer_prompt(product, [q["question"] for q in items])
+        return self._parse_batched(llm.ensure_json(llm.chat_json(prompt)), docs, items)
+
+    def _parse_batched(self, data: Dict[str, Any], docs: List[Tuple[str, str, str]], items: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        by_index = {}
+        for entry in data.get("answers", []):
+            if isinstance(entry, dict) and "index" in entry:
+                by_index[int(entry["index"])] = entry
+        missing = [i for i in range(len(items)) if i not in by_index]
+        if missing:
+            raise ValueError(f"Batched FAQ answer missing questions: {missing}")
+        return [(by_index[i].get("field", docs[0][0]), str(by_index[i].get("answer", "")).strip()) for i in range(len(items))]
 
+    def _ground(self, product: Dict[str, Any], docs: List[Tuple[str, str, str]], entries: List[Dict[str, Any]]) -> None:
+        """Logs answers scoring below SIMILARITY_MIN against their source field; the answers themselves are kept."""
+        values = {field: value for field, value, _ in docs}
+        for entry in entries:
+            if entry["source_field"] not in values:
+                selected = self._select_field_embedding(product, entry["q"])
+                entry["source_field"] = selected[0] if selected is not None else docs[0][0]
+        scores = grounding_scores(self.embedder, [e["a"] for e in entries], [values[e["source_field"]] for e in entries])
+        # Short correct answers ("Yes.", "Two.") score low against the field text, so a low score is only reported.
+        low = [
+            {"q": entry["q"], "source_field": entry["source_field"], "score": round(float(score), 4)}
+            for entry, score in zip(entries, scores)
+            if score < SIMILARITY_MIN
+        ]
+        log_event({
+            "type": "faq_grounding",
+            "ts": time.time(),
+            "product": product["product_name"],
+            "checked": len(entries),
+            "low_score": low,
+            "min_score": round(float(scores.min()), 4) if len(entries) else None,
+        })
+
+    def _prefill_faq(self, product: Dict[str, Any], items: List[Dict[str, Any]], memo: Optional[Any]) -> List[Optional[Dict[str, Any]]]:
+        """Answers what the rule fast path and the memo can; the remaining entries stay None for the LLM."""
+        faq_items: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        if self.rules is not None:
+            index = self.rules.index(product)
+            for i, q in enumerate(items):
+                ruled = self.rules.answer(index, q["question"])
+                if ruled is not None:
+                    faq_items[i] = {"q": q["question"], "a": ruled["a"], "category": q["category"], "source_field": ruled["source_field"]}
+        ruled_count = sum(1 for entry in faq_items if entry is not None)
+        if memo is not None:
+            for i, q in enumerate(items):
+                if faq_items[i] is None:
+                    faq_items[i] = memo.faq_lookup(product, q)
+        if self.rules is not None:
+            pending = sum(1 for entry in faq_items if entry is None)
+            per_question = {"llm": 2, "embedding": 1}.get(self.faq_mode)
+            skipped = ruled_count * per_question if per_question else int(ruled_count > 0 and not pending)
+            log_event({
+                "type": "faq_fast_path",
+                "ts": time.time(),
+                "product": product["product_name"],
+                "answered": ruled_count,
+                "questions": len(items),
+                "llm_calls_skipped": skipped,
+            })
+        return faq_items
+
+    def _finish_faq(self, product: Dict[str, Any], docs: List[Tuple[str, str, str]], items: List[Dict[str, Any]], faq_items: List[Any], pending: List[int], memo: Optional[Any]) -> None:
+        if FAQ_GROUNDING_CHECK:
+            self._ground(product, docs, [faq_items[i] for i in pending])
+        if memo is not None:
+            for i in pending:
+                memo.faq_store(product, items[i], faq_items[i])
+
+    def _faq_page(self, product: Dict[str, Any], faq_items: List[Any]) -> Dict[str, Any]:
+        ing = self.logic_blocks["ingredient_summary"](product)
+        usage = self.logic_blocks["usage_instructions"](product)
+        safety = self.logic_blocks["safety_notes"](product)
         return {
             "template": "faq",
             "product": product["product_name"],
@@ -54,6 +175,56 @@ class PageAssemblyAgent:
             "qa": faq_items,
         }
 
+    def build_faq_page(self, product: Dict[str, Any], questions: Dict[str, Any], memo: Optional[Any] = None) -> Dict[str, Any]:
+        items = questions["items"]
+        faq_items = self._prefill_faq(product, items, memo)
+        pending = [i for i, entry in enumerate(faq_items) if entry is None]
+        if pending:
+            llm = get_provider()
+            docs, _ = self._corpus(product)
+            if self.faq_mode == "batched":
+                answers = self._answer_batched(llm, product, docs, [items[i] for i in pending])
+                for i, (field, ans) in zip(pending, answers):
+                    faq_items[i] = {"q": items[i]["question"], "a": ans, "category": items[i]["category"], "source_field": field}
+            else:
+                for i in pending:
+                    qt = items[i]["question"]
+                    selected = self._select_field_embedding(product, qt) if self.faq_mode == "embedding" else None
+                    field, value = selected if selected is not None else self._select_field_llm(llm, product, docs, qt)
+                    ans = self._answer(llm, product, qt, field, value)
+                    faq_items[i] = {"q": qt, "a": ans, "category": items[i]["category"], "source_field": field}
+            self._finish_faq(product, docs, items, faq_items, pending, memo)
+        return self._faq_page(product, faq_items)
+
+    async def abuild_faq_page(self, product: Dict[str, Any], questions: Dict[str, Any], memo: Optional[Any] = None) -> Dict[str, Any]:
+        """build_faq_page for the async graph: pending questions are answered concurrently, at most faq_concurrency at a time."""
+        items = questions["items"]
+        faq_items = self._prefill_faq(product, items, memo)
+        pending = [i for i, entry in enumerate(faq_items) if entry is None]
+        if pending:
+            llm = get_provider()
+            docs, _ = self._corpus(product)
+            if self.faq_mode == "batched":
+                sub = [items[i] for i in pending]
+                prompt = batched_answer_prompt(product, [q["question"] for q in sub])
+                answers = self._parse_batched(llm.ensure_json(await llm.achat_json(prompt)), docs, sub)
+                for i, (field, ans) in zip(pending, answers):
+                    faq_items[i] = {"q": items[i]["question"], "a": ans, "category": items[i]["category"], "source_field": field}
+            else:
+                limit = asyncio.Semaphore(self.faq_concurrency)
+
+                async def answer(i: int) -> None:
+                    qt = items[i]["question"]
+                    async with limit:
+                        selected = self._select_field_embedding(product, qt) if self.faq_mode == "embedding" else None
+                        field, value = selected if selected is not None else await self._aselect_field_llm(llm, product, docs, qt)
+                        ans = (await llm.achat_json(answer_prompt(product, qt, field, value))).strip()
+                    faq_items[i] = {"q": qt, "a": ans, "category": items[i]["category"], "source_field": field}
+
+                await asyncio.gather(*(answer(i) for i in pending))
+            self._finish_faq(product, docs, items, faq_items, pending, memo)
+        return self._faq_page(product, faq_items)
+
     def build_product_page(self, product: Dict[str, Any]) -> Dict[str, Any]:
         spec = self.templates["product_page"]
         blocks = {
@@ -88,3 +259,13 @@ class PageAssemblyAgent:
             "product_b": b["product_name"],
             **comparison,
         }
+
+    def build_catalog_comparison_pages(self, product: Dict[str, Any], neighbors: List[Tuple[Dict[str, Any], float]]) -> List[Dict[str, Any]]:
+        """Comparison pages against real catalog neighbors, most similar first."""
+        pages = []
+        for other, score in neighbors:
+            page = self.build_comparison_page(product, other)
+            page["similarity"] = score
+            page.update(self.logic_blocks["attribute_diff"](product, other))
+            pages.append(page)
+        return pages
@@ -1,6 +1,6 @@
 from typing import Dict, Any, Union
 import json
-from local_llm import LocalLLMProvider
+from local_llm import get_provider
 
 
 class ProductParsingAgent:
@@ -19,7 +19,7 @@ class ProductParsingAgent:
 
     def run(self, raw_data: Union[Dict[str, Any], str]) -> Dict[str, Any]:
         if isinstance(raw_data, str):
-            llm = LocalLLMProvider()
+            llm = get_provider()
             prompt = (
                 "Extract a ProductModel JSON from the following unstructured text. "
                 "Keys: product_name, concentration, skin_type (list), key_ingredients (list), benefits (list), "
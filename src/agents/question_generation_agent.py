@@ -1,27 +1,55 @@
-from typing import Dict, Any, List
-import json
-from local_llm import LocalLLMProvider
+from typing import Dict, Any, List, Optional, Callable
+import time
+import asyncio
+from local_llm import get_provider
+from config import LLM_STREAM, QUESTION_DEDUP_MIN, QA_MIN_COUNT
+from similarity_index import dedupe, question_embedder
+from observability import log_event
+from prompts import questions_prompt
 
 
 class QuestionGenerationAgent:
     """Generates >=15 categorized user questions answerable from product data only."""
 
-    def run(self, product: Dict[str, Any]) -> Dict[str, Any]:
-        llm = LocalLLMProvider()
-        prompt = (
-            "You are a product Q&A generator. Create at least 15 concise, user-centric questions "
-            "about the product, grouped into categories: Informational, Usage, Safety, Purchase, Ingredients, Comparison. "
-            "Only use the provided product data. Return strict JSON with keys 'count' and 'items', where 'items' is a list "
-            "of objects containing 'category' and 'question'. Do not add explanations.\n"
-            f"Product data: {json.dumps(product, ensure_ascii=False)}"
-        )
-        text = llm.chat_json(prompt)
-        try:
-            data = json.loads(text)
-        except Exception:
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            data = json.loads(text[start:end])
+    def __init__(self):
+        self.embedder = question_embedder()
+
+    def prompt(self, product: Dict[str, Any]) -> str:
+        return questions_prompt(product)
+
+    def run(self, product: Dict[str, Any], on_item: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        llm = get_provider()
+        prompt = self.prompt(product)
+        if LLM_STREAM or on_item is not None:
+            data = llm.stream_json(prompt, on_item=on_item, array_key="items")
+        else:
+            data = llm.ensure_json(llm.chat_json(prompt))
+        return self._question_set(product, data)
+
+    async def arun(self, product: Dict[str, Any], on_item: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        if LLM_STREAM or on_item is not None:
+            return await asyncio.to_thread(self.run, product, on_item)
+        llm = get_provider()
+        return self._question_set(product, llm.ensure_json(await llm.achat_json(self.prompt(product))))
+
+    def _question_set(self, product: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
         if "items" not in data or not isinstance(data["items"], list):
             raise ValueError("LLM did not return valid items list")
-        return {"count": len(data["items"]), "items": data["items"]}
+        items = self.drop_near_duplicates(product, data["items"])
+        return {"count": len(items), "items": items}
+
+    def drop_near_duplicates(self, product: Dict[str, Any], items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drops questions too similar to an earlier one, never going below QA_MIN_COUNT."""
+        if QUESTION_DEDUP_MIN <= 0 or len(items) < 2:
+            return items
+        texts = [str(item.get("question", "")) for item in items]
+        keep = dedupe(texts, QUESTION_DEDUP_MIN, min_keep=QA_MIN_COUNT, embedder=self.embedder)
+        if len(keep) < len(items):
+            log_event({
+                "type": "question_dedup",
+                "ts": time.time(),
+                "product": product.get("product_name"),
+                "questions": len(items),
+                "dropped": len(items) - len(keep),
+            })
+        return [items[i] for i in keep]
@@ -1,6 +1,29 @@
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, FrozenSet, Tuple
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError, create_model
 from models import TemplateSpec
 
+# Required fields that must be objects carrying a particular key.
+NESTED_REQUIREMENTS = {"questions": "items", "product_a": "product_name", "product_b": "product_name"}
+
+
+class _Payload(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+@lru_cache(maxsize=None)
+def compile_template(name: str, required_fields: Tuple[str, ...], logic_dependencies: Tuple[str, ...]) -> Tuple[TypeAdapter, FrozenSet[str]]:
+    """Builds the payload validator for a template once per process."""
+    fields: Dict[str, Any] = {}
+    for rf in required_fields:
+        if rf in NESTED_REQUIREMENTS:
+            inner = create_model(f"{name}_{rf}", __base__=_Payload, **{NESTED_REQUIREMENTS[rf]: (Any, ...)})
+            fields[rf] = (inner, ...)
+        else:
+            fields[rf] = (Any, ...)
+    model = create_model(f"{name}_payload", __base__=_Payload, **fields)
+    return TypeAdapter(model), frozenset(logic_dependencies)
+
 
 class TemplateEngineAgent:
     """Defines structured templates with required fields, dependencies, and rules."""
@@ -45,24 +68,16 @@ class TemplateEngineAgent:
 
     def enforce(self, template_registry: Dict[str, Any], name: str, payload: Dict[str, Any], logic_ids: List[str]) -> None:
         spec = template_registry["templates"][name]
-        reqs = spec["required_fields"]
-        deps = spec["logic_dependencies"]
-        for rf in reqs:
-            if rf == "questions":
-                if "items" not in payload.get("questions", payload):
-                    raise ValueError(f"Missing questions items for template {name}")
-            elif rf == "product_a":
-                if "product_name" not in payload.get("product_a", payload.get("a", {})):
-                    raise ValueError("Missing product_a name")
-            elif rf == "product_b":
-                if "product_name" not in payload.get("product_b", payload.get("b", {})):
-                    raise ValueError("Missing product_b name")
-            else:
-                if rf not in payload:
-                    raise ValueError(f"Missing required field {rf} for template {name}")
-        for dep in deps:
-            if dep not in logic_ids:
-                raise ValueError(f"Missing logic dependency {dep} for template {name}")
+        adapter, deps = compile_template(name, tuple(spec["required_fields"]), tuple(spec["logic_dependencies"]))
+        try:
+            adapter.validate_python(payload)
+        except ValidationError as e:
+            err = e.errors()[0]
+            path = ".".join(str(p) for p in err["loc"])
+            raise ValueError(f"Missing required field {path} for template {name}") from e
+        missing = deps.difference(logic_ids)
+        if missing:
+            raise ValueError(f"Missing logic dependency {sorted(missing)[0]} for template {name}")
 
     @staticmethod
     def architecture_overview() -> Dict[str, Any]:
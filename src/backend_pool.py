@@ -0,0 +1,189 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Any, List, Optional
+from config import LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES, LLM_HEALTH_RECHECK_S
+from observability import log_event, record_latency
+
+
+class Backend:
+    def __init__(self, url: str):
+        self.url = url
+        self.inflight = 0
+        self.ewma_ms: Optional[float] = None
+        self.healthy = True
+        self.failures = 0
+        self.checked_at = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "inflight": self.inflight,
+            "ewma_ms": round(self.ewma_ms, 3) if self.ewma_ms is not None else None,
+            "failures": self.failures,
+        }
+
+
+class BackendPool:
+    """Routes calls to the least-loaded, fastest healthy backend, with failover and optional hedging.
+
+    A hedged call starts a second copy on another backend once the first has run longer than
+    the configured latency percentile; the first answer wins and the other is left to finish.
+    """
+
+    EWMA_ALPHA = 0.2
+    MAX_FAILURES = 2
+
+    def __init__(
+        self,
+        urls: List[str],
+        health_check: Callable[[str], None],
+        hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        recheck_s: float = LLM_HEALTH_RECHECK_S,
+        max_inflight: Optional[int] = None,
+    ):
+        if not urls:
+            raise ValueError("BackendPool needs at least one backend URL")
+        self.backends = [Backend(u) for u in urls]
+        self.health_check = health_check
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.recheck_s = recheck_s
+        self.max_inflight = max_inflight
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: deque = deque(maxlen=512)
+        self._lock = threading.Lock()
+        self._capacity = threading.Condition(self._lock)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=8 * len(self.backends), thread_name_prefix="llm-hedge")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def check(self, backend: Backend) -> bool:
+        try:
+            self.health_check(backend.url)
+            ok = True
+        except Exception:
+            ok = False
+        with self._lock:
+            backend.healthy = ok
+            backend.checked_at = time.monotonic()
+            if ok:
+                backend.failures = 0
+        return ok
+
+    def check_all(self) -> List[Backend]:
+        return [b for b in self.backends if self.check(b)]
+
+    def pick(self, exclude: tuple = (), block: bool = True) -> Optional[Backend]:
+        """Reserves the best backend. With max_inflight set, waits for a backend below the cap,
+        or returns None at once when block is False."""
+        now = time.monotonic()
+        for b in self.backends:
+            if not b.healthy and now - b.checked_at > self.recheck_s:
+                self.check(b)
+        with self._lock:
+            while True:
+                candidates = [b for b in self.backends if b.healthy and b not in exclude]
+                if not candidates:
+                    candidates = [b for b in self.backends if b not in exclude] or list(self.backends)
+                if self.max_inflight is not None:
+                    candidates = [b for b in candidates if b.inflight < self.max_inflight]
+                    if not candidates:
+                        if not block:
+                            return None
+                        self._capacity.wait()
+                        continue
+                # Backends without a latency sample yet score zero so each gets tried.
+                best = min(candidates, key=lambda b: ((b.inflight + 1) * (b.ewma_ms or 0.0), b.inflight))
+                best.inflight += 1
+                return best
+
+    def release(self, backend: Backend, elapsed_ms: Optional[float]) -> None:
+        with self._lock:
+            backend.inflight -= 1
+            self._capacity.notify()
+            if elapsed_ms is None:
+                backend.failures += 1
+                if backend.failures >= self.MAX_FAILURES:
+                    backend.healthy = False
+                    backend.checked_at = time.monotonic()
+                return
+            backend.failures = 0
+            backend.ewma_ms = elapsed_ms if backend.ewma_ms is None else (
+                self.EWMA_ALPHA * elapsed_ms + (1 - self.EWMA_ALPHA) * backend.ewma_ms
+            )
+            self._latencies.append(elapsed_ms)
+        record_latency(f"llm.backend.{backend.url}", elapsed_ms)
+
+    def _attempt(self, backend: Backend, fn: Callable[[str], str]) -> str:
+        start = time.perf_counter()
+        try:
+            result = fn(backend.url)
+        except Exception:
+            self.release(backend, None)
+            raise
+        self.release(backend, (time.perf_counter() - start) * 1000)
+        return result
+
+    def hedge_delay_s(self) -> Optional[float]:
+        if self.hedge_percentile <= 0 or len(self.backends) < 2:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))] / 1000
+
+    def call(self, fn: Callable[[str], str]) -> str:
+        """Runs fn(base_url) on the best backend, failing over once to another on error."""
+        primary = self.pick()
+        delay = self.hedge_delay_s()
+        if delay is None:
+            try:
+                return self._attempt(primary, fn)
+            except Exception:
+                if len(self.backends) < 2:
+                    raise
+                log_event({"type": "llm_failover", "ts": time.time(), "from": primary.url})
+                return self._attempt(self.pick(exclude=(primary,)), fn)
+        first = self._pool().submit(self._attempt, primary, fn)
+        done, _ = wait([first], timeout=delay)
+        if done and first.exception() is None:
+            return first.result()
+        secondary = self.pick(exclude=(primary,), block=False)
+        if secondary is None:
+            # Every other backend is at its cap; a hedge would only queue behind it.
+            return first.result()
+        with self._lock:
+            self.hedges += 1
+        second = self._pool().submit(self._attempt, secondary, fn)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return f.result()
+                error = f.exception()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backends": [b.snapshot() for b in self.backends],
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
@@ -0,0 +1,410 @@
+import csv
+import json
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from config import BATCH_WORKERS, BATCH_OUTPUT_DIR, OUTPUT_SHARDS, OUTPUT_COMPRESS, COMPARE_TOP_K, COMPETITOR_POOL, CHECKPOINT, RUN_ID
+
+LIST_FIELDS = ("skin_type", "key_ingredients", "benefits")
+
+_APP = None
+_RUN_ID: Optional[str] = None
+
+
+def slugify(text: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-")
+    return slug or "product"
+
+
+def product_id_of(raw: Dict[str, Any]) -> str:
+    for key in ("product_id", "sku", "id"):
+        if raw.get(key) not in (None, ""):
+            return slugify(raw[key])
+    return slugify(raw.get("product_name", ""))
+
+
+def _parse_list_cell(value: str) -> List[str]:
+    value = value.strip()
+    if value.startswith("["):
+        return list(json.loads(value))
+    return [v.strip() for v in value.split("|") if v.strip()]
+
+
+def iter_products(path: Path) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """Yields (product_id, raw_product, error) for every record in a JSONL or CSV file."""
+    seen: Dict[str, int] = {}
+
+    def unique(pid: str) -> str:
+        n = seen.get(pid, 0) + 1
+        seen[pid] = n
+        return pid if n == 1 else f"{pid}-{n}"
+
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            for row_no, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    raw: Dict[str, Any] = {k: v for k, v in row.items() if k}
+                    for k in LIST_FIELDS:
+                        if isinstance(raw.get(k), str):
+                            raw[k] = _parse_list_cell(raw[k])
+                    yield unique(product_id_of(raw)), raw, None
+                except Exception as e:
+                    yield unique(f"row-{row_no}"), None, f"Unreadable CSV row {row_no}: {e}"
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                    if not isinstance(raw, dict):
+                        raise ValueError("expected a JSON object")
+                    yield unique(product_id_of(raw)), raw, None
+                except Exception as e:
+                    yield unique(f"line-{line_no}"), None, f"Unreadable JSONL line {line_no}: {e}"
+
+
+def _init_worker(run_id: Optional[str] = None) -> None:
+    global _APP, _RUN_ID
+    from main import build_graph
+    _RUN_ID = run_id
+    if run_id is None:
+        _APP = build_graph()
+    else:
+        from checkpoints import open_checkpointer
+        _APP = build_graph(checkpointer=open_checkpointer())
+
+
+def _write_outputs(out_dir: Path, final: Dict[str, Any]) -> Dict[str, str]:
+    from main import write_json
+    from output_sink import write_if_changed
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files = {
+        "faq": out_dir / "faq.json",
+        "product_page": out_dir / "product_page.json",
+        "comparison_page": out_dir / "comparison_page.json",
+        "documentation": out_dir / "documentation.md",
+    }
+    write_json(files["faq"], final["faq_page"])
+    write_json(files["product_page"], final["product_page"])
+    write_json(files["comparison_page"], final["comparison_page"])
+    write_if_changed(files["documentation"], final["documentation_md"])
+    return {k: str(v) for k, v in files.items()}
+
+
+def _flush_run_stats() -> None:
+    from llm_cache import get_cache
+    from observability import flush_logs
+    cache = get_cache()
+    if cache is not None:
+        cache.log_stats()
+    flush_logs()
+
+
+def _pages(final: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "faq": final["faq_page"],
+        "product_page": final["product_page"],
+        "comparison_page": final["comparison_page"],
+        "documentation": final["documentation_md"],
+    }
+
+
+def process_product(product_id: str, raw: Dict[str, Any], out_dir: str, to_sink: bool = False) -> Dict[str, Any]:
+    """Runs one product; the record carries the latency histograms recorded for it, for the parent to merge."""
+    from main import initial_state
+    from observability import take_metrics
+    from llm_scheduler import priority_scope, PRIORITY_BULK
+    if _APP is None:
+        _init_worker()
+    start = time.perf_counter()
+    try:
+        with priority_scope(PRIORITY_BULK):
+            if _RUN_ID is None:
+                final = _APP.invoke(initial_state(raw))
+            else:
+                from checkpoints import invoke_resumable, thread_config
+                final = invoke_resumable(_APP, initial_state(raw), thread_config(_RUN_ID, product_id))
+        record: Dict[str, Any] = {"product_id": product_id, "status": "ok"}
+        if to_sink:
+            # The parent process owns the sink; pages travel back with the result.
+            record["pages"] = _pages(final)
+        else:
+            record["outputs"] = _write_outputs(Path(out_dir) / product_id, final)
+        _flush_run_stats()
+        record["latency_ms"] = int((time.perf_counter() - start) * 1000)
+        record["metrics"] = take_metrics()
+        return record
+    except Exception as e:
+        _flush_run_stats()
+        return {
+            "product_id": product_id,
+            "status": "error",
+            "latency_ms": int((time.perf_counter() - start) * 1000),
+            "error": f"{type(e).__name__}: {e}",
+            "metrics": take_metrics(),
+        }
+
+
+def parse_catalog(input_path: str) -> Tuple[List[str], List[Dict[str, Any]], Dict[str, str]]:
+    """Normalizes every record in a catalog; returns product ids, product models and per-id errors."""
+    from agents.product_parsing_agent import ProductParsingAgent
+    parser = ProductParsingAgent()
+    ids: List[str] = []
+    models: List[Dict[str, Any]] = []
+    errors: Dict[str, str] = {}
+    for product_id, raw, error in iter_products(Path(input_path)):
+        if error:
+            errors[product_id] = error
+            continue
+        try:
+            models.append(parser.run(raw))
+            ids.append(product_id)
+        except Exception as e:
+            errors[product_id] = f"{type(e).__name__}: {e}"
+    return ids, models, errors
+
+
+def build_catalog_index(ids: List[str], models: List[Dict[str, Any]]):
+    from catalog_index import CatalogIndex
+    index = CatalogIndex()
+    for product_id, product in zip(ids, models):
+        index.add(product_id, product)
+    return index
+
+
+def prefill_competitor_pool(models: List[Dict[str, Any]]) -> int:
+    """Generates pooled competitors in batches for products that have none, before workers start."""
+    from agents.fictional_product_agent import FictionalProductAgent
+    agent = FictionalProductAgent(use_pool=True)
+    batches = agent.fill_gaps(models)
+    agent.pool.log_stats()
+    return batches
+
+
+def validate_catalog(input_path: str) -> Dict[str, Any]:
+    """Normalizes and validates every product in a catalog in one pass, without running the pipeline."""
+    from validation_agent import validate_batch
+    ids, models, errors = parse_catalog(input_path)
+    for product_id, error in zip(ids, validate_batch("product_model", models)):
+        if error:
+            errors[product_id] = error
+    total = len(ids) + sum(1 for pid in errors if pid not in ids)
+    return {"input": str(input_path), "total": total, "valid": total - len(errors), "invalid": errors}
+
+
+def run_batch(
+    input_path: str,
+    out_dir: str = BATCH_OUTPUT_DIR,
+    workers: int = BATCH_WORKERS,
+    sink: str = "files",
+    compress: bool = OUTPUT_COMPRESS,
+    shards: int = OUTPUT_SHARDS,
+    compare_top_k: int = COMPARE_TOP_K,
+    checkpoint: bool = CHECKPOINT,
+    run_id: Optional[str] = None,
+    only: Optional[Set[str]] = None,
+    previous: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Runs every product in a catalog, or only the ids in only, keeping the records in previous in the manifest.
+
+    With checkpointing, graph state is saved per node under run_id, so rerunning with the same run_id
+    resumes each product where it stopped.
+    """
+    from local_llm import get_provider, check_available
+    from output_sink import ShardedJSONLSink, write_if_changed
+    from observability import log_event, merge_metrics, metrics_snapshot
+    if sink not in ("files", "jsonl"):
+        raise ValueError(f"Unknown output sink: {sink}")
+    check_available(get_provider())
+    if checkpoint or run_id:
+        from checkpoints import new_run_id
+        run_id = run_id or RUN_ID or new_run_id()
+        log_event({"type": "batch_start", "ts": time.time(), "run_id": run_id, "input": str(input_path)})
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    started = time.time()
+    start = time.perf_counter()
+    records: List[Dict[str, Any]] = list(previous or [])
+    jsonl = ShardedJSONLSink(out / "pages", shards=shards, compress=compress) if sink == "jsonl" else None
+    to_sink = jsonl is not None
+
+    index = None
+    if compare_top_k > 0 or COMPETITOR_POOL:
+        ids, models, _ = parse_catalog(input_path)
+        if COMPETITOR_POOL:
+            prefill_competitor_pool(models)
+        if compare_top_k > 0:
+            index = build_catalog_index(ids, models)
+    assembler = None
+    if index is not None:
+        from main import write_json
+        from agents.content_logic_block_agent import LOGIC_IMPL
+        from agents.page_assembly_agent import PageAssemblyAgent
+        from agents.template_engine_agent import TemplateEngineAgent
+        assembler = PageAssemblyAgent(logic_blocks={"impl": LOGIC_IMPL}, templates=TemplateEngineAgent().run())
+
+    def collect(record: Dict[str, Any]) -> None:
+        merge_metrics(record.pop("metrics", {}))
+        pages = record.pop("pages", None)
+        product_id = record["product_id"]
+        if index is not None and record["status"] == "ok" and product_id in index:
+            neighbors = index.neighbors_of(product_id, compare_top_k)
+            comparisons = assembler.build_catalog_comparison_pages(
+                index.products[product_id], [(index.products[pid], score) for pid, score in neighbors]
+            )
+            record["neighbors"] = [pid for pid, _ in neighbors]
+            if pages is not None:
+                pages["catalog_comparisons"] = comparisons
+            else:
+                path = out / product_id / "catalog_comparisons.json"
+                write_json(path, {"template": "catalog_comparisons", "product": product_id, "pages": comparisons})
+                record["outputs"]["catalog_comparisons"] = str(path)
+        if jsonl is not None and pages is not None:
+            written = jsonl.write(record["product_id"], pages)
+            record["outputs"] = {"shard": jsonl.shard_name(record["product_id"]), "written": written}
+        records.append(record)
+
+    def skipped(product_id: str, error: str) -> Dict[str, Any]:
+        return {"product_id": product_id, "status": "error", "latency_ms": 0, "error": error}
+
+    def products() -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+        for item in iter_products(Path(input_path)):
+            if only is None or item[0] in only:
+                yield item
+
+    def write_manifest(aborted: Optional[str] = None) -> Dict[str, Any]:
+        records.sort(key=lambda r: r["product_id"])
+        ok = sum(1 for r in records if r["status"] == "ok")
+        manifest = {
+            "input": str(input_path),
+            "run_id": run_id,
+            "workers": workers,
+            "compare_top_k": compare_top_k,
+            "sink": {"kind": sink, "path": str(out / "pages"), "shards": shards, "compress": compress} if to_sink else {"kind": sink},
+            "started_at": started,
+            "elapsed_ms": int((time.perf_counter() - start) * 1000),
+            "total": len(records),
+            "succeeded": ok,
+            "failed": len(records) - ok,
+            "products": records,
+        }
+        if aborted:
+            manifest["aborted"] = aborted
+        log_event({"type": "metrics", "ts": time.time(), "run_id": run_id, "spans": metrics_snapshot()})
+        _flush_run_stats()
+        write_if_changed(out / "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+        return manifest
+
+    # The manifest is written even when the run aborts, so the products finished so far are not lost.
+    try:
+        if workers <= 1:
+            _init_worker(run_id)
+            for product_id, raw, error in products():
+                collect(skipped(product_id, error) if error else process_product(product_id, raw, out_dir, to_sink))
+        else:
+            max_pending = workers * 4
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(run_id,)) as pool:
+                pending: Dict[Future, str] = {}
+
+                def drain(done: Set[Future]) -> None:
+                    # A worker that dies breaks the pool and fails every pending future; each becomes an error record.
+                    for f in done:
+                        product_id = pending.pop(f)
+                        try:
+                            collect(f.result())
+                        except Exception as e:
+                            collect(skipped(product_id, f"{type(e).__name__}: {e}"))
+
+                for product_id, raw, error in products():
+                    if error:
+                        collect(skipped(product_id, error))
+                        continue
+                    try:
+                        pending[pool.submit(process_product, product_id, raw, out_dir, to_sink)] = product_id
+                    except BrokenProcessPool as e:
+                        collect(skipped(product_id, f"{type(e).__name__}: {e}"))
+                        continue
+                    if len(pending) >= max_pending:
+                        drain(wait(pending, return_when=FIRST_COMPLETED).done)
+                drain(wait(pending).done)
+    except BaseException as e:
+        if jsonl is not None:
+            jsonl.close()
+        write_manifest(aborted=f"{type(e).__name__}: {e}")
+        raise
+    if jsonl is not None:
+        jsonl.close()
+    return write_manifest()
+
+
+def resume_failed(manifest_path: str, workers: int = BATCH_WORKERS) -> Dict[str, Any]:
+    """Reruns only the failed products of an earlier batch, resuming each from its checkpoint when it has one."""
+    previous = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+    failed = {r["product_id"] for r in previous["products"] if r["status"] != "ok"}
+    sink = previous.get("sink", {"kind": "files"})
+    return run_batch(
+        previous["input"],
+        out_dir=str(Path(manifest_path).parent),
+        workers=workers,
+        sink=sink["kind"],
+        compress=sink.get("compress", OUTPUT_COMPRESS),
+        shards=sink.get("shards", OUTPUT_SHARDS),
+        compare_top_k=previous.get("compare_top_k", 0),
+        checkpoint=True,
+        run_id=previous.get("run_id"),
+        only=failed,
+        previous=[r for r in previous["products"] if r["status"] == "ok"],
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate pages for every product in a JSONL or CSV catalog.")
+    parser.add_argument("input", nargs="?", help="Path to a .jsonl or .csv product catalog")
+    parser.add_argument("--out", default=BATCH_OUTPUT_DIR, help="Output directory for per-product pages and manifest")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Number of worker processes")
+    parser.add_argument("--sink", choices=("files", "jsonl"), default="files", help="Write per-product files or sharded JSONL")
+    parser.add_argument("--compress", action="store_true", default=OUTPUT_COMPRESS, help="Gzip JSONL shards")
+    parser.add_argument("--compare-top-k", type=int, default=COMPARE_TOP_K, help="Also compare each product with its k most similar catalog products")
+    parser.add_argument("--validate-only", action="store_true", help="Only check that every product record is valid")
+    parser.add_argument("--checkpoint", action="store_true", default=CHECKPOINT, help="Checkpoint graph state per node in CHECKPOINT_PATH")
+    parser.add_argument("--run-id", help="Checkpoint run id; reuse one to resume an interrupted run")
+    parser.add_argument("--resume-failed", metavar="MANIFEST", help="Rerun only the failed products of an earlier manifest")
+    args = parser.parse_args(argv)
+    if args.resume_failed:
+        manifest = resume_failed(args.resume_failed, workers=args.workers)
+        out_dir = str(Path(args.resume_failed).parent)
+    elif args.input is None:
+        parser.error("an input catalog or --resume-failed is required")
+    elif args.validate_only:
+        report = validate_catalog(args.input)
+        print(json.dumps(report, ensure_ascii=False))
+        return 0 if not report["invalid"] else 1
+    else:
+        manifest = run_batch(
+            args.input,
+            out_dir=args.out,
+            workers=args.workers,
+            sink=args.sink,
+            compress=args.compress,
+            compare_top_k=args.compare_top_k,
+            checkpoint=args.checkpoint,
+            run_id=args.run_id,
+        )
+        out_dir = args.out
+    print(json.dumps({
+        "manifest": str(Path(out_dir) / "manifest.json"),
+        "run_id": manifest["run_id"],
+        "succeeded": manifest["succeeded"],
+        "failed": manifest["failed"],
+    }, ensure_ascii=False))
+    return 0 if manifest["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
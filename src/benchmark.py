@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import resource
+import tempfile
+import statistics
+import subprocess
+import argparse
+import platform
+from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
+from stub_llm_server import StubLLMServer
+
+
+def synthetic_products(n: int) -> List[Dict[str, Any]]:
+    from main import RAW_PRODUCT_DATA
+    products = []
+    for i in range(n):
+        products.append({
+            **RAW_PRODUCT_DATA,
+            "product_name": f"{RAW_PRODUCT_DATA['product_name']} {i + 1}",
+            "price_inr": 499 + (i * 37) % 500,
+        })
+    return products
+
+
+@contextmanager
+def stub_environment(server: StubLLMServer, kind: str, model: str = "stub") -> Iterator[None]:
+    """Points LOCAL_LLM_* and the shared provider at the stub server for the duration of the block."""
+    import local_llm
+    keys = ("LOCAL_LLM_KIND", "LOCAL_LLM_URL", "LOCAL_LLM_MODEL", "LOCAL_LLM_URLS")
+    saved_env = {k: os.environ.get(k) for k in keys}
+    saved_provider = local_llm._PROVIDER
+    os.environ.update({"LOCAL_LLM_KIND": kind, "LOCAL_LLM_URL": server.url, "LOCAL_LLM_MODEL": model})
+    # LOCAL_LLM_URLS takes precedence over LOCAL_LLM_URL; an exported one would send traffic to real backends.
+    os.environ.pop("LOCAL_LLM_URLS", None)
+    local_llm._PROVIDER = None
+    try:
+        yield
+    finally:
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        local_llm._PROVIDER = saved_provider
+
+
+def run_benchmark(
+    products: int = 20,
+    concurrency: int = 4,
+    latency_ms: float = 20.0,
+    jitter_ms: float = 5.0,
+    kind: str = "ollama",
+    cache: bool = False,
+    input_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    from main import build_graph, initial_state
+    from llm_cache import configure_cache
+    from local_llm import get_provider
+    from observability import metrics_snapshot, reset_metrics, record_latency, flush_logs
+
+    if input_path:
+        from batch import iter_products
+        catalog = [raw for _, raw, error in iter_products(Path(input_path)) if not error][:products]
+    else:
+        catalog = synthetic_products(products)
+    configure_cache(cache)
+    reset_metrics()
+    failures: List[str] = []
+
+    with StubLLMServer(latency_ms=latency_ms, jitter_ms=jitter_ms) as server, stub_environment(server, kind):
+        get_provider().ping()
+        app = build_graph(incremental=False)
+
+        def one(raw: Dict[str, Any]) -> None:
+            start = time.perf_counter()
+            try:
+                app.invoke(initial_state(raw))
+            except Exception as e:
+                failures.append(f"{raw.get('product_name')}: {type(e).__name__}: {e}")
+            record_latency("product", (time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            list(pool.map(one, catalog))
+        elapsed = time.perf_counter() - start
+        calls = dict(server.calls)
+        prompt_tokens = server.prompt_tokens
+        prompt_tokens_cached = server.prompt_tokens_cached
+    flush_logs()
+
+    total_calls = sum(calls.values())
+    n = len(catalog)
+    return {
+        "ts": time.time(),
+        "python": platform.python_version(),
+        "config": {
+            "products": n,
+            "concurrency": concurrency,
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "kind": kind,
+            "cache": cache,
+            "faq_mode": os.getenv("FAQ_MODE", "llm"),
+        },
+        "elapsed_s": round(elapsed, 4),
+        "products_per_s": round(n / elapsed, 4) if elapsed else 0.0,
+        "failures": failures,
+        "llm_calls": total_calls,
+        "llm_calls_per_product": round(total_calls / n, 3) if n else 0.0,
+        "llm_calls_by_endpoint": calls,
+        "prompt_tokens_per_product": round(prompt_tokens / n, 1) if n else 0.0,
+        "prompt_tokens_cached_per_product": round(prompt_tokens_cached / n, 1) if n else 0.0,
+        "nodes": metrics_snapshot(),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """Lists regressions of current against a saved baseline beyond the relative tolerance."""
+    regressions = []
+    if current["products_per_s"] < baseline["products_per_s"] * (1 - tolerance):
+        regressions.append(f"products_per_s {baseline['products_per_s']} -> {current['products_per_s']}")
+    if current["llm_calls_per_product"] > baseline["llm_calls_per_product"] * (1 + tolerance):
+        regressions.append(f"llm_calls_per_product {baseline['llm_calls_per_product']} -> {current['llm_calls_per_product']}")
+    if current["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak_rss_mb {baseline['peak_rss_mb']} -> {current['peak_rss_mb']}")
+    return regressions
+
+
+def measure_startup(runs: int = 5, latency_ms: float = 20.0, kind: str = "ollama") -> Dict[str, Any]:
+    """Times `python src/main.py` in fresh processes: time to first LLM call and total wall time.
+
+    The first run starts without a health-check cache; later runs reuse the one it wrote.
+    """
+    main_path = Path(__file__).with_name("main.py")
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            with StubLLMServer(latency_ms=latency_ms) as server:
+                env = {
+                    **{k: v for k, v in os.environ.items() if k != "LOCAL_LLM_URLS"},
+                    "LOCAL_LLM_KIND": kind,
+                    "LOCAL_LLM_URL": server.url,
+                    "LOCAL_LLM_MODEL": "stub",
+                    "LLM_CACHE": "0",
+                    "INCREMENTAL": "0",
+                }
+                start = time.time()
+                proc = subprocess.run([sys.executable, str(main_path)], cwd=workdir, env=env, capture_output=True, text=True)
+                wall = time.time() - start
+                if proc.returncode != 0:
+                    raise RuntimeError(f"main.py failed: {proc.stderr.strip()[-500:]}")
+                first = server.first_call_at
+                samples.append({
+                    "time_to_first_llm_call_ms": round((first - start) * 1000, 1) if first else None,
+                    "wall_ms": round(wall * 1000, 1),
+                })
+    warm = samples[1:] or samples
+    return {
+        "runs": runs,
+        "latency_ms": latency_ms,
+        "cold": samples[0],
+        "warm_median": {
+            k: round(statistics.median(s[k] for s in warm if s[k] is not None), 1)
+            for k in ("time_to_first_llm_call_ms", "wall_ms")
+        },
+        "samples": samples,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark against a local stub LLM server.")
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--kind", choices=["ollama", "openai-compatible"], default="ollama")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--input", help="Benchmark products from a JSONL/CSV catalog instead of synthetic ones")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--startup", type=int, metavar="RUNS", help="Measure CLI startup over RUNS fresh processes instead")
+    args = parser.parse_args(argv)
+    if args.startup:
+        results = measure_startup(runs=args.startup, latency_ms=args.latency_ms, kind=args.kind)
+        Path(args.out).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(json.dumps({"cold": results["cold"], "warm_median": results["warm_median"]}))
+        return 0
+    results = run_benchmark(
+        products=args.products,
+        concurrency=args.concurrency,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        kind=args.kind,
+        cache=args.cache,
+        input_path=args.input,
+    )
+    Path(args.out).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(json.dumps({k: results[k] for k in ("products_per_s", "llm_calls_per_product", "peak_rss_mb")}))
+    if args.compare:
+        regressions = compare_results(results, json.loads(Path(args.compare).read_text(encoding="utf-8")), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION: {r}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
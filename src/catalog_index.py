@@ -0,0 +1,142 @@
+import math
+import heapq
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from config import CATALOG_PRICE_BAND_INR
+
+SET_ATTRIBUTES = ("key_ingredients", "skin_type", "benefits")
+ATTRIBUTE_WEIGHTS = {"key_ingredients": 0.4, "benefits": 0.3, "skin_type": 0.15}
+PRICE_WEIGHT = 0.15
+
+
+def _terms(values: Iterable[Any]) -> Set[str]:
+    return {str(v).strip().lower() for v in values if str(v).strip()}
+
+
+def set_diff(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Attribute-level diff of two products: shared and exclusive values per list field, plus price delta."""
+    diff: Dict[str, Any] = {}
+    for attr in SET_ATTRIBUTES:
+        ta, tb = _terms(a[attr]), _terms(b[attr])
+        union = ta | tb
+        diff[attr] = {
+            "shared": sorted(v for v in a[attr] if str(v).strip().lower() in tb),
+            "only_a": sorted(v for v in a[attr] if str(v).strip().lower() not in tb),
+            "only_b": sorted(v for v in b[attr] if str(v).strip().lower() not in ta),
+            "jaccard": round(len(ta & tb) / len(union), 4) if union else 1.0,
+        }
+    pa, pb = int(a["price_inr"]), int(b["price_inr"])
+    diff["price_inr"] = {"A": pa, "B": pb, "delta": pb - pa, "pct": round((pb - pa) / pa * 100, 2) if pa else None}
+    return diff
+
+
+class CatalogIndex:
+    """Inverted indexes over list attributes and price bands for finding a product's nearest catalog neighbors.
+
+    Candidates come from the postings of the product's rarest terms, ranked by the IDF weight they share
+    and cut to candidate_limit, so a lookup scores only the products sharing the most distinctive terms
+    rather than the whole catalog.
+    """
+
+    def __init__(self, price_band: int = CATALOG_PRICE_BAND_INR, max_df_ratio: float = 0.2, candidate_limit: int = 500):
+        if price_band <= 0:
+            raise ValueError("price_band must be positive")
+        self.price_band = price_band
+        self.max_df_ratio = max_df_ratio
+        self.candidate_limit = candidate_limit
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self._terms: Dict[str, Dict[str, Set[str]]] = {}
+        self._postings: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._bands: Dict[int, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.products
+
+    def band(self, price: int) -> int:
+        return int(price) // self.price_band
+
+    def add(self, product_id: str, product: Dict[str, Any]) -> None:
+        if product_id in self.products:
+            self.remove(product_id)
+        terms = {attr: _terms(product[attr]) for attr in SET_ATTRIBUTES}
+        self.products[product_id] = product
+        self._terms[product_id] = terms
+        for attr, values in terms.items():
+            for term in values:
+                self._postings[(attr, term)].add(product_id)
+        self._bands[self.band(product["price_inr"])].add(product_id)
+
+    def remove(self, product_id: str) -> None:
+        product = self.products.pop(product_id)
+        for attr, values in self._terms.pop(product_id).items():
+            for term in values:
+                self._postings[(attr, term)].discard(product_id)
+        self._bands[self.band(product["price_inr"])].discard(product_id)
+
+    def _idf(self, attr: str, term: str) -> float:
+        df = len(self._postings.get((attr, term), ()))
+        return math.log((1 + len(self.products)) / (1 + df)) + 1.0
+
+    def _candidates(self, terms: Dict[str, Set[str]], price: int, exclude: Optional[str]) -> Set[str]:
+        keyed = sorted(
+            ((len(self._postings.get((attr, t), ())), attr, t) for attr, values in terms.items() for t in values),
+        )
+        max_df = max(1, int(self.max_df_ratio * len(self.products)))
+        # Each posting product collects the weighted IDF of the terms it shares; only the best
+        # candidate_limit of them are scored, however many products the postings cover.
+        shared: Dict[str, float] = defaultdict(float)
+        for df, attr, term in keyed:
+            if df == 0:
+                continue
+            # Very common terms say little about similarity; use them only if nothing rarer matched.
+            if df > max_df and any(pid != exclude for pid in shared):
+                break
+            weight = ATTRIBUTE_WEIGHTS[attr] * self._idf(attr, term)
+            for pid in self._postings[(attr, term)]:
+                shared[pid] += weight
+        shared.pop(exclude, None)
+        if shared:
+            if len(shared) <= self.candidate_limit:
+                return set(shared)
+            return set(heapq.nlargest(
+                self.candidate_limit,
+                shared,
+                key=lambda pid: (shared[pid], -abs(int(self.products[pid]["price_inr"]) - price), pid),
+            ))
+        found: Set[str] = set()
+        band = self.band(price)
+        for b in (band, band - 1, band + 1):
+            found |= self._bands.get(b, set())
+        found.discard(exclude)
+        if len(found) > self.candidate_limit:
+            found = set(heapq.nsmallest(self.candidate_limit, found, key=lambda pid: abs(int(self.products[pid]["price_inr"]) - price)))
+        return found
+
+    def similarity(self, terms: Dict[str, Set[str]], price: int, other_id: str) -> float:
+        other = self._terms[other_id]
+        score = 0.0
+        for attr, weight in ATTRIBUTE_WEIGHTS.items():
+            union = terms[attr] | other[attr]
+            if not union:
+                continue
+            shared = terms[attr] & other[attr]
+            score += weight * sum(self._idf(attr, t) for t in shared) / sum(self._idf(attr, t) for t in union)
+        delta = abs(int(self.products[other_id]["price_inr"]) - price)
+        return score + PRICE_WEIGHT / (1.0 + delta / self.price_band)
+
+    def neighbors(self, product: Dict[str, Any], k: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Returns up to k (product_id, score) pairs, most similar first."""
+        terms = {attr: _terms(product[attr]) for attr in SET_ATTRIBUTES}
+        price = int(product["price_inr"])
+        candidates = self._candidates(terms, price, exclude)
+        scored = ((pid, self.similarity(terms, price, pid)) for pid in candidates)
+        return [(pid, round(s, 4)) for pid, s in heapq.nlargest(k, scored, key=lambda x: (x[1], x[0]))]
+
+    def neighbors_of(self, product_id: str, k: int = 5) -> List[Tuple[str, float]]:
+        return self.neighbors(self.products[product_id], k=k, exclude=product_id)
+
+    def all_neighbors(self, k: int = 5) -> Dict[str, List[Tuple[str, float]]]:
+        return {pid: self.neighbors_of(pid, k) for pid in self.products}
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from config import COMPETITOR_POOL_PATH, COMPETITOR_REUSE_MIN, COMPETITOR_PRICE_TOLERANCE
+from llm_provider import LocalEmbedder
+from observability import log_event
+
+CATEGORIES = (
+    "sunscreen", "serum", "moisturizer", "cream", "cleanser", "face wash", "toner",
+    "mask", "oil", "lotion", "gel", "exfoliant", "essence", "balm", "mist",
+)
+
+
+def category_of(product: Dict[str, Any]) -> str:
+    name = str(product.get("product_name", "")).lower()
+    for category in CATEGORIES:
+        if re.search(rf"\b{category}s?\b", name):
+            return category
+    return "other"
+
+
+def profile_text(product: Dict[str, Any]) -> str:
+    """Text a competitor is matched on: what it is and does, not what it is called."""
+    parts = [str(product.get("concentration", ""))]
+    for field in ("key_ingredients", "benefits", "skin_type"):
+        parts.extend(str(v) for v in product.get(field, []))
+    return " ".join(parts)
+
+
+class CompetitorPool:
+    """Persistent store of generated competitors, reused by embedding similarity within a category and price range."""
+
+    def __init__(
+        self,
+        path: str = COMPETITOR_POOL_PATH,
+        embedder: Optional[LocalEmbedder] = None,
+        min_similarity: float = COMPETITOR_REUSE_MIN,
+        price_tolerance: float = COMPETITOR_PRICE_TOLERANCE,
+    ):
+        self.path = path
+        self.embedder = embedder or LocalEmbedder()
+        self.min_similarity = min_similarity
+        self.price_tolerance = price_tolerance
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._matrices: Dict[str, Tuple[int, np.ndarray, np.ndarray, List[Dict[str, Any]]]] = {}
+        self.counters = {"reused": 0, "misses": 0, "added": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS competitors ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, category TEXT NOT NULL, price_inr INTEGER NOT NULL, "
+                "product TEXT NOT NULL, embedding BLOB NOT NULL, source TEXT, created REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS competitors_category ON competitors(category, price_inr)")
+            conn.commit()
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _category_matrix(self, category: str) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        conn = self._conn()
+        latest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM competitors WHERE category = ?", (category,)).fetchone()[0]
+        with self._lock:
+            cached = self._matrices.get(category)
+            if cached is not None and cached[0] == latest:
+                return cached[1], cached[2], cached[3]
+        rows = conn.execute("SELECT price_inr, product, embedding FROM competitors WHERE category = ? ORDER BY id", (category,)).fetchall()
+        prices = np.asarray([r[0] for r in rows], dtype=np.int64)
+        products = [json.loads(r[1]) for r in rows]
+        matrix = (
+            np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+            if rows else np.zeros((0, self.embedder.dim), dtype=np.float32)
+        )
+        with self._lock:
+            self._matrices[category] = (latest, matrix, prices, products)
+        return matrix, prices, products
+
+    def nearest(self, base: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Returns the stored competitor closest to base, or None if none is close enough."""
+        matrix, prices, products = self._category_matrix(category_of(base))
+        price = int(base["price_inr"])
+        if len(products):
+            allowed = np.abs(prices - price) <= self.price_tolerance * max(price, 1)
+            names = np.asarray([p["product_name"] != base["product_name"] for p in products])
+            scores = np.where(allowed & names, matrix @ self.embedder._vec(profile_text(base)), -1.0)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.min_similarity:
+                with self._lock:
+                    self.counters["reused"] += 1
+                return dict(products[best])
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def add(self, competitors: List[Dict[str, Any]], source: Optional[Dict[str, Any]] = None) -> None:
+        if not competitors:
+            return
+        vectors = self.embedder.embed_matrix([profile_text(c) for c in competitors]).astype(np.float32)
+        category = category_of(source) if source is not None else None
+        now = time.time()
+        conn = self._conn()
+        conn.executemany(
+            "INSERT INTO competitors (category, price_inr, product, embedding, source, created) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    category or category_of(c),
+                    int(c["price_inr"]),
+                    json.dumps(c, ensure_ascii=False),
+                    vec.tobytes(),
+                    source.get("product_name") if source else None,
+                    now,
+                )
+                for c, vec in zip(competitors, vectors)
+            ],
+        )
+        conn.commit()
+        with self._lock:
+            self.counters["added"] += len(competitors)
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM competitors").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "size": len(self)}
+
+    def log_stats(self) -> None:
+        log_event({"type": "competitor_pool", "ts": time.time(), "pid": os.getpid(), **self.stats()})
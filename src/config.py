@@ -9,3 +9,80 @@ QA_MIN_COUNT = int(os.getenv("QA_MIN_COUNT", "15"))
 SCHEMA_VERSION = os.getenv("SCHEMA_VERSION", "1.0")
 
 LOG_PATH = os.getenv("LOG_PATH", "logs/run.jsonl")
+LOG_BUFFERED = os.getenv("LOG_BUFFERED", "1") not in ("0", "false", "False", "")
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "10000"))
+LOG_FLUSH_INTERVAL_S = float(os.getenv("LOG_FLUSH_INTERVAL_S", "1.0"))
+METRICS_SAMPLE_SIZE = int(os.getenv("METRICS_SAMPLE_SIZE", "4096"))
+# Comma-separated profiling modes for agent spans: cpu, alloc, stacks (or 1 for all). Empty disables profiling.
+PROFILE = os.getenv("PROFILE", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", "outputs/batch")
+
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Ask backends to keep the KV cache of shared prompt prefixes: cache_prompt for llama.cpp-style servers,
+# keep_alive for Ollama so the loaded model (and its cache) survives between products. Off by default: turn it
+# on only for backends known to cache prefixes, since FAQ answer prompts then carry the product prefix too.
+LLM_PROMPT_CACHE = os.getenv("LLM_PROMPT_CACHE", "0") not in ("0", "false", "False", "")
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")
+
+FAQ_MODE = os.getenv("FAQ_MODE", "llm")
+
+LLM_CACHE = os.getenv("LLM_CACHE", "1") not in ("0", "false", "False", "")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+
+LLM_STREAM = os.getenv("LLM_STREAM", "0") not in ("0", "false", "False", "")
+
+INCREMENTAL = os.getenv("INCREMENTAL", "0") not in ("0", "false", "False", "")
+INCREMENTAL_PATH = os.getenv("INCREMENTAL_PATH", ".cache/incremental.sqlite")
+
+LLM_SCHEDULER = os.getenv("LLM_SCHEDULER", "0") not in ("0", "false", "False", "")
+LLM_BACKEND_CONCURRENCY = int(os.getenv("LLM_BACKEND_CONCURRENCY", "4"))
+
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEALTH_RECHECK_S = float(os.getenv("LLM_HEALTH_RECHECK_S", "30"))
+
+FAQ_FAST_PATH = os.getenv("FAQ_FAST_PATH", "1") not in ("0", "false", "False", "")
+
+OUTPUT_SHARDS = int(os.getenv("OUTPUT_SHARDS", "16"))
+OUTPUT_COMPRESS = os.getenv("OUTPUT_COMPRESS", "0") not in ("0", "false", "False", "")
+
+CATALOG_PRICE_BAND_INR = int(os.getenv("CATALOG_PRICE_BAND_INR", "250"))
+COMPARE_TOP_K = int(os.getenv("COMPARE_TOP_K", "0"))
+
+COMPETITOR_POOL = os.getenv("COMPETITOR_POOL", "0") not in ("0", "false", "False", "")
+COMPETITOR_POOL_PATH = os.getenv("COMPETITOR_POOL_PATH", ".cache/competitors.sqlite")
+COMPETITOR_REUSE_MIN = float(os.getenv("COMPETITOR_REUSE_MIN", "0.6"))
+COMPETITOR_PRICE_TOLERANCE = float(os.getenv("COMPETITOR_PRICE_TOLERANCE", "0.3"))
+COMPETITOR_BATCH_SIZE = int(os.getenv("COMPETITOR_BATCH_SIZE", "3"))
+COMPETITOR_RETRIES = int(os.getenv("COMPETITOR_RETRIES", "2"))
+
+SIMILARITY_BACKEND = os.getenv("SIMILARITY_BACKEND", "numpy")
+QUESTION_DEDUP_MIN = float(os.getenv("QUESTION_DEDUP_MIN", "0.85"))
+FAQ_GROUNDING_CHECK = os.getenv("FAQ_GROUNDING_CHECK", "0") not in ("0", "false", "False", "")
+
+LLM_HEALTH_TTL_S = float(os.getenv("LLM_HEALTH_TTL_S", "300"))
+LLM_HEALTH_PATH = os.getenv("LLM_HEALTH_PATH", ".cache/llm_health.json")
+
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "64"))
+SERVICE_BATCH_SIZE = int(os.getenv("SERVICE_BATCH_SIZE", "8"))
+SERVICE_BATCH_WAIT_MS = float(os.getenv("SERVICE_BATCH_WAIT_MS", "10"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+SERVICE_TIMEOUT_S = float(os.getenv("SERVICE_TIMEOUT_S", "300"))
+
+# Persist graph state after every node so failed or interrupted products resume instead of re-calling the model.
+CHECKPOINT = os.getenv("CHECKPOINT", "0") not in ("0", "false", "False", "")
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+RUN_ID = os.getenv("RUN_ID", "")
+
+# Run the CLI pipeline through the async graph (ainvoke), answering FAQ questions FAQ_CONCURRENCY at a time.
+ASYNC_GRAPH = os.getenv("ASYNC_GRAPH", "0") not in ("0", "false", "False", "")
+FAQ_CONCURRENCY = int(os.getenv("FAQ_CONCURRENCY", "8"))
@@ -0,0 +1,104 @@
+import json
+import time
+import hashlib
+from typing import Dict, Any, Callable, Iterable, Optional, Tuple
+from config import INCREMENTAL_PATH
+from llm_cache import LLMCache
+from observability import log_event
+
+MEMO_VERSION = "1"
+
+PRODUCT_FIELDS = (
+    "product_name",
+    "concentration",
+    "skin_type",
+    "key_ingredients",
+    "benefits",
+    "how_to_use",
+    "side_effects",
+    "price_inr",
+)
+
+# Product fields each memoized node reads. Price is deliberately absent from the
+# LLM-backed nodes: a price edit must not re-invent questions or the competitor.
+NODE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "questions": ("product_name", "concentration", "skin_type", "key_ingredients", "benefits", "how_to_use", "side_effects"),
+    "competitor": ("product_name", "concentration", "skin_type", "key_ingredients", "benefits"),
+}
+
+
+def fingerprint(name: str, inputs: Dict[str, Any]) -> str:
+    body = json.dumps({"v": MEMO_VERSION, "name": name, "inputs": inputs}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def field_values(product: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    return {f: product.get(f) for f in fields}
+
+
+class NodeMemo:
+    """Reuses LLM-backed node outputs (questions, competitor, FAQ answers) whose input fields did not change.
+
+    Logic blocks and documentation are cheap and deterministic, so they are recomputed rather than looked up."""
+
+    def __init__(self, store: Optional[LLMCache] = None):
+        self.store = store or LLMCache(path=INCREMENTAL_PATH, ttl_s=float("inf"))
+
+    def _get(self, key: str) -> Any:
+        text = self.store.get(key)
+        return None if text is None else json.loads(text)
+
+    def _put(self, key: str, value: Any) -> None:
+        self.store.put(key, json.dumps(value, ensure_ascii=False))
+
+    def _record(self, kind: str, name: str, product: Dict[str, Any], reused: bool) -> None:
+        log_event({
+            "type": "memo",
+            "kind": kind,
+            "name": name,
+            "product": product.get("product_name"),
+            "reused": reused,
+            "ts": time.time(),
+        })
+
+    def node(
+        self,
+        name: str,
+        product: Dict[str, Any],
+        compute: Callable[[], Any],
+        extra: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        key = fingerprint(name, {**field_values(product, NODE_FIELDS[name]), **(extra or {})})
+        cached = self._get(key)
+        if cached is not None:
+            self._record("node", name, product, True)
+            return cached
+        value = compute()
+        self._put(key, value)
+        self._record("node", name, product, False)
+        return value
+
+    def _faq_key(self, product: Dict[str, Any], item: Dict[str, Any]) -> str:
+        return fingerprint("faq", {
+            "product_name": product["product_name"],
+            "category": item["category"],
+            "question": item["question"],
+        })
+
+    def faq_lookup(self, product: Dict[str, Any], item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        record = self._get(self._faq_key(product, item))
+        if record is None:
+            return None
+        field = record["entry"].get("source_field")
+        if field not in PRODUCT_FIELDS or record["value_fp"] != fingerprint("field", {field: product.get(field)}):
+            return None
+        self._record("faq", field, product, True)
+        return record["entry"]
+
+    def faq_store(self, product: Dict[str, Any], item: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        field = entry.get("source_field")
+        self._put(self._faq_key(product, item), {
+            "entry": entry,
+            "value_fp": fingerprint("field", {field: product.get(field)}),
+        })
+        self._record("faq", str(field), product, False)
@@ -0,0 +1,100 @@
+import json
+from typing import Any, List, Optional
+
+
+class JSONStreamParser:
+    """Incrementally scans streamed text for the first complete top-level JSON object.
+
+    Elements of the array stored under ``array_key`` in that object are decoded and
+    returned by ``feed`` as soon as each one closes, before the whole object arrives.
+    """
+
+    def __init__(self, array_key: Optional[str] = "items"):
+        self.array_key = array_key
+        self.text = ""
+        self.done = False
+        self.value: Any = None
+        self._pos = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_key: Optional[str] = None
+        self._tracking = False
+        self._elem_start = -1
+
+    def _emit(self, end: int, out: List[Any]) -> None:
+        raw = self.text[self._elem_start:end].strip()
+        self._elem_start = -1
+        if raw:
+            out.append(json.loads(raw))
+
+    def feed(self, chunk: str) -> List[Any]:
+        out: List[Any] = []
+        if self.done:
+            return out
+        self.text += chunk
+        text = self.text
+        i = self._pos
+        while i < len(text):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+            elif self._start < 0:
+                if c == "{":
+                    self._start = i
+                    self._depth = 1
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._tracking and self._depth == 2 and self._elem_start < 0:
+                    self._elem_start = i
+            elif c in "{[":
+                if self._tracking and self._depth == 2 and self._elem_start < 0:
+                    self._elem_start = i
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self.array_key is not None and self._last_key == self.array_key:
+                    self._tracking = True
+            elif c in "}]":
+                self._depth -= 1
+                if self._tracking:
+                    if self._depth == 1:
+                        if self._elem_start >= 0:
+                            self._emit(i, out)
+                        self._tracking = False
+                    elif self._depth == 2 and self._elem_start >= 0:
+                        self._emit(i + 1, out)
+                if self._depth == 0:
+                    self.done = True
+                    self.value = json.loads(text[self._start:i + 1])
+                    self._pos = i + 1
+                    return out
+            elif self._tracking and self._depth == 2:
+                if c == ",":
+                    if self._elem_start >= 0:
+                        self._emit(i, out)
+                elif not c.isspace() and self._elem_start < 0:
+                    self._elem_start = i
+            i += 1
+        self._pos = i
+        return out
+
+    def json_text(self) -> str:
+        return self.text[self._start:self._pos] if self.done else ""
+
+
+def extract_json(text: str) -> Any:
+    """Returns the first complete top-level JSON object embedded in text."""
+    parser = JSONStreamParser(array_key=None)
+    parser.feed(text)
+    if not parser.done:
+        raise ValueError("No complete JSON object found in LLM response")
+    return parser.value
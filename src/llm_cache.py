@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from config import (
+    LLM_CACHE,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_S,
+)
+from observability import log_event
+
+_CACHE: Optional["LLMCache"] = None
+_CACHE_LOCK = threading.Lock()
+_ENABLED = LLM_CACHE
+
+
+class LLMCache:
+    """Two-tier (in-memory LRU + SQLite) cache of LLM responses keyed by request content."""
+
+    EVICT_EVERY = 256
+
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_s: float = LLM_CACHE_TTL_S,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._puts = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(kind: str, model: str, prompt: str, params: Dict[str, Any]) -> str:
+        body = json.dumps({"kind": kind, "model": model, "prompt": prompt, "params": params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            conn.commit()
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return value
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or now - row[1] > self.ttl_s:
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        conn.commit()
+        self._remember(key, row[0])
+        with self._lock:
+            self.counters["disk_hits"] += 1
+        return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        self._remember(key, value)
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        conn.commit()
+        with self._lock:
+            self.counters["writes"] += 1
+            self._puts += 1
+            due = self._puts % self.EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_s,)).rowcount
+        removed += conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        conn.commit()
+        with self._lock:
+            self.counters["evictions"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {**counters, "hits": hits, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+
+    def log_stats(self) -> None:
+        log_event({"type": "llm_cache", "ts": time.time(), "pid": os.getpid(), **self.stats()})
+
+
+def configure_cache(enabled: bool, path: Optional[str] = None) -> None:
+    """Overrides LLM_CACHE/LLM_CACHE_PATH for this process, e.g. for benchmarks."""
+    global _CACHE, _ENABLED
+    with _CACHE_LOCK:
+        _ENABLED = enabled
+        _CACHE = LLMCache(path=path) if enabled and path else None
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Returns the process-wide response cache, or None when caching is disabled."""
+    global _CACHE
+    if not _ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = LLMCache()
+    return _CACHE
@@ -1,35 +1,85 @@
 import os
 import re
 import json
-import math
-from typing import List, Tuple, Dict, Any
+import hashlib
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, Iterable
+import numpy as np
+from prompts import product_of
+
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def _bucket(token: str, dim: int) -> int:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % dim
 
 
 class LocalEmbedder:
-    def __init__(self, dim: int = 256):
+    """Hashed bag-of-words embedder; buckets use a stable hash so vectors match across processes."""
+
+    def __init__(self, dim: int = 256, stopwords: Iterable[str] = ()):
         self.dim = dim
+        self.stopwords = frozenset(stopwords)
+
+    def embed_matrix(self, texts: List[str]) -> np.ndarray:
+        rows: List[int] = []
+        cols: List[int] = []
+        for i, text in enumerate(texts):
+            for tok in _TOKEN_RE.findall(text.lower()):
+                if tok in self.stopwords:
+                    continue
+                rows.append(i)
+                cols.append(_bucket(tok, self.dim))
+        flat = np.asarray(rows, dtype=np.int64) * self.dim + np.asarray(cols, dtype=np.int64)
+        counts = np.bincount(flat, minlength=len(texts) * self.dim).astype(np.float32)
+        matrix = counts.reshape(len(texts), self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
 
-    def _vec(self, text: str) -> List[float]:
-        buckets = [0.0] * self.dim
-        for tok in re.findall(r"\w+", text.lower()):
-            h = hash(tok) % self.dim
-            buckets[h] += 1.0
-        norm = math.sqrt(sum(x * x for x in buckets)) or 1.0
-        return [x / norm for x in buckets]
+    def _vec(self, text: str) -> np.ndarray:
+        return self.embed_matrix([text])[0]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [self._vec(t) for t in texts]
+        return self.embed_matrix(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        return self._vec(text)
+        return self._vec(text).tolist()
+
+    def score(self, query: str, matrix: np.ndarray) -> np.ndarray:
+        return matrix @ self._vec(query)
+
+
+def _line_value(content: str, prefix: str) -> str:
+    for line in content.splitlines():
+        if line.startswith(prefix):
+            return line[len(prefix):]
+    return ""
+
+
+def _fields(product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{k: ", ".join(v) if isinstance(v, list) else v} for k, v in product.items() if k != "schema_version"]
 
 
 class LocalLLM:
+    """Deterministic stand-in model that answers the pipeline's prompts from their own inputs."""
+
+    def __init__(self, embedder: "LocalEmbedder | None" = None):
+        self.embedder = embedder or LocalEmbedder()
+
+    def _best_field(self, fields: List[Dict[str, Any]], question: str) -> Tuple[str, str]:
+        pairs = [(k, str(v)) for entry in fields for k, v in entry.items()]
+        matrix = self.embedder.embed_matrix([f"{k.replace('_', ' ')}: {v}" for k, v in pairs])
+        best = int(np.argmax(self.embedder.score(question, matrix)))
+        return pairs[best]
+
     def invoke(self, messages: List[Dict[str, Any]] | List[Any]) -> Any:
         content = messages[-1].content if hasattr(messages[-1], "content") else messages[-1]["content"]
         if "Create at least 15" in content and "Product data:" in content:
-            start = content.rfind("Product data:")
-            data = json.loads(content[start + len("Product data: "):])
+            data = product_of(content)
             name = data.get("product_name", "Product")
             items = []
             def q(cat, text): items.append({"category": cat, "question": text})
@@ -55,6 +105,28 @@ class LocalLLM:
             val_line = [l for l in lines if l.startswith("Value: ")]
             value = val_line[0].split("Value: ", 1)[1] if val_line else ""
             return type("R", (), {"content": value})
+        if "Choose the most relevant" in content:
+            field, value = self._best_field(_fields(product_of(content)), _line_value(content, "Question: "))
+            return type("R", (), {"content": json.dumps({"field": field, "answer": value}, ensure_ascii=False)})
+        if "Answer every question" in content:
+            fields = _fields(product_of(content))
+            answers = []
+            for q in json.loads(_line_value(content, "Questions: ")):
+                field, value = self._best_field(fields, q["question"])
+                answers.append({"index": q["index"], "field": field, "answer": value})
+            return type("R", (), {"content": json.dumps({"answers": answers}, ensure_ascii=False)})
+        many = re.search(r"Invent (\d+) realistic competitor products", content)
+        if many and "Product data:" in content:
+            base = product_of(content)
+            rivals = [
+                {**base, "product_name": f"Rival {i} {base.get('product_name', 'Product')}", "price_inr": int(base.get("price_inr", 0)) + 100 * i}
+                for i in range(1, int(many.group(1)) + 1)
+            ]
+            return type("R", (), {"content": json.dumps({"items": rivals}, ensure_ascii=False)})
+        if "Invent a realistic competitor" in content and "Product data:" in content:
+            base = product_of(content)
+            rival = {**base, "product_name": f"Rival {base.get('product_name', 'Product')}", "price_inr": int(base.get("price_inr", 0)) + 100}
+            return type("R", (), {"content": json.dumps(rival, ensure_ascii=False)})
         return type("R", (), {"content": ""})
 
 
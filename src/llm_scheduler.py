@@ -0,0 +1,117 @@
+import os
+import time
+import queue
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import Dict, Any, Iterator, List, Optional
+from config import LLM_BACKEND_CONCURRENCY
+from llm_cache import LLMCache
+from observability import record_latency, io_wait
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 5
+PRIORITY_BULK = 10
+
+_PRIORITY: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=PRIORITY_NORMAL)
+
+
+@contextmanager
+def priority_scope(priority: int) -> Iterator[None]:
+    """Sets the default priority of LLM calls made from this context."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+class LLMScheduler:
+    """Queues LLM calls for a provider: coalesces identical in-flight requests,
+    caps concurrent calls per backend and serves the lowest priority number first."""
+
+    def __init__(self, provider: Any, max_concurrency: int = LLM_BACKEND_CONCURRENCY):
+        self.provider = provider
+        # max_concurrency is per backend: the provider's pool enforces it for each base, and there are
+        # enough workers to keep every base at its cap.
+        self.per_backend = max_concurrency
+        self.max_concurrency = max_concurrency * max(1, len(getattr(provider, "bases", ())))
+        pool = getattr(provider, "pool", None)
+        if pool is not None:
+            pool.max_inflight = max_concurrency
+        self._queue: "queue.PriorityQueue[tuple]" = queue.PriorityQueue()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._pid = os.getpid()
+        self.counters = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "peak_queue_depth": 0}
+
+    def _ensure_workers(self) -> None:
+        if self._pid != os.getpid():
+            # Worker threads do not survive a fork; start a fresh queue in the child.
+            self._pid = os.getpid()
+            self._queue = queue.PriorityQueue()
+            self._inflight = {}
+            self._lock = threading.Lock()
+            self._workers = []
+        if len(self._workers) >= self.max_concurrency:
+            return
+        with self._lock:
+            while len(self._workers) < self.max_concurrency:
+                t = threading.Thread(target=self._work, name=f"llm-scheduler-{len(self._workers)}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def submit(self, prompt: str, priority: Optional[int] = None, temperature: float = 0) -> Future:
+        self._ensure_workers()
+        priority = _PRIORITY.get() if priority is None else priority
+        key = LLMCache.make_key(self.provider.kind, self.provider.model, prompt, {"temperature": temperature})
+        with self._lock:
+            self.counters["submitted"] += 1
+            if temperature == 0 and key in self._inflight:
+                self.counters["coalesced"] += 1
+                return self._inflight[key]
+            fut: Future = Future()
+            if temperature == 0:
+                self._inflight[key] = fut
+            self._queue.put((priority, next(self._seq), time.perf_counter(), key, prompt, temperature, fut))
+            self.counters["peak_queue_depth"] = max(self.counters["peak_queue_depth"], self._queue.qsize())
+        return fut
+
+    def _work(self) -> None:
+        while True:
+            priority, _, enqueued, key, prompt, temperature, fut = self._queue.get()
+            record_latency("llm.queue_wait", (time.perf_counter() - enqueued) * 1000)
+            try:
+                result = self.provider.chat_json(prompt, temperature=temperature)
+            except Exception as e:
+                with self._lock:
+                    self.counters["failed"] += 1
+                    self._inflight.pop(key, None)
+                fut.set_exception(e)
+            else:
+                with self._lock:
+                    self.counters["completed"] += 1
+                    self._inflight.pop(key, None)
+                fut.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    def chat_json(self, prompt: str, temperature: float = 0, priority: Optional[int] = None) -> str:
+        fut = self.submit(prompt, priority=priority, temperature=temperature)
+        with io_wait():
+            return fut.result()
+
+    async def achat_json(self, prompt: str, temperature: float = 0, priority: Optional[int] = None) -> str:
+        return await asyncio.wrap_future(self.submit(prompt, priority=priority, temperature=temperature))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "queue_depth": self._queue.qsize(), "inflight": len(self._inflight)}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.provider, name)
@@ -1,72 +1,342 @@
-import os
-import json
-import time
-from typing import Dict, Any, Optional
-import requests
-
-
-class ConfigurationError(RuntimeError):
-    pass
-
-
-class LocalLLMProvider:
-    def __init__(self):
-        kind = os.getenv("LOCAL_LLM_KIND", "").strip().lower()
-        base = os.getenv("LOCAL_LLM_URL", "").strip()
-        model = os.getenv("LOCAL_LLM_MODEL", "").strip()
-        if not kind or not base or not model:
-            raise ConfigurationError("LOCAL_LLM_KIND, LOCAL_LLM_URL, LOCAL_LLM_MODEL must be set")
-        self.kind = kind
-        self.base = base.rstrip("/")
-        self.model = model
-
-    def ping(self) -> None:
-        try:
-            if self.kind == "ollama":
-                r = requests.get(f"{self.base}/api/tags", timeout=3)
-                if r.status_code != 200:
-                    raise ConfigurationError(f"Ollama not available: {r.status_code}")
-            elif self.kind in ("lmstudio", "openai-compatible", "llamacpp"):
-                r = requests.get(f"{self.base}/v1/models", timeout=3)
-                if r.status_code != 200:
-                    raise ConfigurationError(f"OpenAI-compatible server not available: {r.status_code}")
-            else:
-                raise ConfigurationError(f"Unsupported LOCAL_LLM_KIND: {self.kind}")
-        except Exception as e:
-            raise ConfigurationError(f"Local LLM unavailable: {e}")
-
-    def chat_json(self, prompt: str) -> str:
-        if self.kind == "ollama":
-            payload = {"model": self.model, "prompt": prompt, "stream": False}
-            r = requests.post(f"{self.base}/api/generate", json=payload, timeout=60)
-            if r.status_code != 200:
-                raise RuntimeError(f"Ollama chat error: {r.text}")
-            data = r.json()
-            return data.get("response", "")
-        else:
-            payload = {
-                "model": self.model,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0,
-            }
-            r = requests.post(f"{self.base}/v1/chat/completions", json=payload, timeout=60)
-            if r.status_code != 200:
-                raise RuntimeError(f"Chat error: {r.text}")
-            data = r.json()
-            return data["choices"][0]["message"]["content"]
-
-    def ensure_json(self, text: str) -> Dict[str, Any]:
-        try:
-            return json.loads(text)
-        except Exception:
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            return json.loads(text[start:end])
-
-
-def is_local_llm_available() -> bool:
-    try:
-        LocalLLMProvider().ping()
-        return True
-    except Exception:
-        return False
+import os
+import json
+import time
+import asyncio
+import weakref
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Iterator, Callable
+from config import LLM_TIMEOUT_S, LLM_POOL_SIZE, LLM_MAX_CONCURRENCY, LLM_SCHEDULER, LLM_HEALTH_TTL_S, LLM_HEALTH_PATH, LLM_PROMPT_CACHE, LLM_KEEP_ALIVE
+from llm_cache import LLMCache, get_cache
+from json_stream import JSONStreamParser, extract_json
+from backend_pool import BackendPool
+from output_sink import atomic_write
+from observability import io_wait
+
+if TYPE_CHECKING:
+    import requests
+
+
+class ConfigurationError(RuntimeError):
+    pass
+
+
+_SESSION: Optional["requests.Session"] = None
+_SESSION_PID: Optional[int] = None
+_SESSION_LOCK = threading.Lock()
+_PROVIDER: Optional["LocalLLMProvider"] = None
+_PROVIDER_LOCK = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """Returns the process-wide keep-alive session, recreated after a fork."""
+    global _SESSION, _SESSION_PID
+    pid = os.getpid()
+    if _SESSION is None or _SESSION_PID != pid:
+        with _SESSION_LOCK:
+            if _SESSION is None or _SESSION_PID != pid:
+                # requests is imported on first use; it is a noticeable share of CLI startup.
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=LLM_POOL_SIZE, pool_maxsize=LLM_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _SESSION, _SESSION_PID = session, pid
+    return _SESSION
+
+
+class LocalLLMProvider:
+    PREFETCH_LIMIT = 64
+
+    def __init__(
+        self,
+        kind: Optional[str] = None,
+        base: Optional[str] = None,
+        model: Optional[str] = None,
+        bases: Optional[List[str]] = None,
+    ):
+        kind = (kind if kind is not None else os.getenv("LOCAL_LLM_KIND", "")).strip().lower()
+        model = (model if model is not None else os.getenv("LOCAL_LLM_MODEL", "")).strip()
+        if bases is None:
+            # An explicit base wins; the environment is read only when the caller names no backend.
+            if base is not None:
+                bases = [base.strip()] if base.strip() else []
+            else:
+                base = os.getenv("LOCAL_LLM_URL", "").strip()
+                bases = [u.strip() for u in os.getenv("LOCAL_LLM_URLS", "").split(",") if u.strip()] or ([base] if base else [])
+        if not kind or not bases or not model:
+            raise ConfigurationError("LOCAL_LLM_KIND, LOCAL_LLM_URL (or LOCAL_LLM_URLS), LOCAL_LLM_MODEL must be set")
+        self.kind = kind
+        self.bases = [b.rstrip("/") for b in bases]
+        self.base = self.bases[0]
+        self.model = model
+        self.pool = BackendPool(self.bases, self._check_backend)
+        # Keyed by the loop itself: each asyncio.run gets a fresh semaphore, and a closed loop's id can be reused.
+        self._async_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._prefetched: "OrderedDict[str, Future]" = OrderedDict()
+        self._prefetch_lock = threading.Lock()
+        self.usage = {"calls": 0, "prompt_tokens_evaluated": 0}
+        self._usage_lock = threading.Lock()
+
+    def _check_backend(self, base: str) -> None:
+        session = get_session()
+        try:
+            if self.kind == "ollama":
+                r = session.get(f"{base}/api/tags", timeout=3)
+                if r.status_code != 200:
+                    raise ConfigurationError(f"Ollama not available: {r.status_code}")
+            elif self.kind in ("lmstudio", "openai-compatible", "llamacpp"):
+                r = session.get(f"{base}/v1/models", timeout=3)
+                if r.status_code != 200:
+                    raise ConfigurationError(f"OpenAI-compatible server not available: {r.status_code}")
+            else:
+                raise ConfigurationError(f"Unsupported LOCAL_LLM_KIND: {self.kind}")
+        except Exception as e:
+            raise ConfigurationError(f"Local LLM unavailable: {e}")
+
+    def ping(self) -> None:
+        if len(self.bases) == 1:
+            self._check_backend(self.base)
+            return
+        if not self.pool.check_all():
+            raise ConfigurationError(f"Local LLM unavailable: no healthy backend among {', '.join(self.bases)}")
+
+    def prefetch(self, prompt: str, temperature: float = 0) -> None:
+        """Starts a call in the background; a later chat_json with the same request waits for it instead.
+
+        Past PREFETCH_LIMIT unclaimed calls the oldest is dropped, so prefetches nobody asked for never block new ones.
+        """
+        key = LLMCache.make_key(self.kind, self.model, prompt, {"temperature": temperature})
+        fut: Future = Future()
+        with self._prefetch_lock:
+            if key in self._prefetched:
+                return
+            while len(self._prefetched) >= self.PREFETCH_LIMIT:
+                self._prefetched.popitem(last=False)
+            self._prefetched[key] = fut
+
+        def work() -> None:
+            try:
+                fut.set_result(self._chat_json(prompt, temperature))
+            except BaseException as e:
+                fut.set_exception(e)
+
+        threading.Thread(target=work, name="llm-prefetch", daemon=True).start()
+
+    def chat_json(self, prompt: str, temperature: float = 0) -> str:
+        if self._prefetched:
+            with self._prefetch_lock:
+                fut = self._prefetched.pop(LLMCache.make_key(self.kind, self.model, prompt, {"temperature": temperature}), None)
+            if fut is not None:
+                try:
+                    with io_wait():
+                        return fut.result()
+                except Exception:
+                    pass
+        return self._chat_json(prompt, temperature)
+
+    def _chat_json(self, prompt: str, temperature: float) -> str:
+        params = {"temperature": temperature}
+        cache = get_cache() if temperature == 0 else None
+        if cache is not None:
+            key = LLMCache.make_key(self.kind, self.model, prompt, params)
+            hit = cache.get(key)
+            if hit is not None:
+                return hit
+        with io_wait():
+            text = self._generate(prompt, params)
+        if cache is not None:
+            cache.put(key, text)
+        return text
+
+    def _generate(self, prompt: str, params: Dict[str, Any]) -> str:
+        return self.pool.call(lambda base: self._generate_at(base, prompt, params))
+
+    def _generate_at(self, base: str, prompt: str, params: Dict[str, Any]) -> str:
+        session = get_session()
+        if self.kind == "ollama":
+            payload = {"model": self.model, "prompt": prompt, "stream": False, "options": dict(params), **self._cache_options()}
+            r = session.post(f"{base}/api/generate", json=payload, timeout=LLM_TIMEOUT_S)
+            if r.status_code != 200:
+                raise RuntimeError(f"Ollama chat error: {r.text}")
+            data = r.json()
+            self._record_usage(data)
+            return data.get("response", "")
+        else:
+            payload = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                **params,
+                **self._cache_options(),
+            }
+            r = session.post(f"{base}/v1/chat/completions", json=payload, timeout=LLM_TIMEOUT_S)
+            if r.status_code != 200:
+                raise RuntimeError(f"Chat error: {r.text}")
+            data = r.json()
+            self._record_usage(data)
+            return data["choices"][0]["message"]["content"]
+
+    def _cache_options(self) -> Dict[str, Any]:
+        if not LLM_PROMPT_CACHE:
+            return {}
+        return {"keep_alive": LLM_KEEP_ALIVE} if self.kind == "ollama" else {"cache_prompt": True}
+
+    def _record_usage(self, data: Dict[str, Any]) -> None:
+        """Counts prompt tokens the backend actually evaluated, i.e. excluding any reused prefix cache."""
+        if self.kind == "ollama":
+            evaluated = data.get("prompt_eval_count")
+        else:
+            evaluated = (data.get("timings") or {}).get("prompt_n", (data.get("usage") or {}).get("prompt_tokens"))
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens_evaluated"] += int(evaluated or 0)
+
+    def usage_stats(self) -> Dict[str, Any]:
+        with self._usage_lock:
+            usage = dict(self.usage)
+        usage["prompt_tokens_per_call"] = round(usage["prompt_tokens_evaluated"] / usage["calls"], 1) if usage["calls"] else 0.0
+        return usage
+
+    async def achat_json(self, prompt: str, temperature: float = 0) -> str:
+        loop = asyncio.get_running_loop()
+        limit = self._async_limits.get(loop)
+        if limit is None:
+            limit = self._async_limits.setdefault(loop, asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+        async with limit:
+            return await asyncio.to_thread(self.chat_json, prompt, temperature)
+
+    def stream_text(self, prompt: str, temperature: float = 0) -> Iterator[str]:
+        backend = self.pool.pick()
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield from self._stream_at(backend.url, prompt, temperature)
+            ok = True
+        except GeneratorExit:
+            # The consumer stopped reading (stream_json does once the object is complete); the backend did not fail.
+            ok = True
+            raise
+        finally:
+            self.pool.release(backend, (time.perf_counter() - start) * 1000 if ok else None)
+
+    def _stream_at(self, base: str, prompt: str, temperature: float) -> Iterator[str]:
+        session = get_session()
+        if self.kind == "ollama":
+            payload = {"model": self.model, "prompt": prompt, "stream": True, "options": {"temperature": temperature}, **self._cache_options()}
+            with session.post(f"{base}/api/generate", json=payload, timeout=LLM_TIMEOUT_S, stream=True) as r:
+                if r.status_code != 200:
+                    raise RuntimeError(f"Ollama chat error: {r.text}")
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("response"):
+                        yield data["response"]
+                    if data.get("done"):
+                        self._record_usage(data)
+                        return
+        else:
+            payload = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": temperature,
+                "stream": True,
+                **self._cache_options(),
+            }
+            with session.post(f"{base}/v1/chat/completions", json=payload, timeout=LLM_TIMEOUT_S, stream=True) as r:
+                if r.status_code != 200:
+                    raise RuntimeError(f"Chat error: {r.text}")
+                for line in r.iter_lines():
+                    if not line or not line.startswith(b"data:"):
+                        continue
+                    body = line[len(b"data:"):].strip()
+                    if body == b"[DONE]":
+                        return
+                    choices = json.loads(body).get("choices") or [{}]
+                    piece = (choices[0].get("delta") or {}).get("content")
+                    if piece:
+                        yield piece
+
+    def stream_json(
+        self,
+        prompt: str,
+        on_item: Optional[Callable[[Any], None]] = None,
+        array_key: str = "items",
+        temperature: float = 0,
+    ) -> Dict[str, Any]:
+        """Streams a response, reporting array items as they close, and stops at the end of the first object."""
+        cache = get_cache() if temperature == 0 else None
+        key = LLMCache.make_key(self.kind, self.model, prompt, {"temperature": temperature}) if cache is not None else None
+        hit = cache.get(key) if cache is not None else None
+        if hit is not None:
+            data = self.ensure_json(hit)
+            if on_item is not None:
+                for item in data.get(array_key) or []:
+                    on_item(item)
+            return data
+        parser = JSONStreamParser(array_key=array_key)
+        chunks = self.stream_text(prompt, temperature)
+        try:
+            with io_wait():
+                for chunk in chunks:
+                    for item in parser.feed(chunk):
+                        if on_item is not None:
+                            on_item(item)
+                    if parser.done:
+                        break
+        finally:
+            chunks.close()
+        if not parser.done:
+            raise ValueError("Streamed LLM response ended before a complete JSON object")
+        if cache is not None:
+            cache.put(key, parser.json_text())
+        return parser.value
+
+    def ensure_json(self, text: str) -> Dict[str, Any]:
+        try:
+            return json.loads(text)
+        except Exception:
+            return extract_json(text)
+
+
+def get_provider() -> LocalLLMProvider:
+    """Returns the shared provider, reading the LOCAL_LLM_* environment once per process.
+
+    With LLM_SCHEDULER set, the provider is wrapped in an LLMScheduler that exposes the same interface.
+    """
+    global _PROVIDER
+    if _PROVIDER is None:
+        with _PROVIDER_LOCK:
+            if _PROVIDER is None:
+                provider = LocalLLMProvider()
+                if LLM_SCHEDULER:
+                    from llm_scheduler import LLMScheduler
+                    provider = LLMScheduler(provider)
+                _PROVIDER = provider
+    return _PROVIDER
+
+
+def check_available(provider: Any, ttl_s: float = LLM_HEALTH_TTL_S, path: str = LLM_HEALTH_PATH) -> None:
+    """Pings the provider unless a successful check of the same backends is younger than ttl_s."""
+    key = "|".join([provider.kind, provider.model, *provider.bases])
+    try:
+        with open(path, encoding="utf-8") as f:
+            checks = json.load(f)
+    except (OSError, ValueError):
+        checks = {}
+    if ttl_s > 0 and time.time() - checks.get(key, 0) < ttl_s:
+        return
+    provider.ping()
+    if ttl_s > 0:
+        checks[key] = time.time()
+        atomic_write(path, json.dumps(checks))
+
+
+def is_local_llm_available() -> bool:
+    try:
+        get_provider().ping()
+        return True
+    except Exception:
+        return False
@@ -1,18 +1,16 @@
 import json
+import time
+import asyncio
 from pathlib import Path
-from typing import Dict, Any
-from langgraph.graph import StateGraph, END
-from models import PipelineState, ProductModel, QuestionSet, FAQPage, ProductPage, ComparisonPage
-from agents.product_parsing_agent import ProductParsingAgent
-from agents.question_generation_agent import QuestionGenerationAgent
-from agents.content_logic_block_agent import ContentLogicBlockAgent
-from agents.template_engine_agent import TemplateEngineAgent
-from agents.fictional_product_agent import FictionalProductAgent
-from agents.page_assembly_agent import PageAssemblyAgent
-from agents.documentation_agent import DocumentationAgent
-from validation_agent import FinalValidationAgent
-from observability import agent_span
-from local_llm import LocalLLMProvider, ConfigurationError
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable
+from models import PipelineState
+from observability import agent_span, log_event, metrics_snapshot, flush_logs
+from local_llm import get_provider, check_available, ConfigurationError
+from llm_cache import get_cache
+from config import INCREMENTAL, LLM_STREAM, COMPETITOR_POOL, CHECKPOINT, RUN_ID, ASYNC_GRAPH
+from output_sink import write_if_changed
 
 RAW_PRODUCT_DATA = {
     "product_name": "GlowBoost Vitamin C Serum",
@@ -31,15 +29,27 @@ def ensure_dirs():
     Path("docs").mkdir(parents=True, exist_ok=True)
 
 
-def write_json(path: Path, data: dict):
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2))
+def write_json(path: Path, data: dict) -> bool:
+    return write_if_changed(path, json.dumps(data, ensure_ascii=False, indent=2))
 
 
-def run_pipeline():
-    ensure_dirs()
-    llm = LocalLLMProvider()
-    llm.ping()
+def build_graph(incremental: bool = INCREMENTAL, checkpointer: Any = None, use_async: bool = False):
+    """Compiles the pipeline graph; with use_async the LLM-bound nodes are coroutines and the graph must run via ainvoke."""
+    # LangGraph and the agents are imported here rather than at module level: they are
+    # most of the CLI's import time, and the health check and prefetch can overlap it.
+    from langgraph.graph import StateGraph, END
+    from agents.product_parsing_agent import ProductParsingAgent
+    from agents.question_generation_agent import QuestionGenerationAgent
+    from agents.content_logic_block_agent import ContentLogicBlockAgent
+    from agents.template_engine_agent import TemplateEngineAgent
+    from agents.fictional_product_agent import FictionalProductAgent
+    from agents.page_assembly_agent import PageAssemblyAgent
+    from agents.documentation_agent import DocumentationAgent
+    from validation_agent import FinalValidationAgent, VALIDATION_PLAN, validate_stage
+    from incremental import NodeMemo
+
     graph = StateGraph(PipelineState)
+    memo = NodeMemo() if incremental else None
 
     parsing_agent = ProductParsingAgent()
     question_agent = QuestionGenerationAgent()
@@ -51,46 +61,83 @@ def run_pipeline():
     assembly_agent = PageAssemblyAgent(logic_blocks={"impl": runtime_logic}, templates=runtime_templates)
     docs_agent = DocumentationAgent()
     validator = FinalValidationAgent()
+    planned = [kind for kinds in VALIDATION_PLAN.values() for kind in kinds]
 
     def node_parse(state: PipelineState) -> PipelineState:
         with agent_span("ProductParsingAgent"):
             pm = parsing_agent.run(state["raw"])
-        ProductModel.model_validate(pm)
-        return PipelineState.model_validate({**state.model_dump(), "product_model": pm})
+        validate_stage("parse", {"product_model": pm})
+        return {"product_model": pm}
 
     def node_questions(state: PipelineState) -> PipelineState:
         with agent_span("QuestionGenerationAgent"):
-            qs = question_agent.run(state["product_model"])
-        QuestionSet.model_validate(qs)
-        return PipelineState.model_validate({**state.model_dump(), "questions": qs})
+            if memo is not None:
+                qs = memo.node("questions", state["product_model"], lambda: question_agent.run(state["product_model"]))
+            else:
+                # While questions stream in, start the FAQ calls the page assembly will need for them.
+                on_item = assembly_agent.faq_prefetcher(state["product_model"]) if LLM_STREAM else None
+                qs = question_agent.run(state["product_model"], on_item=on_item)
+        validate_stage("questions", {"questions": qs})
+        return {"questions": qs}
 
     def node_logic(state: PipelineState) -> PipelineState:
         ids = logic_agent.block_ids()
-        return PipelineState.model_validate({**state.model_dump(), "logic_ids": ids})
+        return {"logic_ids": ids}
 
     def node_templates(state: PipelineState) -> PipelineState:
         specs = runtime_templates["templates"]
-        return PipelineState.model_validate({**state.model_dump(), "template_specs": specs})
+        return {"template_specs": specs}
 
     def node_competitor(state: PipelineState) -> PipelineState:
         with agent_span("FictionalProductAgent"):
-            pb = fictional_agent.run(base_schema=state["product_model"])
-        ProductModel.model_validate(pb)
-        return PipelineState.model_validate({**state.model_dump(), "product_b": pb})
+            if memo is not None:
+                pb = memo.node("competitor", state["product_model"], lambda: fictional_agent.run(base_schema=state["product_model"]))
+            else:
+                pb = fictional_agent.run(base_schema=state["product_model"])
+        validate_stage("competitor", {"product_b": pb})
+        return {"product_b": pb}
+
+    async def anode_questions(state: PipelineState) -> PipelineState:
+        if memo is not None:
+            return await asyncio.to_thread(node_questions, state)
+        with agent_span("QuestionGenerationAgent"):
+            on_item = assembly_agent.faq_prefetcher(state["product_model"]) if LLM_STREAM else None
+            qs = await question_agent.arun(state["product_model"], on_item=on_item)
+        validate_stage("questions", {"questions": qs})
+        return {"questions": qs}
+
+    async def anode_competitor(state: PipelineState) -> PipelineState:
+        if memo is not None:
+            return await asyncio.to_thread(node_competitor, state)
+        with agent_span("FictionalProductAgent"):
+            pb = await fictional_agent.arun(base_schema=state["product_model"])
+        validate_stage("competitor", {"product_b": pb})
+        return {"product_b": pb}
 
     def node_template_enforce(state: PipelineState) -> PipelineState:
         with agent_span("TemplateEngineEnforce"):
             template_agent.enforce(runtime_templates, "faq", {"product_name": state["product_model"]["product_name"], "questions": state["questions"]}, state["logic_ids"])
             template_agent.enforce(runtime_templates, "product_page", state["product_model"], state["logic_ids"])
             template_agent.enforce(runtime_templates, "comparison_page", {"product_a": state["product_model"], "product_b": state["product_b"]}, state["logic_ids"])
-        return state
+        return {}
 
     def node_pages(state: PipelineState) -> PipelineState:
         with agent_span("PageAssemblyAgent"):
-            faq = assembly_agent.build_faq_page(state["product_model"], state["questions"])
+            faq = assembly_agent.build_faq_page(state["product_model"], state["questions"], memo=memo)
             prod = assembly_agent.build_product_page(state["product_model"])
             comp = assembly_agent.build_comparison_page(state["product_model"], state["product_b"])
-        return PipelineState.model_validate({**state.model_dump(), "faq_page": faq, "product_page": prod, "comparison_page": comp})
+        pages = {"faq_page": faq, "product_page": prod, "comparison_page": comp}
+        validate_stage("pages", pages)
+        return pages
+
+    async def anode_pages(state: PipelineState) -> PipelineState:
+        with agent_span("PageAssemblyAgent"):
+            faq = await assembly_agent.abuild_faq_page(state["product_model"], state["questions"], memo=memo)
+            prod = assembly_agent.build_product_page(state["product_model"])
+            comp = assembly_agent.build_comparison_page(state["product_model"], state["product_b"])
+        pages = {"faq_page": faq, "product_page": prod, "comparison_page": comp}
+        validate_stage("pages", pages)
+        return pages
 
     def node_docs(state: PipelineState) -> PipelineState:
         with agent_span("DocumentationAgent"):
@@ -100,7 +147,7 @@ def run_pipeline():
                 logic_registry={"blocks": state["logic_ids"]},
                 template_registry={"templates": state["template_specs"]},
             )
-        return PipelineState.model_validate({**state.model_dump(), "documentation_md": md})
+        return {"documentation_md": md}
 
     def node_validate(state: PipelineState) -> PipelineState:
         with agent_span("FinalValidationAgent"):
@@ -110,24 +157,26 @@ def run_pipeline():
                     "faq_page": state["faq_page"],
                     "product_page": state["product_page"],
                     "comparison_page": state["comparison_page"],
-                }
+                },
+                validated=planned,
             )
-        return state
+        return {}
 
     def node_error(state: PipelineState) -> PipelineState:
-        return state
+        return {}
 
     graph.add_node("parse", node_parse)
-    graph.add_node("questions", node_questions)
+    graph.add_node("questions", anode_questions if use_async else node_questions)
     graph.add_node("logic", node_logic)
     graph.add_node("templates", node_templates)
-    graph.add_node("competitor", node_competitor)
+    graph.add_node("competitor", anode_competitor if use_async else node_competitor)
     graph.add_node("template_enforce", node_template_enforce)
-    graph.add_node("pages", node_pages)
+    graph.add_node("pages", anode_pages if use_async else node_pages)
     graph.add_node("docs", node_docs)
     graph.add_node("validate", node_validate)
     graph.add_node("error", node_error)
 
+    graph.set_entry_point("parse")
     graph.add_edge("parse", "questions")
     graph.add_edge("parse", "logic")
     graph.add_edge("parse", "templates")
@@ -141,25 +190,91 @@ def run_pipeline():
     graph.add_edge("docs", "validate")
     graph.add_edge("validate", END)
 
-    app = graph.compile()
-    initial = PipelineState.model_validate({
-        "raw": RAW_PRODUCT_DATA,
-        "product_model": None,
-        "questions": None,
-        "logic_ids": [],
-        "template_specs": {},
-        "product_b": None,
-        "faq_page": None,
-        "product_page": None,
-        "comparison_page": None,
-        "documentation_md": None,
-        "error": None,
-    })
-    final = app.invoke(initial)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def initial_state(raw: Dict[str, Any]) -> PipelineState:
+    return {"raw": raw, "logic_ids": [], "template_specs": {}}
+
+
+def in_background(fn: Callable[..., Any], *args: Any) -> Future:
+    fut: Future = Future()
+
+    def work() -> None:
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=work, daemon=True).start()
+    return fut
+
+
+def prefetch_first_calls(llm: Any, raw: Any) -> None:
+    """Starts the question and competitor calls for raw while the graph is still being built."""
+    if not hasattr(llm, "prefetch") or not isinstance(raw, dict) or INCREMENTAL or LLM_STREAM:
+        return
+    from agents.product_parsing_agent import ProductParsingAgent
+    from agents.question_generation_agent import QuestionGenerationAgent
+    from agents.fictional_product_agent import FictionalProductAgent
+    try:
+        product = ProductParsingAgent().run(raw)
+    except Exception:
+        return
+    llm.prefetch(QuestionGenerationAgent().prompt(product))
+    if not COMPETITOR_POOL:
+        llm.prefetch(FictionalProductAgent(use_pool=False).prompt(product))
+
+
+def resumable_run(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Thread config for a checkpointed single-product run under RUN_ID (or a fresh run id)."""
+    from checkpoints import new_run_id, thread_config
+    from batch import product_id_of
+    run_id = RUN_ID or new_run_id()
+    log_event({"type": "checkpoint_run", "ts": time.time(), "run_id": run_id})
+    return thread_config(run_id, product_id_of(raw))
+
+
+def run_pipeline(raw: Dict[str, Any] | None = None, app=None):
+    ensure_dirs()
+    llm = get_provider()
+    raw = raw if raw is not None else RAW_PRODUCT_DATA
+    health = in_background(check_available, llm)
+    resumable = None
+    if app is None:
+        if CHECKPOINT:
+            from checkpoints import open_checkpointer, starts_fresh
+            checkpointer = open_checkpointer()
+            resumable = resumable_run(raw)
+            # A thread that already finished or stopped part-way makes no first-node calls to prefetch.
+            if starts_fresh(checkpointer, initial_state(raw), resumable):
+                prefetch_first_calls(llm, raw)
+            app = build_graph(checkpointer=checkpointer)
+        else:
+            prefetch_first_calls(llm, raw)
+            app = build_graph(use_async=ASYNC_GRAPH)
+    health.result()
+    if getattr(app, "checkpointer", None) is not None:
+        from checkpoints import invoke_resumable
+        final = invoke_resumable(app, initial_state(raw), resumable or resumable_run(raw))
+    elif ASYNC_GRAPH:
+        final = asyncio.run(app.ainvoke(initial_state(raw)))
+    else:
+        final = app.invoke(initial_state(raw))
     write_json(Path("outputs/faq.json"), final["faq_page"])
     write_json(Path("outputs/product_page.json"), final["product_page"])
     write_json(Path("outputs/comparison_page.json"), final["comparison_page"])
-    Path("docs/projectdocumentation.md").write_text(final["documentation_md"], encoding="utf-8")
+    write_if_changed(Path("docs/projectdocumentation.md"), final["documentation_md"])
+    cache = get_cache()
+    if cache is not None:
+        cache.log_stats()
+    if hasattr(llm, "stats"):
+        log_event({"type": "llm_scheduler", "ts": time.time(), **llm.stats()})
+    log_event({"type": "llm_backends", "ts": time.time(), **llm.pool.stats()})
+    log_event({"type": "llm_usage", "ts": time.time(), **llm.usage_stats()})
+    log_event({"type": "metrics", "ts": time.time(), "spans": metrics_snapshot()})
+    flush_logs()
+    from agents.template_engine_agent import TemplateEngineAgent
     return {
         "architecture": TemplateEngineAgent.architecture_overview(),
         "agent_definitions": TemplateEngineAgent.agent_definitions(),
@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Annotated, TypedDict
 from pydantic import BaseModel, Field, ConfigDict
 
 
@@ -58,17 +58,29 @@ class ComparisonPage(BaseModel):
     product_a: str
     product_b: str
     comparison: Dict[str, Any]
+    similarity: Optional[float] = None
+    diff: Optional[Dict[str, Any]] = None
 
 
-class PipelineState(BaseModel):
+def merge_dicts(left: Dict[str, Any] | None, right: Dict[str, Any] | None) -> Dict[str, Any]:
+    return {**(left or {}), **(right or {})}
+
+
+def keep_first(left: Any, right: Any) -> Any:
+    return left if left is not None else right
+
+
+class PipelineState(TypedDict, total=False):
+    """Graph state; nodes return only the keys they change and LangGraph merges them."""
+
     raw: Dict[str, Any]
-    product_model: Optional[ProductModel] = None
-    questions: Optional[QuestionSet] = None
-    logic_ids: List[str] = Field(default_factory=list)
-    template_specs: Dict[str, TemplateSpec] = Field(default_factory=dict)
-    product_b: Optional[ProductModel] = None
-    faq_page: Optional[FAQPage] = None
-    product_page: Optional[ProductPage] = None
-    comparison_page: Optional[ComparisonPage] = None
-    documentation_md: Optional[str] = None
-    error: Optional[str] = None
+    product_model: Optional[Dict[str, Any]]
+    questions: Optional[Dict[str, Any]]
+    logic_ids: List[str]
+    template_specs: Annotated[Dict[str, Dict[str, Any]], merge_dicts]
+    product_b: Optional[Dict[str, Any]]
+    faq_page: Optional[Dict[str, Any]]
+    product_page: Optional[Dict[str, Any]]
+    comparison_page: Optional[Dict[str, Any]]
+    documentation_md: Optional[str]
+    error: Annotated[Optional[str], keep_first]
@@ -1,32 +1,233 @@
+import os
 import json
 import time
+import atexit
+import random
+import weakref
+import threading
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any, Iterator
-from contextlib import contextmanager
-from config import LOG_PATH
+from typing import Dict, Any, Iterator, List, Optional
+from contextlib import contextmanager, nullcontext
+from config import LOG_PATH, LOG_BUFFERED, LOG_BUFFER_SIZE, LOG_FLUSH_INTERVAL_S, METRICS_SAMPLE_SIZE, PROFILE
+
+
+class BufferedLogWriter:
+    """Collects log lines in a bounded buffer and appends them to disk from a background thread."""
+
+    def __init__(self, path: str, max_lines: int = LOG_BUFFER_SIZE, flush_interval_s: float = LOG_FLUSH_INTERVAL_S):
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        self.dropped = 0
+        self._lines: deque = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._after_fork())
+
+    def _after_fork(self) -> None:
+        # The child gets the parent's unflushed lines, which the parent still writes, and locks another
+        # thread may have held at the fork; start it with an empty buffer and fresh locks.
+        self._lines = deque(maxlen=self._lines.maxlen)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self) -> None:
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def write(self, line: str) -> None:
+        self._ensure_thread()
+        with self._lock:
+            if len(self._lines) == self._lines.maxlen:
+                self.dropped += 1
+            self._lines.append(line)
+            full = len(self._lines) >= self._lines.maxlen // 2
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                lines = list(self._lines)
+                self._lines.clear()
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                lines.append(json.dumps({"type": "log_dropped", "ts": time.time(), "count": dropped}))
+            if not lines:
+                return
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+class LatencyHistogram:
+    """Count, mean and percentiles over a bounded reservoir of latency samples."""
+
+    def __init__(self, sample_size: int = METRICS_SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples: List[float] = []
+
+    def record(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        if len(self.samples) < self.sample_size:
+            self.samples.append(ms)
+        else:
+            i = random.randrange(self.count)
+            if i < self.sample_size:
+                self.samples[i] = ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Folds in another histogram's counts and samples, keeping each side's share of the reservoir by count."""
+        if not other.count:
+            return
+        total = self.count + other.count
+        samples = self.samples + other.samples
+        if len(samples) > self.sample_size:
+            keep = round(self.sample_size * self.count / total)
+            samples = random.sample(self.samples, min(keep, len(self.samples)))
+            samples += random.sample(other.samples, min(self.sample_size - len(samples), len(other.samples)))
+        self.count = total
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.samples = samples
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+_WRITER = BufferedLogWriter(LOG_PATH)
+_HISTOGRAMS: Dict[str, LatencyHistogram] = {}
+_METRICS_LOCK = threading.Lock()
 
 
 def log_event(event: Dict[str, Any]) -> None:
+    line = json.dumps(event, ensure_ascii=False)
+    if LOG_BUFFERED:
+        _WRITER.write(line)
+        return
     Path(Path(LOG_PATH).parent).mkdir(parents=True, exist_ok=True)
     with open(LOG_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        f.write(line + "\n")
+
+
+def flush_logs() -> None:
+    _WRITER.flush()
+
+
+atexit.register(flush_logs)
+
+
+def record_latency(name: str, ms: float) -> None:
+    with _METRICS_LOCK:
+        hist = _HISTOGRAMS.get(name)
+        if hist is None:
+            hist = _HISTOGRAMS[name] = LatencyHistogram()
+        hist.record(ms)
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    with _METRICS_LOCK:
+        return {name: hist.snapshot() for name, hist in sorted(_HISTOGRAMS.items())}
+
+
+def take_metrics() -> Dict[str, LatencyHistogram]:
+    """Returns this process's histograms and starts new ones; a worker hands these to its parent to merge."""
+    global _HISTOGRAMS
+    with _METRICS_LOCK:
+        taken, _HISTOGRAMS = _HISTOGRAMS, {}
+    return taken
+
+
+def merge_metrics(histograms: Dict[str, LatencyHistogram]) -> None:
+    with _METRICS_LOCK:
+        for name, other in histograms.items():
+            hist = _HISTOGRAMS.get(name)
+            if hist is None:
+                hist = _HISTOGRAMS[name] = LatencyHistogram(other.sample_size)
+            hist.merge(other)
+
+
+def reset_metrics() -> None:
+    with _METRICS_LOCK:
+        _HISTOGRAMS.clear()
 
 
 @contextmanager
 def agent_span(name: str, extra: Dict[str, Any] | None = None) -> Iterator[None]:
-    start = time.time()
-    log_event({"type": "agent_start", "name": name, "ts": start, "extra": extra or {}})
+    log_event({"type": "agent_start", "name": name, "ts": time.time(), "extra": extra or {}})
+    start = time.perf_counter()
     try:
         yield
-        end = time.time()
-        log_event({"type": "agent_end", "name": name, "ts": end, "latency_ms": int((end - start) * 1000)})
+        latency_ms = (time.perf_counter() - start) * 1000
+        record_latency(name, latency_ms)
+        log_event({"type": "agent_end", "name": name, "ts": time.time(), "latency_ms": int(latency_ms)})
     except Exception as e:
-        end = time.time()
+        latency_ms = (time.perf_counter() - start) * 1000
+        record_latency(f"{name}.error", latency_ms)
         log_event({
             "type": "agent_error",
             "name": name,
-            "ts": end,
-            "latency_ms": int((end - start) * 1000),
+            "ts": time.time(),
+            "latency_ms": int(latency_ms),
             "error": str(e),
         })
         raise
+
+
+# Profiling is chosen once at import so the default path stays the plain span above, with no per-call checks.
+if PROFILE not in ("0", "false", "False", ""):
+    from profiling import io_wait, profiled_span, write_stacks
+
+    _plain_span = agent_span
+
+    def agent_span(name: str, extra: Dict[str, Any] | None = None):
+        return profiled_span(name, extra, _plain_span, log_event)
+else:
+    _IDLE = nullcontext()
+
+    def io_wait():
+        return _IDLE
+
+    def write_stacks() -> None:
+        return None
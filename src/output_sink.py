@@ -0,0 +1,154 @@
+import os
+import gzip
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Union
+from config import OUTPUT_SHARDS, OUTPUT_COMPRESS
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def atomic_write(path: Path, data: Union[str, bytes]) -> None:
+    """Writes data to a temp file next to path and renames it into place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def write_if_changed(path: Path, data: Union[str, bytes]) -> bool:
+    """Atomically writes data unless the file already holds the same content. Returns True if written."""
+    path = Path(path)
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    try:
+        if content_hash(path.read_bytes()) == content_hash(raw):
+            return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, raw)
+    return True
+
+
+class ShardedJSONLSink:
+    """Append-only JSONL shards with an index of where each product's latest record lives.
+
+    Records are routed to a shard by product id. With compression every record is its own gzip
+    member, so a record can be read back from its offset without decompressing the whole shard.
+    The index is itself an append-only JSONL log, loaded into memory on open; later entries win.
+    Records whose content hash matches the indexed one are skipped.
+    """
+
+    INDEX_NAME = "index.jsonl"
+
+    def __init__(self, root: Union[str, Path], shards: int = OUTPUT_SHARDS, compress: bool = OUTPUT_COMPRESS):
+        if shards < 1:
+            raise ValueError("ShardedJSONLSink needs at least one shard")
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.shards = shards
+        self.compress = compress
+        self.written = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._files: Dict[str, Any] = {}
+        self._index: Dict[str, Dict[str, Any]] = {}
+        index_path = self.root / self.INDEX_NAME
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted run; the record it points at is ignored.
+                        continue
+                    self._index[entry["id"]] = entry
+        self._index_file = open(index_path, "a", encoding="utf-8")
+
+    def shard_name(self, product_id: str) -> str:
+        n = int.from_bytes(hashlib.blake2b(product_id.encode("utf-8"), digest_size=4).digest(), "big") % self.shards
+        return f"shard-{n:03d}.jsonl" + (".gz" if self.compress else "")
+
+    def _shard(self, name: str):
+        f = self._files.get(name)
+        if f is None:
+            f = open(self.root / name, "ab")
+            self._files[name] = f
+        return f
+
+    def write(self, product_id: str, pages: Dict[str, Any]) -> bool:
+        """Appends the pages for product_id unless they are unchanged. Returns True if written."""
+        body = json.dumps(pages, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = content_hash(body)
+        record = b'{"id":' + json.dumps(product_id, ensure_ascii=False).encode("utf-8") + b',"pages":' + body + b"}\n"
+        if self.compress:
+            record = gzip.compress(record, mtime=0)
+        with self._lock:
+            current = self._index.get(product_id)
+            if current is not None and current["sha256"] == digest:
+                self.skipped += 1
+                return False
+            name = self.shard_name(product_id)
+            f = self._shard(name)
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(record)
+            f.flush()
+            entry = {"id": product_id, "shard": name, "offset": offset, "length": len(record), "sha256": digest}
+            self._index_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._index_file.flush()
+            self._index[product_id] = entry
+            self.written += 1
+        return True
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._index.get(product_id)
+        if entry is None:
+            return None
+        with self._lock:
+            f = self._files.get(entry["shard"])
+            if f is not None:
+                f.flush()
+        with open(self.root / entry["shard"], "rb") as f:
+            f.seek(entry["offset"])
+            raw = f.read(entry["length"])
+        if entry["shard"].endswith(".gz"):
+            raw = gzip.decompress(raw)
+        return json.loads(raw)["pages"]
+
+    def location(self, product_id: str) -> Optional[Dict[str, Any]]:
+        return self._index.get(product_id)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def ids(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def close(self) -> None:
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+            self._index_file.close()
+
+    def __enter__(self) -> "ShardedJSONLSink":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
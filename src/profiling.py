@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import atexit
+import cProfile
+import threading
+import tracemalloc
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Callable, ContextManager, Iterator, List, Optional, Set, Tuple
+from config import PROFILE, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_MS
+
+PROFILE_MODES: Set[str] = {"cpu", "alloc", "stacks"} if PROFILE in ("1", "all", "true", "True") else {
+    m.strip() for m in PROFILE.split(",") if m.strip()
+}
+
+# Network wait lists of every span open in this context, outermost first; io_wait() appends seconds to each.
+_IO_WAITS: contextvars.ContextVar[Tuple[List[float], ...]] = contextvars.ContextVar("profile_io_waits", default=())
+_LOCAL = threading.local()
+# Python 3.12+ allows one active cProfile per process, so one span at a time gets a CPU profile;
+# the others still report cpu_ms, and the stack sampler covers every thread.
+_CPU_PROFILE_LOCK = threading.Lock()
+_SEQ = iter(range(1, sys.maxsize))
+
+
+@contextmanager
+def io_wait() -> Iterator[None]:
+    """Marks a block as waiting on the network, so the enclosing span can report it apart from CPU time."""
+    spans = _IO_WAITS.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        for waits in spans:
+            waits.append(elapsed)
+
+
+class StackSampler:
+    """Samples the stacks of threads inside a span and aggregates them as collapsed stacks (span;frame;frame count)."""
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self.active: Dict[int, str] = {}
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name="stack-sampler", daemon=True)
+            self._thread.start()
+
+    def enter(self, name: str) -> Optional[str]:
+        self._ensure_thread()
+        ident = threading.get_ident()
+        with self._lock:
+            previous = self.active.get(ident)
+            self.active[ident] = name if previous is None else f"{previous};{name}"
+        return previous
+
+    def exit(self, previous: Optional[str]) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            if previous is None:
+                self.active.pop(ident, None)
+            else:
+                self.active[ident] = previous
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.interval_s)
+            with self._lock:
+                active = dict(self.active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            sampled = []
+            for ident, span in active.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                sampled.append(";".join([span, *reversed(stack)]))
+            with self._lock:
+                self.counts.update(sampled)
+
+    def write(self, path: Path) -> None:
+        with self._lock:
+            counts = dict(self.counts)
+        if not counts:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in sorted(counts.items()):
+                f.write(f"{stack} {n}\n")
+
+
+_SAMPLER = StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000) if "stacks" in PROFILE_MODES else None
+
+
+def write_stacks() -> Optional[Path]:
+    if _SAMPLER is None:
+        return None
+    path = Path(PROFILE_DIR) / f"stacks-{os.getpid()}.folded"
+    _SAMPLER.write(path)
+    return path
+
+
+atexit.register(write_stacks)
+
+
+def _top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int = 10) -> List[Dict[str, Any]]:
+    stats = after.compare_to(before, "lineno")
+    return [
+        {"where": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "size_kb": round(s.size_diff / 1024, 1), "count": s.count_diff}
+        for s in stats[:limit]
+        if s.size_diff > 0
+    ]
+
+
+@contextmanager
+def profiled_span(name: str, extra: Optional[Dict[str, Any]], inner: Callable[..., ContextManager[None]], log: Callable[[Dict[str, Any]], None]) -> Iterator[None]:
+    """Runs inner(name, extra) and logs wall, CPU and network-wait time plus the enabled profiles for the span."""
+    waits: List[float] = []
+    token = _IO_WAITS.set(_IO_WAITS.get() + (waits,))
+    # cProfile and tracemalloc snapshots cover only the outermost span on a thread.
+    outermost = not getattr(_LOCAL, "depth", 0)
+    _LOCAL.depth = getattr(_LOCAL, "depth", 0) + 1
+    want_cpu = "cpu" in PROFILE_MODES and outermost
+    profiler = cProfile.Profile() if want_cpu and _CPU_PROFILE_LOCK.acquire(blocking=False) else None
+    snapshot = None
+    if "alloc" in PROFILE_MODES and outermost:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(16)
+        snapshot = tracemalloc.take_snapshot()
+    previous = _SAMPLER.enter(name) if _SAMPLER is not None else None
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool outside this module holds the hook.
+            profiler = None
+            _CPU_PROFILE_LOCK.release()
+    try:
+        with inner(name, extra):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _CPU_PROFILE_LOCK.release()
+        wall_ms = (time.perf_counter() - wall0) * 1000
+        cpu_ms = (time.thread_time() - cpu0) * 1000
+        if _SAMPLER is not None:
+            _SAMPLER.exit(previous)
+        _LOCAL.depth -= 1
+        _IO_WAITS.reset(token)
+        io_ms = sum(waits) * 1000
+        event: Dict[str, Any] = {
+            "type": "agent_profile",
+            "name": name,
+            "ts": time.time(),
+            "wall_ms": round(wall_ms, 3),
+            "cpu_ms": round(cpu_ms, 3),
+            "io_wait_ms": round(io_ms, 3),
+            "other_ms": round(max(0.0, wall_ms - cpu_ms - io_ms), 3),
+        }
+        if profiler is not None:
+            path = Path(PROFILE_DIR) / f"{name}-{os.getpid()}-{next(_SEQ)}.prof"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(path))
+            event["cpu_profile"] = str(path)
+        elif want_cpu:
+            event["cpu_profile_skipped"] = True
+        if snapshot is not None:
+            event["top_allocations"] = _top_allocations(snapshot, tracemalloc.take_snapshot())
+        log(event)
@@ -0,0 +1,85 @@
+import json
+from typing import Dict, Any, List, Optional
+from config import LLM_PROMPT_CACHE
+
+# Every per-product prompt is PREAMBLE + product data + task. The first two are byte-identical for all
+# calls about one product, so backends with prefix caching evaluate them once and only the task varies.
+# The FAQ answer prompt needs only its field and value, so it carries the prefix only with LLM_PROMPT_CACHE.
+PREAMBLE = (
+    "You write structured content for a skincare product catalog. Use only the product data below and never "
+    "invent facts about it. When a task asks for JSON, reply with strict JSON only, without explanations.\n"
+)
+PRODUCT_LINE = "Product data: "
+SCHEMA_KEYS = "product_name, concentration, skin_type, key_ingredients, benefits, how_to_use, side_effects, price_inr, schema_version"
+
+
+def product_prefix(product: Dict[str, Any]) -> str:
+    return f"{PREAMBLE}{PRODUCT_LINE}{json.dumps(product, ensure_ascii=False)}\n"
+
+
+def product_of(prompt: str) -> Dict[str, Any]:
+    for line in prompt.splitlines():
+        if line.startswith(PRODUCT_LINE):
+            return json.loads(line[len(PRODUCT_LINE):])
+    raise ValueError("Prompt has no product data line")
+
+
+def suffix_of(prompt: str) -> str:
+    """The task part of a prompt, after the shared product prefix."""
+    start = prompt.find(PRODUCT_LINE)
+    return prompt if start < 0 else prompt[prompt.index("\n", start) + 1:]
+
+
+def questions_prompt(product: Dict[str, Any]) -> str:
+    return product_prefix(product) + (
+        "Create at least 15 concise, user-centric questions about the product, grouped into categories: "
+        "Informational, Usage, Safety, Purchase, Ingredients, Comparison. Return JSON with keys 'count' and 'items', "
+        "where 'items' is a list of objects containing 'category' and 'question'."
+    )
+
+
+def competitor_prompt(product: Dict[str, Any], n: int = 1, rejected: Optional[str] = None) -> str:
+    if n == 1:
+        task = (
+            "Invent a realistic competitor product with the same schema as the product data. It must be comparable "
+            "in category and price, have a different name, and reasonable variations in ingredients or benefits. "
+            f"Return JSON with keys: {SCHEMA_KEYS}."
+        )
+    else:
+        task = (
+            f"Invent {n} realistic competitor products with the same schema as the product data. Each must be comparable "
+            "in category and price, have a distinct name, and reasonable variations in ingredients or benefits. "
+            f"Return JSON with key 'items', a list of objects with keys: {SCHEMA_KEYS}."
+        )
+    if rejected:
+        task += f"\nYour previous reply was rejected ({rejected}); return only the corrected JSON."
+    return product_prefix(product) + task
+
+
+def select_field_prompt(product: Dict[str, Any], question: str) -> str:
+    return product_prefix(product) + (
+        "Choose the most relevant product data field to answer the question. "
+        "Return JSON with keys 'field' and 'answer'. Use only provided values.\n"
+        f"Question: {question}"
+    )
+
+
+def answer_prompt(product: Dict[str, Any], question: str, field: str, value: str) -> str:
+    """Carries the product prefix only with LLM_PROMPT_CACHE; uncached, it would be re-evaluated for every question."""
+    task = (
+        "Answer the user's question using only the provided field and value. "
+        "Keep the answer concise and grounded. If a yes/no is implied, answer directly. Do not invent facts.\n"
+        f"Question: {question}\n"
+        f"Field: {field}\n"
+        f"Value: {value}\n"
+    )
+    return product_prefix(product) + task if LLM_PROMPT_CACHE else task
+
+
+def batched_answer_prompt(product: Dict[str, Any], questions: List[str]) -> str:
+    return product_prefix(product) + (
+        "Answer every question using only the product data fields. For each question choose the most relevant field. "
+        "Return JSON with key 'answers', a list with one object per question containing 'index', 'field' and 'answer'. "
+        "Keep answers concise and grounded. If a yes/no is implied, answer directly.\n"
+        f"Questions: {json.dumps([{'index': i, 'question': q} for i, q in enumerate(questions)], ensure_ascii=False)}"
+    )
@@ -0,0 +1,272 @@
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, TextIO
+from config import SERVICE_QUEUE_SIZE, SERVICE_BATCH_SIZE, SERVICE_BATCH_WAIT_MS, SERVICE_WORKERS, SERVICE_TIMEOUT_S
+from observability import log_event, record_latency, metrics_snapshot, flush_logs
+
+
+class ServiceBusy(RuntimeError):
+    """Raised when the request queue is full; callers should retry later."""
+
+
+class PipelineService:
+    """Keeps one compiled graph and the shared LLM client warm and runs queued products in micro-batches.
+
+    Dispatcher threads each take up to batch_size queued requests, waiting at most batch_wait_ms
+    for a batch to fill, and run them together through the graph. A full queue rejects new work.
+    """
+
+    def __init__(
+        self,
+        app: Any = None,
+        queue_size: int = SERVICE_QUEUE_SIZE,
+        batch_size: int = SERVICE_BATCH_SIZE,
+        batch_wait_ms: float = SERVICE_BATCH_WAIT_MS,
+        workers: int = SERVICE_WORKERS,
+    ):
+        self.app = app
+        self.batch_size = max(1, batch_size)
+        self.batch_wait_s = batch_wait_ms / 1000
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._prefetch: Any = lambda raw: None
+        self._lock = threading.Lock()
+        self._seq = 0
+        self.counters = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "batches": 0}
+
+    def start(self) -> "PipelineService":
+        from main import build_graph, prefetch_first_calls
+        from local_llm import get_provider, check_available
+        llm = get_provider()
+        check_available(llm)
+        self._prefetch = lambda raw: prefetch_first_calls(llm, raw)
+        if self.app is None:
+            self.app = build_graph()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._dispatch, name=f"service-dispatch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        log_event({"type": "service_start", "ts": time.time(), "workers": self.workers, "batch_size": self.batch_size})
+        return self
+
+    def submit(self, raw: Dict[str, Any], request_id: Optional[str] = None, block: bool = False) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            self._seq += 1
+            request_id = request_id or str(self._seq)
+        try:
+            self._queue.put((request_id, raw, time.perf_counter(), fut), block=block)
+        except queue.Full:
+            with self._lock:
+                self.counters["rejected"] += 1
+            raise ServiceBusy(f"Request queue is full ({self._queue.maxsize} pending)")
+        with self._lock:
+            self.counters["accepted"] += 1
+        return fut
+
+    def _next_batch(self) -> List[tuple]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.batch_wait_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # A failure outside the graph (state building, metrics, responses) must not kill the dispatcher
+                # or leave callers waiting: every request not yet answered gets an error result.
+                error = f"{type(e).__name__}: {e}"
+                log_event({"type": "service_batch_error", "ts": time.time(), "batch_size": len(batch), "error": error})
+                for request_id, _, _, fut in batch:
+                    if fut.done():
+                        continue
+                    with self._lock:
+                        self.counters["failed"] += 1
+                    fut.set_result({"id": request_id, "batch_size": len(batch), "status": "error", "error": error})
+
+    def _run_batch(self, batch: List[tuple]) -> None:
+        from main import initial_state
+        from llm_scheduler import priority_scope, PRIORITY_INTERACTIVE
+        started = time.perf_counter()
+        for _, raw, _, _ in batch:
+            self._prefetch(raw)
+        with priority_scope(PRIORITY_INTERACTIVE):
+            results = self.app.batch(
+                [initial_state(raw) for _, raw, _, _ in batch],
+                config={"max_concurrency": len(batch)},
+                return_exceptions=True,
+            )
+        done = time.perf_counter()
+        with self._lock:
+            self.counters["batches"] += 1
+        record_latency("service.batch", (done - started) * 1000)
+        for (request_id, _, enqueued, fut), final in zip(batch, results):
+            queue_ms = (started - enqueued) * 1000
+            total_ms = (done - enqueued) * 1000
+            record_latency("service.queue_wait", queue_ms)
+            record_latency("service.request", total_ms)
+            response: Dict[str, Any] = {
+                "id": request_id,
+                "latency_ms": round(total_ms, 1),
+                "queue_ms": round(queue_ms, 1),
+                "batch_size": len(batch),
+            }
+            if isinstance(final, Exception):
+                with self._lock:
+                    self.counters["failed"] += 1
+                fut.set_result({**response, "status": "error", "error": f"{type(final).__name__}: {final}"})
+                continue
+            with self._lock:
+                self.counters["completed"] += 1
+            fut.set_result({
+                **response,
+                "status": "ok",
+                "pages": {
+                    "faq": final["faq_page"],
+                    "product_page": final["product_page"],
+                    "comparison_page": final["comparison_page"],
+                },
+                "documentation_md": final["documentation_md"],
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        latency = {k: v for k, v in metrics_snapshot().items() if k.startswith("service.")}
+        return {**counters, "queue_depth": self._queue.qsize(), "queue_size": self._queue.maxsize, "latency": latency}
+
+
+def make_http_server(service: PipelineService, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._send(200, service.stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if self.path != "/generate":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"null")
+                if not isinstance(body, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self._send(400, {"error": f"Invalid request body: {e}"})
+                return
+            raw = body.get("product", body)
+            try:
+                fut = service.submit(raw, request_id=body.get("id"))
+            except ServiceBusy as e:
+                self._send(503, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            try:
+                result = fut.result(timeout=SERVICE_TIMEOUT_S)
+            except TimeoutError:
+                self._send(504, {"error": "Timed out waiting for the pipeline"})
+                return
+            self._send(200 if result["status"] == "ok" else 422, result)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    return httpd
+
+
+def serve_jsonl(service: PipelineService, stdin: TextIO = sys.stdin, stdout: TextIO = sys.stdout) -> Dict[str, Any]:
+    """Reads one product per line, writes one result per line as each completes. Blocks instead of rejecting when full."""
+    write_lock = threading.Lock()
+    pending: List[Future] = []
+
+    def emit(result: Dict[str, Any]) -> None:
+        with write_lock:
+            stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+            stdout.flush()
+
+    for line_no, line in enumerate(stdin, start=1):
+        if not line.strip():
+            continue
+        try:
+            body = json.loads(line)
+            if not isinstance(body, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            emit({"id": f"line-{line_no}", "status": "error", "error": f"Unreadable JSONL line {line_no}: {e}"})
+            continue
+        fut = service.submit(body.get("product", body), request_id=str(body.get("id", f"line-{line_no}")), block=True)
+        fut.add_done_callback(lambda f: emit(f.result()))
+        pending.append(fut)
+    for fut in pending:
+        fut.result()
+    return service.stats()
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Resident pipeline service over HTTP or stdin/stdout JSONL.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--http", metavar="HOST:PORT", help="Serve POST /generate, GET /stats and GET /health")
+    mode.add_argument("--stdin", action="store_true", help="Read products as JSONL from stdin, write results to stdout")
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=SERVICE_BATCH_SIZE)
+    parser.add_argument("--batch-wait-ms", type=float, default=SERVICE_BATCH_WAIT_MS)
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE)
+    args = parser.parse_args(argv)
+    service = PipelineService(
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        workers=args.workers,
+    ).start()
+    if args.stdin:
+        stats = serve_jsonl(service)
+        print(json.dumps({"type": "service_stats", **stats}, ensure_ascii=False), file=sys.stderr)
+        flush_logs()
+        return 0 if stats["failed"] == 0 else 1
+    host, _, port = args.http.rpartition(":")
+    httpd = make_http_server(service, host or "127.0.0.1", int(port))
+    print(json.dumps({"listening": f"http://{httpd.server_address[0]}:{httpd.server_address[1]}"}), file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        log_event({"type": "service_stats", "ts": time.time(), **service.stats()})
+        flush_logs()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
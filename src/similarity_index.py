@@ -0,0 +1,143 @@
+from typing import Any, List, Optional, Sequence, Tuple
+import numpy as np
+from config import SIMILARITY_BACKEND
+from llm_provider import LocalEmbedder
+
+# Function words that dominate short questions and make unrelated ones look alike.
+STOPWORDS = frozenset(
+    "a an the is are was were be been do does did it its this that these those of in on at for to from with and or "
+    "what which when where who how why should can could would will i my me you your any there by per as if so than "
+    "about into product products s t".split()
+)
+
+
+class NumpyBackend:
+    """Exact inner-product search over a dense matrix."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._chunks: List[np.ndarray] = []
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._matrix.shape[0] + sum(c.shape[0] for c in self._chunks)
+
+    def add(self, vectors: np.ndarray) -> None:
+        self._chunks.append(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+
+    def _all(self) -> np.ndarray:
+        if self._chunks:
+            self._matrix = np.vstack([self._matrix, *self._chunks])
+            self._chunks = []
+        return self._matrix
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        matrix = self._all()
+        k = min(k, matrix.shape[0])
+        scores = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim) @ matrix.T
+        if k == 0:
+            empty = np.zeros((scores.shape[0], 0))
+            return empty.astype(np.int64), empty
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+
+class HNSWBackend:
+    """Approximate inner-product search with hnswlib, for indexes too large to scan."""
+
+    def __init__(self, dim: int, capacity: int = 1024, m: int = 16, ef_construction: int = 200, ef: int = 64):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise RuntimeError("SIMILARITY_BACKEND=hnsw requires the hnswlib package") from e
+        self.dim = dim
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=capacity, ef_construction=ef_construction, M=m)
+        self._index.set_ef(ef)
+
+    def __len__(self) -> int:
+        return self._index.get_current_count()
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        needed = len(self) + vectors.shape[0]
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        self._index.add_items(vectors, np.arange(len(self), needed))
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        k = min(k, len(self))
+        if k == 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.int64), empty
+        labels, distances = self._index.knn_query(queries, k=k)
+        return labels.astype(np.int64), 1.0 - distances
+
+
+BACKENDS = {"numpy": NumpyBackend, "hnsw": HNSWBackend}
+
+
+class SimilarityIndex:
+    """Embeds texts with LocalEmbedder and finds the most similar stored ones via a pluggable vector backend."""
+
+    def __init__(self, embedder: Optional[LocalEmbedder] = None, backend: str = SIMILARITY_BACKEND, **backend_options: Any):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown similarity backend: {backend}")
+        self.embedder = embedder or LocalEmbedder()
+        self.backend = BACKENDS[backend](self.embedder.dim, **backend_options)
+        self.texts: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.embedder.embed_matrix(list(texts))
+
+    def add(self, texts: Sequence[str], vectors: Optional[np.ndarray] = None) -> List[int]:
+        start = len(self.texts)
+        self.backend.add(self.embed(texts) if vectors is None else vectors)
+        self.texts.extend(texts)
+        return list(range(start, len(self.texts)))
+
+    def search(self, text: str, k: int = 1, vector: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        ids, scores = self.backend.search(self.embed([text]) if vector is None else vector, k)
+        return [(int(i), float(s)) for i, s in zip(ids[0], scores[0])]
+
+
+def dedupe(texts: Sequence[str], threshold: float, min_keep: int = 0, embedder: Optional[LocalEmbedder] = None, backend: str = SIMILARITY_BACKEND) -> List[int]:
+    """Returns the indices of texts to keep, dropping any at or above threshold similarity to an earlier kept one.
+
+    If that would leave fewer than min_keep, the least similar of the dropped texts are kept after all.
+    """
+    index = SimilarityIndex(embedder=embedder, backend=backend)
+    vectors = index.embed(texts)
+    kept: List[int] = []
+    dropped: List[Tuple[float, int]] = []
+    for i, text in enumerate(texts):
+        hit = index.search(text, 1, vector=vectors[i]) if len(index) else []
+        if hit and hit[0][1] >= threshold:
+            dropped.append((hit[0][1], i))
+            continue
+        index.add([text], vectors=vectors[i:i + 1])
+        kept.append(i)
+    dropped.sort()
+    while len(kept) < min_keep and dropped:
+        kept.append(dropped.pop(0)[1])
+    return sorted(kept)
+
+
+def question_embedder() -> LocalEmbedder:
+    return LocalEmbedder(dim=1024, stopwords=STOPWORDS)
+
+
+def grounding_scores(embedder: LocalEmbedder, answers: Sequence[str], sources: Sequence[str]) -> np.ndarray:
+    """Cosine similarity of each answer to the source text it claims to come from."""
+    if not answers:
+        return np.zeros(0, dtype=np.float32)
+    a = embedder.embed_matrix(list(answers))
+    s = embedder.embed_matrix(list(sources))
+    return np.einsum("ij,ij->i", a, s)
+
@@ -0,0 +1,175 @@
+import re
+import json
+import time
+import socket
+import random
+import threading
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from llm_provider import LocalLLM
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+class StubLLMServer:
+    """Local HTTP stand-in for Ollama and OpenAI-compatible servers, answering with LocalLLM.
+
+    Requests that ask for prompt caching (cache_prompt, or keep_alive for Ollama) reuse the token prefix
+    they share with one of the last `slots` prompts, like a llama.cpp server's KV cache slots, and only
+    the remaining tokens count as evaluated.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0, seed: int = 0, slots: int = 4):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.llm = LocalLLM()
+        self.calls: Counter = Counter()
+        self.prompt_tokens = 0
+        self.prompt_tokens_cached = 0
+        self._slots: deque = deque(maxlen=slots)
+        self.first_call_at: Optional[float] = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _reuse_prefix(self, tokens: List[str]) -> int:
+        """Picks a cache slot like llama.cpp: the most similar one if it shares at least half the prompt, else the oldest."""
+        best, best_i = 0, -1
+        for i, slot in enumerate(self._slots):
+            n = 0
+            for a, b in zip(slot, tokens):
+                if a != b:
+                    break
+                n += 1
+            if n > best:
+                best, best_i = n, i
+        if best_i >= 0 and best >= len(tokens) / 2:
+            del self._slots[best_i]
+        else:
+            best = 0
+        self._slots.append(tokens)
+        return best
+
+    def _complete(self, endpoint: str, prompt: str, cache: bool = False) -> Tuple[str, int, int]:
+        """Returns the completion plus the prompt tokens evaluated and reused from cache."""
+        tokens = _TOKEN_RE.findall(prompt)
+        with self._lock:
+            if self.first_call_at is None:
+                self.first_call_at = time.time()
+            self.calls[endpoint] += 1
+            cached = self._reuse_prefix(tokens) if cache else 0
+            self.prompt_tokens += len(tokens) - cached
+            self.prompt_tokens_cached += cached
+            delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return self.llm.invoke([{"content": prompt}]).content, len(tokens) - cached, cached
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, content_type: str, lines: list) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for line in lines:
+                        data = line.encode("utf-8")
+                        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def do_GET(self) -> None:
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{"name": "stub"}]})
+                elif self.path == "/v1/models":
+                    self._send_json(200, {"data": [{"id": "stub"}]})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/api/generate":
+                    prompt = payload.get("prompt", "")
+                    text, evaluated, _ = server._complete("ollama", prompt, cache="keep_alive" in payload)
+                    usage = {"prompt_eval_count": evaluated, "eval_count": count_tokens(text)}
+                    if payload.get("stream"):
+                        pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+                        lines = [json.dumps({"response": p, "done": False}) + "\n" for p in pieces]
+                        lines.append(json.dumps({"response": "", "done": True, **usage}) + "\n")
+                        self._send_stream("application/x-ndjson", lines)
+                    else:
+                        self._send_json(200, {"model": payload.get("model"), "response": text, "done": True, **usage})
+                elif self.path == "/v1/chat/completions":
+                    prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+                    text, evaluated, cached = server._complete("openai", prompt, cache=bool(payload.get("cache_prompt")))
+                    usage = {"prompt_tokens": evaluated + cached, "completion_tokens": count_tokens(text)}
+                    timings = {"prompt_n": evaluated, "cache_n": cached}
+                    if payload.get("stream"):
+                        pieces = [text[i:i + 16] for i in range(0, len(text), 16)]
+                        lines = [
+                            "data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": p}}]}) + "\n\n"
+                            for p in pieces
+                        ]
+                        lines.append("data: [DONE]\n\n")
+                        self._send_stream("text/event-stream", lines)
+                    else:
+                        self._send_json(200, {
+                            "model": payload.get("model"),
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+                            "usage": usage,
+                            "timings": timings,
+                        })
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+        return Handler
@@ -1,14 +1,71 @@
-from typing import Dict, Any
-from pydantic import ValidationError
-from models import FAQPage, ProductPage, ComparisonPage, QuestionSet
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from models import ProductModel, FAQPage, ProductPage, ComparisonPage, QuestionSet
 from config import QA_MIN_COUNT
 
+ARTIFACT_MODELS: Dict[str, Type[BaseModel]] = {
+    "product_model": ProductModel,
+    "questions": QuestionSet,
+    "product_b": ProductModel,
+    "faq_page": FAQPage,
+    "product_page": ProductPage,
+    "comparison_page": ComparisonPage,
+}
+
+# Graph node that validates each artifact; every artifact is checked exactly once, where it is produced.
+VALIDATION_PLAN: Dict[str, tuple] = {
+    "parse": ("product_model",),
+    "questions": ("questions",),
+    # FictionalProductAgent also validates each generated competitor so a rejected one can be re-requested;
+    # the node check covers pooled and memoized competitors too.
+    "competitor": ("product_b",),
+    "pages": ("faq_page", "product_page", "comparison_page"),
+}
+
+
+@lru_cache(maxsize=None)
+def artifact_adapter(kind: str) -> TypeAdapter:
+    return TypeAdapter(ARTIFACT_MODELS[kind])
+
+
+@lru_cache(maxsize=None)
+def _batch_adapter(kind: str) -> TypeAdapter:
+    return TypeAdapter(List[ARTIFACT_MODELS[kind]])
+
+
+def validate_artifacts(artifacts: Dict[str, Any]) -> None:
+    for kind, value in artifacts.items():
+        artifact_adapter(kind).validate_python(value)
+
+
+def validate_stage(stage: str, artifacts: Dict[str, Any]) -> None:
+    validate_artifacts({kind: artifacts[kind] for kind in VALIDATION_PLAN[stage]})
+
+
+def validate_batch(kind: str, items: List[Any]) -> List[Optional[str]]:
+    """Validates a whole catalog of one artifact kind in a single pass; returns an error message or None per item."""
+    try:
+        _batch_adapter(kind).validate_python(items)
+    except ValidationError as e:
+        errors: List[Optional[str]] = [None] * len(items)
+        for err in e.errors():
+            idx = err["loc"][0]
+            if isinstance(idx, int) and errors[idx] is None:
+                loc = ".".join(str(p) for p in err["loc"][1:])
+                errors[idx] = f"{loc}: {err['msg']}" if loc else err["msg"]
+        return errors
+    return [None] * len(items)
+
+
+def check_question_count(questions: Dict[str, Any]) -> None:
+    if questions["count"] < QA_MIN_COUNT or len(questions["items"]) < QA_MIN_COUNT:
+        raise ValueError("Insufficient questions generated")
+
 
 class FinalValidationAgent:
-    def run(self, artifacts: Dict[str, Any]) -> None:
-        qs = QuestionSet.model_validate(artifacts["questions"])
-        if qs.count < QA_MIN_COUNT or len(qs.items) < QA_MIN_COUNT:
-            raise ValueError("Insufficient questions generated")
-        FAQPage.model_validate(artifacts["faq_page"])
-        ProductPage.model_validate(artifacts["product_page"])
-        ComparisonPage.model_validate(artifacts["comparison_page"])
+    def run(self, artifacts: Dict[str, Any], validated: Iterable[str] = ()) -> None:
+        """Validates the artifacts not already checked upstream, then applies cross-artifact rules."""
+        done = set(validated)
+        validate_artifacts({k: v for k, v in artifacts.items() if k in ARTIFACT_MODELS and k not in done})
+        check_question_count(artifacts["questions"])
@@ -0,0 +1,42 @@
+import time
+import pytest
+from backend_pool import BackendPool
+
+DELAYS = {"http://fast": 0.001, "http://slow": 0.05}
+
+
+def fake_call(url):
+    if url == "http://down":
+        raise ConnectionError("refused")
+    time.sleep(DELAYS[url])
+    return url
+
+
+def test_routes_to_fastest_backend_after_warmup():
+    pool = BackendPool(["http://slow", "http://fast"], health_check=lambda url: None)
+    results = [pool.call(fake_call) for _ in range(10)]
+    assert results.count("http://fast") >= 8
+    assert all(b["inflight"] == 0 for b in pool.stats()["backends"])
+
+
+def test_fails_over_and_marks_backend_unhealthy():
+    pool = BackendPool(["http://down", "http://fast"], health_check=lambda url: None, recheck_s=60)
+    assert [pool.call(fake_call) for _ in range(3)] == ["http://fast"] * 3
+    down = pool.stats()["backends"][0]
+    assert down["healthy"] is False
+
+
+def test_single_backend_errors_propagate():
+    pool = BackendPool(["http://down"], health_check=lambda url: None)
+    with pytest.raises(ConnectionError):
+        pool.call(fake_call)
+
+
+def test_hedges_slow_primary_to_second_backend():
+    pool = BackendPool(["http://slow", "http://fast"], health_check=lambda url: None, hedge_percentile=0.5, hedge_min_samples=4)
+    pool._latencies.extend([2.0] * 4)
+    pool.backends[1].inflight = 5
+    start = time.perf_counter()
+    assert pool.call(fake_call) == "http://fast"
+    assert time.perf_counter() - start < 0.04
+    assert pool.stats()["hedge_wins"] == 1
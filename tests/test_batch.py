@@ -0,0 +1,72 @@
+import json
+import os
+from batch import iter_products
+
+
+def test_iter_products_reads_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "catalog.jsonl"
+    jsonl.write_text(
+        json.dumps({"sku": "GB-01", "product_name": "GlowBoost"}) + "\n"
+        + "not json\n"
+        + json.dumps({"product_name": "GlowBoost"}) + "\n"
+        + json.dumps({"product_name": "GlowBoost"}) + "\n",
+        encoding="utf-8",
+    )
+    rows = list(iter_products(jsonl))
+    assert [r[0] for r in rows] == ["gb-01", "line-2", "glowboost", "glowboost-2"]
+    assert rows[1][1] is None and rows[1][2]
+
+    csv_path = tmp_path / "catalog.csv"
+    csv_path.write_text(
+        "product_name,skin_type,key_ingredients,price_inr\n"
+        'GlowBoost,Oily|Combination,"[""Vitamin C"", ""Hyaluronic Acid""]",699\n',
+        encoding="utf-8",
+    )
+    (pid, raw, error), = list(iter_products(csv_path))
+    assert pid == "glowboost" and error is None
+    assert raw["skin_type"] == ["Oily", "Combination"]
+    assert raw["key_ingredients"] == ["Vitamin C", "Hyaluronic Acid"]
+
+
+def _no_graph(run_id=None):
+    pass
+
+
+def _crash_on_second(product_id, raw, out_dir, to_sink=False):
+    if product_id.endswith("2"):
+        os._exit(1)
+    return {"product_id": product_id, "status": "ok", "latency_ms": 0, "outputs": {}}
+
+
+def test_a_dead_worker_fails_its_products_and_still_writes_the_manifest(monkeypatch, tmp_path):
+    import batch
+    from stub_llm_server import StubLLMServer
+    from benchmark import stub_environment, synthetic_products
+    monkeypatch.setattr(batch, "_init_worker", _no_graph)
+    monkeypatch.setattr(batch, "process_product", _crash_on_second)
+    catalog = tmp_path / "catalog.jsonl"
+    catalog.write_text("".join(json.dumps({**p, "sku": f"p{i}"}) + "\n" for i, p in enumerate(synthetic_products(4))))
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        manifest = batch.run_batch(str(catalog), out_dir=str(tmp_path / "out"), workers=2, compare_top_k=0)
+    assert manifest["total"] == 4 and manifest["failed"] >= 1
+    assert all("BrokenProcessPool" in r["error"] for r in manifest["products"] if r["status"] != "ok")
+    assert json.loads((tmp_path / "out" / "manifest.json").read_text()) == manifest
+
+
+def test_worker_latency_histograms_reach_the_parent(monkeypatch, tmp_path):
+    import batch
+    import llm_cache
+    import observability
+    from stub_llm_server import StubLLMServer
+    from benchmark import stub_environment, synthetic_products
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    events = []
+    monkeypatch.setattr(observability, "log_event", events.append)
+    observability.reset_metrics()
+    catalog = tmp_path / "catalog.jsonl"
+    catalog.write_text("".join(json.dumps(p) + "\n" for p in synthetic_products(3)))
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        manifest = batch.run_batch(str(catalog), out_dir=str(tmp_path / "out"), workers=2, compare_top_k=0)
+    assert manifest["succeeded"] == 3 and all("metrics" not in r for r in manifest["products"])
+    spans, = [e["spans"] for e in events if e["type"] == "metrics"]
+    assert spans["ProductParsingAgent"]["count"] == 3 and spans["PageAssemblyAgent"]["count"] == 3
@@ -0,0 +1,24 @@
+from benchmark import run_benchmark, compare_results, stub_environment
+from stub_llm_server import StubLLMServer
+
+
+def test_benchmark_against_stub_server():
+    results = run_benchmark(products=2, concurrency=2, latency_ms=0, jitter_ms=0, kind="ollama")
+    assert results["failures"] == []
+    assert results["llm_calls_per_product"] == 10
+    assert results["nodes"]["PageAssemblyAgent"]["count"] == 2
+    assert results["products_per_s"] > 0
+    assert compare_results(results, results) == []
+    assert compare_results({**results, "products_per_s": results["products_per_s"] / 2}, results)
+
+
+def test_stub_server_streams_openai_chunks():
+    from local_llm import LocalLLMProvider
+    with StubLLMServer() as server, stub_environment(server, "openai-compatible"):
+        provider = LocalLLMProvider()
+        items = []
+        data = provider.stream_json(
+            "You are a product Q&A generator. Create at least 15 questions.\nProduct data: {\"product_name\": \"Serum\"}",
+            on_item=items.append,
+        )
+    assert len(items) == data["count"] >= 15
@@ -0,0 +1,66 @@
+from catalog_index import CatalogIndex, set_diff, SET_ATTRIBUTES
+
+
+def _product(i, ingredients, price, benefits=("Hydration",), skin=("Dry",)):
+    return {
+        "product_name": f"Product {i}",
+        "concentration": "1%",
+        "skin_type": list(skin),
+        "key_ingredients": list(ingredients),
+        "benefits": list(benefits),
+        "how_to_use": "Apply daily",
+        "side_effects": "None",
+        "price_inr": price,
+    }
+
+
+def test_neighbors_prefer_shared_rare_attributes_and_close_prices():
+    index = CatalogIndex(price_band=100)
+    index.add("a", _product("a", ["Niacinamide", "Zinc"], 500))
+    index.add("b", _product("b", ["Niacinamide", "Zinc"], 520))
+    index.add("c", _product("c", ["Niacinamide", "Zinc"], 2500))
+    index.add("d", _product("d", ["Retinol"], 500))
+    ranked = index.neighbors_of("a", k=3)
+    assert [pid for pid, _ in ranked][:2] == ["b", "c"]
+    assert "a" not in dict(ranked)
+
+
+def test_candidate_generation_is_sublinear():
+    index = CatalogIndex(price_band=100)
+    for i in range(2000):
+        index.add(f"p{i}", _product(i, [f"Active {i % 400}", "Glycerin"], 300 + (i % 50) * 20, skin=("Oily", "Dry")))
+    product = index.products["p7"]
+    terms = {attr: {v.lower() for v in product[attr]} for attr in SET_ATTRIBUTES}
+    candidates = index._candidates(terms, product["price_inr"], "p7")
+    assert 0 < len(candidates) < 20
+    assert all(index.products[pid]["key_ingredients"][0] == "Active 7" for pid, _ in index.neighbors_of("p7", k=3))
+
+
+def test_candidates_are_capped_when_terms_overlap_heavily():
+    vocab = [f"Active {j}" for j in range(12)]
+    index = CatalogIndex(price_band=100, candidate_limit=50)
+    for i in range(1000):
+        index.add(f"p{i}", _product(i, [vocab[i % 12], vocab[(i // 12) % 12], vocab[(i // 144) % 12]], 300 + (i % 40) * 10))
+    product = index.products["p5"]
+    terms = {attr: {v.lower() for v in product[attr]} for attr in SET_ATTRIBUTES}
+    candidates = index._candidates(terms, product["price_inr"], "p5")
+    assert len(candidates) == 50 and "p5" not in candidates
+    best = set(map(str.lower, product["key_ingredients"]))
+    assert all(set(map(str.lower, index.products[pid]["key_ingredients"])) == best for pid, _ in index.neighbors_of("p5", k=1))
+
+
+def test_set_diff_and_replacing_a_product():
+    a = _product("a", ["Vitamin C", "Ferulic Acid"], 700, benefits=("Brightening",))
+    b = _product("b", ["vitamin c", "Vitamin E"], 910, benefits=("Brightening", "Antioxidant"))
+    diff = set_diff(a, b)
+    assert diff["key_ingredients"]["shared"] == ["Vitamin C"]
+    assert diff["key_ingredients"]["only_a"] == ["Ferulic Acid"]
+    assert diff["key_ingredients"]["only_b"] == ["Vitamin E"]
+    assert diff["benefits"]["jaccard"] == 0.5
+    assert diff["price_inr"] == {"A": 700, "B": 910, "delta": 210, "pct": 30.0}
+
+    index = CatalogIndex()
+    index.add("a", a)
+    index.add("a", b)
+    assert len(index) == 1
+    assert index.neighbors(a, k=5) == [("a", index.neighbors(a, k=1)[0][1])]
@@ -0,0 +1,90 @@
+import json
+import pytest
+import llm_cache
+from stub_llm_server import StubLLMServer
+from benchmark import stub_environment, synthetic_products
+from checkpoints import open_checkpointer, thread_config, invoke_resumable
+from main import build_graph, initial_state, RAW_PRODUCT_DATA
+from validation_agent import FinalValidationAgent
+from batch import run_batch, resume_failed
+
+
+def fail_first_validation(monkeypatch):
+    original = FinalValidationAgent.run
+    failures = iter([RuntimeError("validator crashed")])
+
+    def flaky(self, *args, **kwargs):
+        for e in failures:
+            raise e
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(FinalValidationAgent, "run", flaky)
+
+
+def test_failed_product_resumes_without_new_llm_calls(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    fail_first_validation(monkeypatch)
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        app = build_graph(checkpointer=open_checkpointer(str(tmp_path / "checkpoints.sqlite")))
+        config = thread_config("run-1", "glowboost")
+        with pytest.raises(RuntimeError):
+            invoke_resumable(app, initial_state(RAW_PRODUCT_DATA), config)
+        calls = sum(server.calls.values())
+        assert calls > 0 and app.get_state(config).next == ("validate",)
+        final = invoke_resumable(app, initial_state(RAW_PRODUCT_DATA), config)
+        assert final["faq_page"]["product"] == RAW_PRODUCT_DATA["product_name"]
+        assert invoke_resumable(app, initial_state(RAW_PRODUCT_DATA), config) == final
+        assert sum(server.calls.values()) == calls
+
+
+def test_changed_input_starts_the_thread_fresh(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    fail_first_validation(monkeypatch)
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        app = build_graph(checkpointer=open_checkpointer(str(tmp_path / "checkpoints.sqlite")))
+        config = thread_config("run-1", "glowboost")
+        with pytest.raises(RuntimeError):
+            invoke_resumable(app, initial_state(RAW_PRODUCT_DATA), config)
+        calls = sum(server.calls.values())
+        changed = {**RAW_PRODUCT_DATA, "price_inr": 799}
+        final = invoke_resumable(app, initial_state(changed), config)
+        assert sum(server.calls.values()) > calls
+        assert final["product_page"]["product"]["price_inr"] == 799
+        assert invoke_resumable(app, initial_state(changed), config) == final
+
+
+def test_resume_failed_reruns_only_failed_products(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    monkeypatch.chdir(tmp_path)
+    catalog = tmp_path / "catalog.jsonl"
+    catalog.write_text("".join(json.dumps(p) + "\n" for p in synthetic_products(2)))
+    fail_first_validation(monkeypatch)
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        first = run_batch(str(catalog), out_dir=str(tmp_path / "out"), workers=1, checkpoint=True)
+        assert first["failed"] == 1 and first["run_id"]
+        failed = [r["product_id"] for r in first["products"] if r["status"] != "ok"]
+        calls = sum(server.calls.values())
+        second = resume_failed(str(tmp_path / "out" / "manifest.json"), workers=1)
+        assert sum(server.calls.values()) == calls
+    assert second["run_id"] == first["run_id"]
+    assert second["succeeded"] == 2 and second["failed"] == 0
+    assert (tmp_path / "out" / failed[0] / "faq.json").exists()
+
+
+def test_finished_thread_makes_no_prefetch_calls(monkeypatch, tmp_path):
+    import main
+    import local_llm
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "CHECKPOINT", True)
+    monkeypatch.setattr(main, "RUN_ID", "run-1")
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        prefetched = []
+        provider = local_llm.get_provider()
+        original = provider.prefetch
+        monkeypatch.setattr(provider, "prefetch", lambda prompt, temperature=0: (prefetched.append(prompt), original(prompt, temperature)))
+        first = main.run_pipeline(RAW_PRODUCT_DATA)
+        calls, fresh = sum(server.calls.values()), len(prefetched)
+        second = main.run_pipeline(RAW_PRODUCT_DATA)
+        assert sum(server.calls.values()) == calls and len(prefetched) == fresh
+    assert fresh > 0 and second["outputs"] == first["outputs"]
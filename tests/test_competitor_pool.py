@@ -0,0 +1,70 @@
+import json
+import pytest
+from agents import fictional_product_agent
+from prompts import suffix_of
+from agents.fictional_product_agent import FictionalProductAgent
+from competitor_pool import CompetitorPool, category_of
+from json_stream import extract_json
+from llm_provider import LocalLLM
+from main import RAW_PRODUCT_DATA
+
+
+class _Provider:
+    def __init__(self, replies=None):
+        self.prompts = []
+        self.replies = list(replies or [])
+
+    def chat_json(self, prompt, temperature=0):
+        self.prompts.append(prompt)
+        if self.replies:
+            return self.replies.pop(0)
+        return LocalLLM().invoke([{"content": prompt}]).content
+
+    def ensure_json(self, text):
+        try:
+            return json.loads(text)
+        except Exception:
+            return extract_json(text)
+
+
+def _product(**overrides):
+    return {**RAW_PRODUCT_DATA, "schema_version": "1.0", **overrides}
+
+
+def test_pool_reuses_close_competitors_and_fills_gaps_in_batches(tmp_path, monkeypatch):
+    llm = _Provider()
+    monkeypatch.setattr(fictional_product_agent, "get_provider", lambda: llm)
+    agent = FictionalProductAgent(pool=CompetitorPool(path=str(tmp_path / "pool.sqlite")), batch_size=3)
+
+    first = agent.run(_product())
+    assert len(llm.prompts) == 1 and suffix_of(llm.prompts[0]).startswith("Invent 3 realistic")
+    assert first["product_name"] != RAW_PRODUCT_DATA["product_name"]
+    assert len(agent.pool) == 3
+
+    sibling = agent.run(_product(product_name="GlowBoost Vitamin C Serum Lite", price_inr=749))
+    assert len(llm.prompts) == 1
+    assert sibling["product_name"].startswith("Rival")
+
+    cleanser = _product(product_name="Calm Cleanser", key_ingredients=["Oat"], benefits=["Soothing"], price_inr=399)
+    assert category_of(cleanser) == "cleanser"
+    assert agent.fill_gaps([_product(), cleanser, cleanser]) == 1
+    assert len(llm.prompts) == 2
+
+
+def test_generate_repairs_json_and_retries_with_the_error(monkeypatch):
+    rival = {**_product(), "product_name": "Rival Serum"}
+    llm = _Provider([
+        "Here you go: " + json.dumps(rival) + " Hope this helps!",
+        json.dumps({**rival, "price_inr": "unknown"}),
+        json.dumps(rival),
+    ])
+    monkeypatch.setattr(fictional_product_agent, "get_provider", lambda: llm)
+    agent = FictionalProductAgent(use_pool=False, retries=1)
+    assert agent.run(_product())["product_name"] == "Rival Serum"
+    assert agent.run(_product())["product_name"] == "Rival Serum"
+    assert len(llm.prompts) == 3
+    assert "previous reply was rejected" in llm.prompts[2]
+
+    llm.replies = ["not json", "still not json"]
+    with pytest.raises(ValueError, match="after 2 attempts"):
+        agent.run(_product())
@@ -1,6 +1,8 @@
+import json
 import pytest
 from src.main import run_pipeline
 from local_llm import is_local_llm_available
+from prompts import product_of, suffix_of
 
 
 def test_run_pipeline_produces_outputs(monkeypatch):
@@ -11,3 +13,102 @@ def test_run_pipeline_produces_outputs(monkeypatch):
     assert "faq" in outputs and outputs["faq"]["template"] == "faq"
     assert "product_page" in outputs and outputs["product_page"]["template"] == "product_page"
     assert "comparison_page" in outputs and outputs["comparison_page"]["template"] == "comparison_page"
+
+
+class _ScriptedLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def chat_json(self, prompt, temperature=0):
+        from llm_provider import LocalLLM
+        self.calls += 1
+        if suffix_of(prompt).startswith("Invent a realistic competitor"):
+            base = product_of(prompt)
+            return json.dumps({**base, "product_name": "Rival Serum", "price_inr": 799})
+        if suffix_of(prompt).startswith("Choose the most relevant"):
+            return json.dumps({"field": "product_name", "answer": "GlowBoost Vitamin C Serum"})
+        return LocalLLM().invoke([{"content": prompt}]).content
+
+    async def achat_json(self, prompt, temperature=0):
+        return self.chat_json(prompt, temperature)
+
+    def ensure_json(self, text):
+        return json.loads(text)
+
+
+def test_graph_merges_node_deltas(monkeypatch):
+    from agents import question_generation_agent, fictional_product_agent, page_assembly_agent
+    from src.main import build_graph, initial_state, RAW_PRODUCT_DATA
+    llm = _ScriptedLLM()
+    for module in (question_generation_agent, fictional_product_agent, page_assembly_agent):
+        monkeypatch.setattr(module, "get_provider", lambda: llm)
+    final = build_graph().invoke(initial_state(RAW_PRODUCT_DATA))
+    assert final["raw"] == RAW_PRODUCT_DATA
+    assert final["product_model"]["product_name"] == RAW_PRODUCT_DATA["product_name"]
+    assert len(final["faq_page"]["qa"]) == final["questions"]["count"]
+    assert final["comparison_page"]["product_b"] == "Rival Serum"
+    assert set(final["template_specs"]) == {"faq", "product_page", "comparison_page"}
+    assert final["documentation_md"].startswith("# Project Documentation")
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_competitor_node_validates_reused_competitors(monkeypatch, use_async):
+    import asyncio
+    from pydantic import ValidationError
+    from agents import question_generation_agent, page_assembly_agent
+    from agents.fictional_product_agent import FictionalProductAgent
+    from src.main import build_graph, initial_state, RAW_PRODUCT_DATA
+    llm = _ScriptedLLM()
+    for module in (question_generation_agent, page_assembly_agent):
+        monkeypatch.setattr(module, "get_provider", lambda: llm)
+    # A pooled competitor is returned as stored, without passing through generation's checks.
+    stale = {k: v for k, v in RAW_PRODUCT_DATA.items() if k != "price_inr"}
+    monkeypatch.setattr(FictionalProductAgent, "run", lambda self, base_schema: stale)
+    monkeypatch.setattr(FictionalProductAgent, "arun", lambda self, base_schema: asyncio.sleep(0, stale))
+    app = build_graph(use_async=use_async)
+    with pytest.raises(ValidationError):
+        if use_async:
+            asyncio.run(app.ainvoke(initial_state(RAW_PRODUCT_DATA)))
+        else:
+            app.invoke(initial_state(RAW_PRODUCT_DATA))
+
+
+def test_async_graph_matches_sync_graph(monkeypatch):
+    import asyncio
+    import llm_cache
+    from stub_llm_server import StubLLMServer
+    from benchmark import stub_environment
+    from src.main import build_graph, initial_state, RAW_PRODUCT_DATA
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        sync = build_graph().invoke(initial_state(RAW_PRODUCT_DATA))
+        calls = sum(server.calls.values())
+        final = asyncio.run(build_graph(use_async=True).ainvoke(initial_state(RAW_PRODUCT_DATA)))
+        assert sum(server.calls.values()) == 2 * calls
+    for key in ("questions", "product_b", "faq_page", "product_page", "comparison_page", "documentation_md"):
+        assert final[key] == sync[key]
+
+
+def test_streamed_questions_prefetch_faq_selection(monkeypatch):
+    import llm_cache
+    import local_llm
+    from src import main
+    from agents import question_generation_agent
+    from stub_llm_server import StubLLMServer
+    from benchmark import stub_environment
+    from src.main import build_graph, initial_state, RAW_PRODUCT_DATA
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        plain = build_graph().invoke(initial_state(RAW_PRODUCT_DATA))
+        calls = sum(server.calls.values())
+        monkeypatch.setattr(main, "LLM_STREAM", True)
+        monkeypatch.setattr(question_generation_agent, "LLM_STREAM", True)
+        provider = local_llm.get_provider()
+        prefetched = []
+        original = provider.prefetch
+        monkeypatch.setattr(provider, "prefetch", lambda prompt, temperature=0: (prefetched.append(prompt), original(prompt, temperature)))
+        streamed = build_graph().invoke(initial_state(RAW_PRODUCT_DATA))
+        assert sum(server.calls.values()) == 2 * calls
+    assert prefetched and all(suffix_of(p).startswith("Choose the most relevant") for p in prefetched)
+    assert not provider._prefetched
+    assert streamed["faq_page"] == plain["faq_page"]
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+from llm_provider import LocalEmbedder
+
+
+def test_embed_matrix_is_normalized_and_scores_match():
+    emb = LocalEmbedder()
+    matrix = emb.embed_matrix(["Price INR: 699", "Skin types: Oily, Combination", ""])
+    assert matrix.shape == (3, emb.dim)
+    assert np.allclose(np.linalg.norm(matrix[:2], axis=1), 1.0)
+    scores = emb.score("What is the price in INR?", matrix)
+    assert int(np.argmax(scores)) == 0
+    assert np.allclose(scores, np.asarray(emb.embed_documents(["Price INR: 699", "Skin types: Oily, Combination", ""])) @ np.asarray(emb.embed_query("What is the price in INR?")))
+
+
+def test_embeddings_are_stable_across_processes():
+    code = "from llm_provider import LocalEmbedder; print(LocalEmbedder().embed_matrix(['Vitamin C serum']).argmax())"
+    outs = set()
+    for seed in ("1", "2"):
+        env = {**os.environ, "PYTHONHASHSEED": seed, "PYTHONPATH": str(Path(__file__).resolve().parents[1] / "src")}
+        outs.add(subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout)
+    assert len(outs) == 1
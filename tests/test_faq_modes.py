@@ -0,0 +1,111 @@
+import json
+from agents import page_assembly_agent
+from agents.page_assembly_agent import PageAssemblyAgent
+from agents.content_logic_block_agent import ContentLogicBlockAgent
+from agents.template_engine_agent import TemplateEngineAgent
+from prompts import suffix_of
+
+PRODUCT = {
+    "product_name": "GlowBoost Vitamin C Serum",
+    "concentration": "10% Vitamin C",
+    "skin_type": ["Oily", "Combination"],
+    "key_ingredients": ["Vitamin C", "Hyaluronic Acid"],
+    "benefits": ["Brightening", "Fades dark spots"],
+    "how_to_use": "Apply 2–3 drops in the morning before sunscreen",
+    "side_effects": "Mild tingling for sensitive skin",
+    "price_inr": 699,
+}
+
+QUESTIONS = {"count": 2, "items": [
+    {"category": "Purchase", "question": "What is the price in INR?"},
+    {"category": "Informational", "question": "Which skin types is it suitable for?"},
+]}
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def chat_json(self, prompt):
+        self.prompts.append(prompt)
+        if suffix_of(prompt).startswith("Answer every question"):
+            return json.dumps({"answers": [
+                {"index": 0, "field": "price_inr", "answer": "699"},
+                {"index": 1, "field": "skin_type", "answer": "Oily, Combination"},
+            ]})
+        return prompt.split("Value: ", 1)[-1].strip()
+
+    def ensure_json(self, text):
+        return json.loads(text)
+
+
+def _agent(monkeypatch, mode):
+    llm = RecordingLLM()
+    monkeypatch.setattr(page_assembly_agent, "get_provider", lambda: llm)
+    agent = PageAssemblyAgent(
+        logic_blocks={"impl": ContentLogicBlockAgent().get_impl()},
+        templates=TemplateEngineAgent().run(),
+        faq_mode=mode,
+        fast_path=False,
+    )
+    return agent, llm
+
+
+def test_embedding_mode_selects_fields_locally(monkeypatch):
+    agent, llm = _agent(monkeypatch, "embedding")
+    page = agent.build_faq_page(PRODUCT, QUESTIONS)
+    assert [qa["source_field"] for qa in page["qa"]] == ["price_inr", "skin_type"]
+    assert page["qa"][0]["a"] == "699"
+    assert len(llm.prompts) == 2
+
+
+def test_batched_mode_uses_single_call(monkeypatch):
+    agent, llm = _agent(monkeypatch, "batched")
+    page = agent.build_faq_page(PRODUCT, QUESTIONS)
+    assert [qa["a"] for qa in page["qa"]] == ["699", "Oily, Combination"]
+    assert len(llm.prompts) == 1
+
+
+def test_async_faq_answers_concurrently_under_limit(monkeypatch):
+    import asyncio
+    agent, llm = _agent(monkeypatch, "llm")
+    agent.faq_concurrency = 2
+    inflight = {"now": 0, "max": 0}
+
+    async def achat_json(prompt):
+        inflight["now"] += 1
+        inflight["max"] = max(inflight["max"], inflight["now"])
+        await asyncio.sleep(0.01)
+        inflight["now"] -= 1
+        if suffix_of(prompt).startswith("Choose the most relevant"):
+            question = prompt.rsplit("Question: ", 1)[1]
+            field, value = ("price_inr", "699") if "price" in question else ("skin_type", "Oily, Combination")
+            return json.dumps({"field": field, "answer": value})
+        return llm.chat_json(prompt)
+
+    llm.achat_json = achat_json
+    questions = {"count": 6, "items": QUESTIONS["items"] * 3}
+    page = asyncio.run(agent.abuild_faq_page(PRODUCT, questions))
+    assert [qa["source_field"] for qa in page["qa"]] == ["price_inr", "skin_type"] * 3
+    assert page["qa"][0]["a"] == "699"
+    assert inflight["max"] == 2
+
+
+def test_grounding_check_keeps_short_correct_answers(monkeypatch):
+    agent, llm = _agent(monkeypatch, "batched")
+    monkeypatch.setattr(page_assembly_agent, "FAQ_GROUNDING_CHECK", True)
+    events = []
+    monkeypatch.setattr(page_assembly_agent, "log_event", events.append)
+    llm.chat_json = lambda prompt: json.dumps({"answers": [
+        {"index": 0, "field": "key_ingredients", "answer": "Yes."},
+        {"index": 1, "field": "key_ingredients", "answer": "There are two key ingredients."},
+    ]})
+    questions = {"count": 2, "items": [
+        {"category": "Ingredients", "question": "Does it contain Hyaluronic Acid?"},
+        {"category": "Ingredients", "question": "How many key ingredients does it have?"},
+    ]}
+    page = agent.build_faq_page(PRODUCT, questions)
+    assert [qa["a"] for qa in page["qa"]] == ["Yes.", "There are two key ingredients."]
+    grounding = [e for e in events if e["type"] == "faq_grounding"]
+    assert grounding and grounding[0]["checked"] == 2
+    assert all(low["source_field"] == "key_ingredients" for low in grounding[0]["low_score"])
@@ -0,0 +1,65 @@
+from agents.faq_rule_agent import FAQRuleAgent
+from agents.content_logic_block_agent import ContentLogicBlockAgent
+
+PRODUCT = {
+    "product_name": "GlowBoost Vitamin C Serum",
+    "concentration": "10% Vitamin C",
+    "skin_type": ["Oily", "Combination"],
+    "key_ingredients": ["Vitamin C", "Hyaluronic Acid"],
+    "benefits": ["Brightening", "Fades dark spots"],
+    "how_to_use": "Apply 2–3 drops in the morning before sunscreen",
+    "side_effects": "Mild tingling for sensitive skin",
+    "price_inr": 699,
+}
+
+
+def test_rules_answer_direct_field_questions():
+    rules = FAQRuleAgent(ContentLogicBlockAgent().get_impl())
+    index = rules.index(PRODUCT)
+
+    def ask(q):
+        return rules.answer(index, q)
+
+    assert ask("What is the price in INR?") == {"a": "699", "source_field": "price_inr"}
+    assert ask("Does it contain Hyaluronic Acid?")["source_field"] == "key_ingredients"
+    assert ask("Does it contain Hyaluronic Acid?")["a"].startswith("Yes.")
+    assert ask("How many key ingredients are listed?")["a"].startswith("2:")
+    assert ask("Which skin types is GlowBoost Vitamin C Serum suitable for?")["a"] == "Oily, Combination"
+    assert ask("Are there any noted side effects?")["source_field"] == "side_effects"
+    assert ask("Is the concentration explicitly 10% Vitamin C?") is None
+    assert ask("Is tingling expected for sensitive skin?") is None
+    assert ask("Does it contain Niacinamide?") is None
+
+
+def test_rules_defer_hedged_and_out_of_vocabulary_questions():
+    rules = FAQRuleAgent(ContentLogicBlockAgent().get_impl())
+    index = rules.index(PRODUCT)
+    for q in (
+        "Is it free of Vitamin C?",
+        "Is it unsuitable for oily skin?",
+        "Is it safe to use with Vitamin C serums?",
+        "Does it contain Retinol or Vitamin C?",
+        "Does it contain Vitamin C without fragrance?",
+        "Doesn't it contain Vitamin C?",
+        "What is the price in USD?",
+        "Are benefits focused on brightening and fading dark spots?",
+    ):
+        assert rules.answer(index, q) is None, q
+    assert rules.answer(index, "Does the product list include Vitamin C?")["source_field"] == "key_ingredients"
+    assert rules.answer(index, "Does GlowBoost Vitamin C Serum contain Vitamin C?")["a"].startswith("Yes.")
+
+
+def test_rules_defer_questions_with_qualifiers_or_second_entities():
+    rules = FAQRuleAgent(ContentLogicBlockAgent().get_impl())
+    index = rules.index(PRODUCT)
+    for q in (
+        "Which ingredient causes tingling?",
+        "How long does the concentration last after opening?",
+        "What are the benefits of Hyaluronic Acid?",
+        "What are the benefits of Vitamin C?",
+        "Are there side effects for pregnant women?",
+        "Is it oily?",
+        "How does the price compare to competitors?",
+        "How many ingredients cause irritation?",
+    ):
+        assert rules.answer(index, q) is None, q
@@ -0,0 +1,48 @@
+import json
+import incremental
+from llm_provider import LocalLLM
+from prompts import product_of, suffix_of
+from agents import question_generation_agent, fictional_product_agent, page_assembly_agent
+from main import build_graph, initial_state, RAW_PRODUCT_DATA
+
+
+class CountingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def chat_json(self, prompt, temperature=0):
+        self.prompts.append(prompt)
+        if suffix_of(prompt).startswith("Invent a realistic competitor"):
+            base = product_of(prompt)
+            return json.dumps({**base, "product_name": "Rival Serum"})
+        if suffix_of(prompt).startswith("Choose the most relevant"):
+            field = "price_inr" if "price" in prompt.rsplit("Question: ", 1)[1].lower() else "product_name"
+            return json.dumps({"field": field, "answer": ""})
+        return LocalLLM().invoke([{"content": prompt}]).content
+
+    def ensure_json(self, text):
+        return json.loads(text)
+
+
+def test_price_edit_only_recomputes_price_dependents(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, "INCREMENTAL_PATH", str(tmp_path / "memo.sqlite"))
+    monkeypatch.setattr(page_assembly_agent, "FAQ_FAST_PATH", False)
+    llm = CountingLLM()
+    for module in (question_generation_agent, fictional_product_agent, page_assembly_agent):
+        monkeypatch.setattr(module, "get_provider", lambda: llm)
+    events = []
+    monkeypatch.setattr(incremental, "log_event", events.append)
+    app = build_graph(incremental=True)
+
+    first = app.invoke(initial_state(RAW_PRODUCT_DATA))
+    assert len(llm.prompts) == 2 + 2 * first["questions"]["count"]
+
+    llm.prompts.clear()
+    second = app.invoke(initial_state({**RAW_PRODUCT_DATA, "price_inr": 749}))
+    price_entries = [qa for qa in second["faq_page"]["qa"] if qa["source_field"] == "price_inr"]
+    assert price_entries and len(llm.prompts) == 2 * len(price_entries)
+    assert not any(suffix_of(p).startswith(("Create at least 15", "Invent")) for p in llm.prompts)
+    assert second["product_page"]["blocks"]["price_inr"] == 749
+    assert second["comparison_page"]["comparison"]["price_inr"]["A"] == 749
+    assert {e["kind"] for e in events} == {"node", "faq"}
+    assert {e["name"] for e in events if e["kind"] == "node"} == {"questions", "competitor"}
@@ -0,0 +1,44 @@
+import json
+import pytest
+from json_stream import JSONStreamParser, extract_json
+from local_llm import LocalLLMProvider
+
+
+def test_parser_emits_items_before_object_closes():
+    body = 'Sure! {"count": 2, "items": [{"category": "Usage", "question": "How {x}?"}, {"category": "Safety", "question": "Any \\"side\\" effects?"}]} and more rambling {'
+    parser = JSONStreamParser()
+    seen = []
+    for i, ch in enumerate(body):
+        seen.extend(parser.feed(ch))
+        if len(seen) == 1 and not parser.done:
+            assert seen[0]["question"] == "How {x}?"
+        if parser.done:
+            break
+    assert [s["category"] for s in seen] == ["Usage", "Safety"]
+    assert parser.value["count"] == 2
+    assert json.loads(parser.json_text()) == parser.value
+
+
+def test_extract_json_ignores_surrounding_text():
+    assert extract_json('noise {"field": "price_inr", "answer": "699"} trailing }') == {"field": "price_inr", "answer": "699"}
+    assert JSONStreamParser().feed('{"items": [1, "a", [2]]}') == [1, "a", [2]]
+    with pytest.raises(ValueError):
+        extract_json('{"unterminated": ')
+
+
+def test_stream_json_stops_after_first_object(monkeypatch):
+    import llm_cache
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    provider = LocalLLMProvider(kind="openai-compatible", base="http://127.0.0.1:1", model="m")
+    pulled = []
+
+    def fake_stream(prompt, temperature=0):
+        for piece in ['{"items": [{"q": 1}', ', {"q": 2}]', '}', " extra", " tokens"]:
+            pulled.append(piece)
+            yield piece
+
+    monkeypatch.setattr(provider, "stream_text", fake_stream)
+    items = []
+    assert provider.stream_json("p", on_item=items.append) == {"items": [{"q": 1}, {"q": 2}]}
+    assert items == [{"q": 1}, {"q": 2}]
+    assert pulled[-1] == "}"
@@ -0,0 +1,32 @@
+import local_llm
+import llm_cache
+from llm_cache import LLMCache
+from local_llm import LocalLLMProvider
+
+
+def test_cache_tiers_ttl_and_eviction(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(path=path, memory_entries=1, max_entries=2, ttl_s=3600)
+    key = LLMCache.make_key("ollama", "m", "prompt", {"temperature": 0})
+    assert key != LLMCache.make_key("ollama", "m", "prompt", {"temperature": 0.7})
+    assert cache.get(key) is None
+    cache.put(key, "answer")
+    assert cache.get(key) == "answer"
+    assert LLMCache(path=path).get(key) == "answer"
+    for i in range(3):
+        cache.put(f"k{i}", str(i))
+    assert cache.evict() >= 1
+    assert cache.stats()["memory_hits"] == 1
+    assert LLMCache(path=path, ttl_s=-1).get(key) is None
+
+
+def test_deterministic_calls_skip_network(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "_CACHE", LLMCache(path=str(tmp_path / "cache.sqlite")))
+    monkeypatch.setattr(llm_cache, "_ENABLED", True)
+    provider = LocalLLMProvider(kind="ollama", base="http://127.0.0.1:11434", model="m")
+    calls = []
+    monkeypatch.setattr(provider, "_generate", lambda prompt, params: calls.append(params) or "out")
+    assert provider.chat_json("p") == "out"
+    assert provider.chat_json("p") == "out"
+    provider.chat_json("p", temperature=0.7)
+    assert calls == [{"temperature": 0}, {"temperature": 0.7}]
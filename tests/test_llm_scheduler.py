@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llm_scheduler import LLMScheduler, PRIORITY_BULK, PRIORITY_INTERACTIVE, priority_scope
+
+
+class SlowProvider:
+    kind = "ollama"
+    model = "m"
+
+    def __init__(self, gate=None):
+        self.prompts = []
+        self.active = 0
+        self.peak = 0
+        self.gate = gate
+        self.lock = threading.Lock()
+
+    def chat_json(self, prompt, temperature=0):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return prompt.upper()
+
+    def ensure_json(self, text):
+        return text
+
+
+def test_identical_inflight_requests_are_coalesced_and_capped():
+    provider = SlowProvider()
+    sched = LLMScheduler(provider, max_concurrency=2)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(sched.chat_json, ["same"] * 4 + ["a", "b", "c", "d"]))
+    assert results[:4] == ["SAME"] * 4
+    assert provider.prompts.count("same") == 1
+    assert provider.peak <= 2
+    assert sched.stats()["coalesced"] == 3
+    assert sched.ensure_json("x") == "x"
+
+
+def test_interactive_calls_jump_the_bulk_queue():
+    gate = threading.Event()
+    provider = SlowProvider(gate)
+    sched = LLMScheduler(provider, max_concurrency=1)
+    blocker = sched.submit("blocker")
+    while not provider.prompts:
+        time.sleep(0.001)
+    with priority_scope(PRIORITY_BULK):
+        bulk = [sched.submit(f"bulk-{i}") for i in range(3)]
+    urgent = sched.submit("urgent", priority=PRIORITY_INTERACTIVE)
+    assert sched.stats()["queue_depth"] == 4
+    gate.set()
+    for f in [blocker, urgent, *bulk]:
+        f.result(timeout=5)
+    assert provider.prompts[:2] == ["blocker", "urgent"]
+
+
+def test_concurrency_cap_applies_to_each_backend():
+    from backend_pool import BackendPool
+    active = {"http://fast": 0, "http://slow": 0}
+    peak = dict(active)
+    lock = threading.Lock()
+
+    def call(url):
+        with lock:
+            active[url] += 1
+            peak[url] = max(peak[url], active[url])
+        time.sleep(0.02)
+        with lock:
+            active[url] -= 1
+        return url
+
+    class PooledProvider(SlowProvider):
+        bases = ["http://fast", "http://slow"]
+
+        def __init__(self):
+            super().__init__()
+            self.pool = BackendPool(self.bases, health_check=lambda url: None, hedge_percentile=0)
+            # Without a per-backend cap every call would go to the backend with the lower latency estimate.
+            self.pool.backends[0].ewma_ms, self.pool.backends[1].ewma_ms = 1.0, 1000.0
+
+        def chat_json(self, prompt, temperature=0):
+            return self.pool.call(call)
+
+    provider = PooledProvider()
+    sched = LLMScheduler(provider, max_concurrency=2)
+    futures = [sched.submit(f"p{i}") for i in range(12)]
+    assert sorted({f.result(timeout=5) for f in futures}) == ["http://fast", "http://slow"]
+    assert peak["http://fast"] <= 2 and peak["http://slow"] <= 2
@@ -0,0 +1,115 @@
+import os
+import asyncio
+import time
+import local_llm
+from local_llm import LocalLLMProvider, get_provider, get_session
+
+
+def test_shared_provider_and_session(monkeypatch):
+    monkeypatch.setenv("LOCAL_LLM_KIND", "ollama")
+    monkeypatch.setenv("LOCAL_LLM_URL", "http://127.0.0.1:11434/")
+    monkeypatch.setenv("LOCAL_LLM_MODEL", "test")
+    monkeypatch.setattr(local_llm, "_PROVIDER", None)
+    assert get_provider() is get_provider()
+    assert get_provider().base == "http://127.0.0.1:11434"
+    assert get_session() is get_session()
+
+
+def test_explicit_base_wins_over_backend_list_in_environment(monkeypatch):
+    monkeypatch.setenv("LOCAL_LLM_URLS", "http://a:1,http://b:2")
+    provider = LocalLLMProvider(kind="ollama", base="http://127.0.0.1:9999", model="test")
+    assert provider.bases == ["http://127.0.0.1:9999"]
+    assert LocalLLMProvider(kind="ollama", model="test").bases == ["http://a:1", "http://b:2"]
+
+
+def test_stub_environment_hides_backend_list(monkeypatch):
+    from benchmark import stub_environment
+    from stub_llm_server import StubLLMServer
+    monkeypatch.setenv("LOCAL_LLM_URLS", "http://a:1,http://b:2")
+    monkeypatch.setattr(local_llm, "_PROVIDER", None)
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        assert get_provider().bases == [server.url]
+    assert os.environ["LOCAL_LLM_URLS"] == "http://a:1,http://b:2"
+
+
+def test_achat_json_bounds_concurrency(monkeypatch):
+    monkeypatch.setattr(local_llm, "LLM_MAX_CONCURRENCY", 2)
+    provider = LocalLLMProvider(kind="ollama", base="http://127.0.0.1:11434", model="test")
+    active, peak = [0], [0]
+
+    def fake_chat(prompt, temperature=0):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        active[0] -= 1
+        return prompt
+
+    monkeypatch.setattr(provider, "chat_json", fake_chat)
+
+    async def go():
+        return await asyncio.gather(*(provider.achat_json(str(i)) for i in range(6)))
+
+    assert asyncio.run(go()) == [str(i) for i in range(6)]
+    assert peak[0] <= 2
+
+
+def test_health_check_result_is_cached(monkeypatch, tmp_path):
+    from local_llm import check_available
+    provider = LocalLLMProvider(kind="ollama", base="http://127.0.0.1:11434", model="test")
+    pings = []
+    monkeypatch.setattr(provider, "ping", lambda: pings.append(1))
+    path = str(tmp_path / "health.json")
+    check_available(provider, ttl_s=60, path=path)
+    check_available(provider, ttl_s=60, path=path)
+    assert len(pings) == 1
+    check_available(provider, ttl_s=0, path=path)
+    assert len(pings) == 2
+
+
+def test_prefetched_call_is_reused(monkeypatch):
+    import llm_cache
+    from stub_llm_server import StubLLMServer
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    with StubLLMServer(latency_ms=20) as server:
+        provider = LocalLLMProvider(kind="ollama", base=server.url, model="stub")
+        prompt = "Answer the user's question using only the provided field and value.\nValue: 699\n"
+        provider.prefetch(prompt)
+        provider.prefetch(prompt)
+        assert provider.chat_json(prompt) == "699"
+        assert server.calls["ollama"] == 1
+        assert provider.chat_json(prompt) == "699"
+        assert server.calls["ollama"] == 2
+
+
+def test_unclaimed_prefetches_give_way_to_new_ones(monkeypatch):
+    import llm_cache
+    from stub_llm_server import StubLLMServer
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    with StubLLMServer() as server:
+        provider = LocalLLMProvider(kind="ollama", base=server.url, model="stub")
+        monkeypatch.setattr(provider, "PREFETCH_LIMIT", 2)
+        prompts = [f"Answer the user's question using only the provided field and value.\nValue: {v}\n" for v in (1, 2, 3)]
+        for prompt in prompts:
+            provider.prefetch(prompt)
+        assert len(provider._prefetched) == 2
+        assert provider.chat_json(prompts[2]) == "3"
+        assert provider.chat_json(prompts[1]) == "2"
+        deadline = time.time() + 5
+        while server.calls["ollama"] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert server.calls["ollama"] == 3
+        provider.chat_json(prompts[0])
+        assert server.calls["ollama"] == 4
+
+
+def test_stream_json_early_close_counts_as_success(monkeypatch):
+    import llm_cache
+    from stub_llm_server import StubLLMServer
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    with StubLLMServer() as a, StubLLMServer() as b:
+        provider = LocalLLMProvider(kind="ollama", model="stub", bases=[a.url, b.url])
+        for _ in range(4):
+            data = provider.stream_json("Create at least 15 questions.\nProduct data: {\"product_name\": \"Serum\"}")
+            assert data["count"] >= 15
+        backends = provider.pool.stats()["backends"]
+    assert all(x["healthy"] and x["failures"] == 0 and x["inflight"] == 0 for x in backends)
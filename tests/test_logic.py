@@ -1,4 +1,6 @@
-from agents.content_logic_block_agent import ContentLogicBlockAgent
+import pytest
+from agents.content_logic_block_agent import ContentLogicBlockAgent, BLOCK_INPUTS
+from main import RAW_PRODUCT_DATA
 
 
 def test_logic_block_ids_nonempty():
@@ -6,3 +8,31 @@ def test_logic_block_ids_nonempty():
     ids = agent.block_ids()
     assert "ingredient_summary" in ids
     assert "extract_benefits" in ids
+
+
+def test_registry_is_built_once():
+    agent = ContentLogicBlockAgent()
+    assert agent.get_impl() is agent.get_impl()
+    with pytest.raises(TypeError):
+        agent.get_impl()["price_context"] = None
+    assert BLOCK_INPUTS["price_context"] == ("price_inr",)
+
+
+def test_batch_matches_per_product_blocks():
+    agent = ContentLogicBlockAgent()
+    impl = agent.get_impl()
+    a = [dict(RAW_PRODUCT_DATA, price_inr=p) for p in (699, 799, 899)]
+    b = [dict(RAW_PRODUCT_DATA, product_name="Rival", price_inr=p) for p in (699, 999, 899)]
+
+    prices = agent.run_batch("price_context", a)
+    assert prices["price_inr"].tolist() == [impl["price_context"](p)["price_inr"] for p in a]
+
+    columnar = {k: [p[k] for p in a] for k in a[0]}
+    cmp = agent.run_batch("comparison_logic", columnar, b)["comparison"]
+    for i in range(3):
+        row = impl["comparison_logic"](a[i], b[i])["comparison"]
+        for key, diff in row.items():
+            assert bool(cmp[key]["equal"][i]) == diff["equal"]
+
+    benefits = agent.run_batch("extract_benefits", a)
+    assert benefits["benefits"] == [list(p["benefits"]) for p in a]
@@ -0,0 +1,134 @@
+import json
+import os
+import signal
+import threading
+import pytest
+import observability
+from observability import BufferedLogWriter, LatencyHistogram, agent_span, metrics_snapshot, reset_metrics
+
+
+def test_buffered_writer_is_bounded_and_flushes(tmp_path):
+    path = tmp_path / "run.jsonl"
+    writer = BufferedLogWriter(str(path), max_lines=4, flush_interval_s=60)
+    for i in range(6):
+        writer.write(json.dumps({"i": i}))
+    writer.flush()
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e.get("i") for e in events[:4]] == [2, 3, 4, 5]
+    assert events[-1] == {"type": "log_dropped", "ts": events[-1]["ts"], "count": 2}
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_buffered_writer_after_fork_drops_parent_lines_and_locks(tmp_path):
+    path = tmp_path / "run.jsonl"
+    writer = BufferedLogWriter(str(path), flush_interval_s=60)
+    writer.write(json.dumps({"from": "parent"}))
+    # Another thread holding the lock at fork time would leave it locked forever in the child.
+    writer._lock.acquire()
+    pid = os.fork()
+    if pid == 0:
+        signal.alarm(5)
+        writer.write(json.dumps({"from": "child"}))
+        writer.flush()
+        os._exit(0)
+    writer._lock.release()
+    _, status = os.waitpid(pid, 0)
+    writer.flush()
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+    assert sorted(json.loads(line)["from"] for line in path.read_text().splitlines()) == ["child", "parent"]
+
+
+def test_histogram_percentiles():
+    hist = LatencyHistogram(sample_size=1000)
+    for ms in range(1, 101):
+        hist.record(float(ms))
+    snap = hist.snapshot()
+    assert snap["count"] == 100
+    assert snap["p50_ms"] == 51.0 and snap["p95_ms"] == 96.0 and snap["p99_ms"] == 100.0
+
+
+def test_agent_span_records_latency(monkeypatch):
+    monkeypatch.setattr(observability, "LOG_BUFFERED", True)
+    monkeypatch.setattr(observability, "_WRITER", BufferedLogWriter("/dev/null"))
+    reset_metrics()
+    with agent_span("Node"):
+        pass
+    with pytest.raises(ValueError):
+        with agent_span("Node"):
+            raise ValueError("boom")
+    snap = metrics_snapshot()
+    assert snap["Node"]["count"] == 1 and snap["Node.error"]["count"] == 1
+
+
+def test_profiled_span_splits_network_wait_and_writes_profiles(monkeypatch, tmp_path):
+    import time
+    import pstats
+    import profiling
+    from contextlib import nullcontext
+    monkeypatch.setattr(profiling, "PROFILE_MODES", {"cpu", "alloc", "stacks"})
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    sampler = profiling.StackSampler(0.001)
+    monkeypatch.setattr(profiling, "_SAMPLER", sampler)
+    events = []
+
+    def busy(ms):
+        end = time.thread_time() + ms / 1000
+        while time.thread_time() < end:
+            pass
+
+    plain = lambda name, extra: nullcontext()
+    with profiling.profiled_span("Node", None, plain, events.append):
+        with profiling.profiled_span("Inner", None, plain, events.append):
+            with profiling.io_wait():
+                time.sleep(0.05)
+            blob = [bytearray(1024) for _ in range(200)]
+            busy(50)
+    inner, outer = events
+    assert inner["name"] == "Inner" and "cpu_profile" not in inner and inner["io_wait_ms"] >= 50
+    assert outer["io_wait_ms"] >= 50 and outer["cpu_ms"] >= 50
+    assert outer["wall_ms"] >= outer["io_wait_ms"] + outer["cpu_ms"] - 5
+    assert "busy" in str(pstats.Stats(outer["cpu_profile"]).stats)
+    assert any(a["size_kb"] >= 100 for a in outer["top_allocations"]) and blob
+    sampler.write(tmp_path / "stacks.folded")
+    lines = (tmp_path / "stacks.folded").read_text().splitlines()
+    assert any(line.startswith("Node;Inner;") and ":busy " in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_concurrent_profiled_spans_share_one_cpu_profiler(monkeypatch, tmp_path):
+    import profiling
+    from contextlib import nullcontext
+    monkeypatch.setattr(profiling, "PROFILE_MODES", {"cpu"})
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_SAMPLER", None)
+    events, errors = [], []
+    both_inside = threading.Barrier(2)
+
+    def node(name):
+        try:
+            with profiling.profiled_span(name, None, lambda n, e: nullcontext(), events.append):
+                both_inside.wait(timeout=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=node, args=(f"Node{i}",)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert sorted("cpu_profile" in e for e in events) == [False, True]
+    assert sum(e.get("cpu_profile_skipped", False) for e in events) == 1
+
+
+def test_merged_histograms_keep_counts_and_a_bounded_reservoir():
+    a, b = LatencyHistogram(sample_size=10), LatencyHistogram(sample_size=10)
+    for ms in range(1, 31):
+        a.record(ms)
+    for ms in range(100, 110):
+        b.record(ms)
+    a.merge(b)
+    snap = a.snapshot()
+    assert snap["count"] == 40 and snap["max_ms"] == 109.0
+    assert snap["mean_ms"] == round((sum(range(1, 31)) + sum(range(100, 110))) / 40, 3)
+    assert len(a.samples) == 10 and sum(ms >= 100 for ms in a.samples) == 2
@@ -0,0 +1,29 @@
+from output_sink import ShardedJSONLSink, write_if_changed
+
+
+def test_write_if_changed_skips_identical_content(tmp_path):
+    path = tmp_path / "page.json"
+    assert write_if_changed(path, '{"a": 1}')
+    mtime = path.stat().st_mtime_ns
+    assert not write_if_changed(path, '{"a": 1}')
+    assert path.stat().st_mtime_ns == mtime
+    assert write_if_changed(path, '{"a": 2}')
+    assert path.read_text() == '{"a": 2}'
+    assert [p.name for p in tmp_path.iterdir()] == ["page.json"]
+
+
+def test_sharded_sink_indexes_and_skips_unchanged(tmp_path):
+    for compress in (False, True):
+        root = tmp_path / ("gz" if compress else "plain")
+        with ShardedJSONLSink(root, shards=4, compress=compress) as sink:
+            for i in range(20):
+                assert sink.write(f"p{i}", {"faq": {"n": i}, "documentation": "é"})
+            assert not sink.write("p3", {"faq": {"n": 3}, "documentation": "é"})
+            assert sink.write("p3", {"faq": {"n": 33}, "documentation": "é"})
+            assert sink.get("p7") == {"faq": {"n": 7}, "documentation": "é"}
+        reopened = ShardedJSONLSink(root, shards=4, compress=compress)
+        assert len(reopened) == 20
+        assert reopened.get("p3")["faq"] == {"n": 33}
+        assert not reopened.write("p5", {"faq": {"n": 5}, "documentation": "é"})
+        assert reopened.get("missing") is None
+        reopened.close()
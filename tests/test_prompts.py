@@ -0,0 +1,61 @@
+import pytest
+import llm_cache
+import local_llm
+from local_llm import LocalLLMProvider
+from stub_llm_server import StubLLMServer
+from main import RAW_PRODUCT_DATA
+from prompts import (
+    product_prefix, product_of, suffix_of, questions_prompt, competitor_prompt,
+    select_field_prompt, answer_prompt, batched_answer_prompt,
+)
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_prompts_share_the_product_prefix(monkeypatch, cache):
+    import prompts
+    monkeypatch.setattr(prompts, "LLM_PROMPT_CACHE", cache)
+    prefix = product_prefix(RAW_PRODUCT_DATA)
+    prompts = [
+        questions_prompt(RAW_PRODUCT_DATA),
+        competitor_prompt(RAW_PRODUCT_DATA, 3, rejected="missing price_inr"),
+        select_field_prompt(RAW_PRODUCT_DATA, "What is the price?"),
+        batched_answer_prompt(RAW_PRODUCT_DATA, ["What is the price?"]),
+    ]
+    for prompt in prompts:
+        assert prompt.startswith(prefix)
+        assert product_of(prompt) == RAW_PRODUCT_DATA
+        assert prefix + suffix_of(prompt) == prompt
+        assert "never invent facts" in prompt and "strict JSON only, without explanations" in prompt
+    assert suffix_of(prompts[1]).startswith("Invent 3 realistic")
+
+
+def test_answer_prompt_carries_the_prefix_only_with_prompt_cache(monkeypatch):
+    import prompts
+    monkeypatch.setattr(prompts, "LLM_PROMPT_CACHE", False)
+    minimal = answer_prompt(RAW_PRODUCT_DATA, "What is the price?", "price_inr", "699")
+    assert minimal.startswith("Answer the user's question") and "Product data" not in minimal
+    monkeypatch.setattr(prompts, "LLM_PROMPT_CACHE", True)
+    shared = answer_prompt(RAW_PRODUCT_DATA, "What is the price?", "price_inr", "699")
+    assert shared == product_prefix(RAW_PRODUCT_DATA) + minimal
+    assert "Do not invent facts" in minimal
+
+
+@pytest.mark.parametrize("kind", ["ollama", "openai-compatible"])
+@pytest.mark.parametrize("cache", [True, False])
+def test_backend_reuses_prefix_only_when_asked(monkeypatch, kind, cache):
+    monkeypatch.setattr(llm_cache, "_ENABLED", False)
+    monkeypatch.setattr(local_llm, "LLM_PROMPT_CACHE", cache)
+    with StubLLMServer() as server:
+        provider = LocalLLMProvider(kind=kind, base=server.url, model="stub")
+        first = select_field_prompt(RAW_PRODUCT_DATA, "What is the price?")
+        second = select_field_prompt(RAW_PRODUCT_DATA, "Which skin types is it for?")
+        provider.chat_json(first)
+        evaluated = provider.usage_stats()["prompt_tokens_evaluated"]
+        provider.chat_json(second)
+        usage = provider.usage_stats()
+    assert usage["calls"] == 2
+    second_cost = usage["prompt_tokens_evaluated"] - evaluated
+    if cache:
+        assert server.prompt_tokens_cached > 0 and second_cost < evaluated / 3
+    else:
+        assert server.prompt_tokens_cached == 0 and second_cost > evaluated / 2
@@ -0,0 +1,50 @@
+import io
+import json
+import pytest
+from stub_llm_server import StubLLMServer
+from benchmark import stub_environment, synthetic_products
+from service import PipelineService, ServiceBusy, serve_jsonl
+
+
+def test_jsonl_service_micro_batches_and_reports_latency():
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        service = PipelineService(batch_size=4, batch_wait_ms=50, workers=1).start()
+        lines = "".join(json.dumps({"id": f"p{i}", "product": p}) + "\n" for i, p in enumerate(synthetic_products(4)))
+        out = io.StringIO()
+        stats = serve_jsonl(service, io.StringIO(lines + "not json\n"), out)
+    results = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert {results[f"p{i}"]["status"] for i in range(4)} == {"ok"}
+    assert results["line-5"]["status"] == "error"
+    assert results["p0"]["pages"]["faq"]["template"] == "faq"
+    assert stats["completed"] == 4 and stats["batches"] < 4
+    assert stats["latency"]["service.request"]["count"] >= 4
+
+
+def test_full_queue_rejects_new_requests():
+    service = PipelineService(app=object(), queue_size=2, workers=1)
+    service.submit({})
+    service.submit({})
+    with pytest.raises(ServiceBusy):
+        service.submit({})
+    assert service.stats()["rejected"] == 1
+
+
+class _FlakyApp:
+    def __init__(self):
+        self.calls = 0
+
+    def batch(self, states, config=None, return_exceptions=False):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("batch exploded")
+        return [ValueError("node failed") for _ in states]
+
+
+def test_dispatcher_survives_a_failing_batch():
+    with StubLLMServer() as server, stub_environment(server, "ollama"):
+        service = PipelineService(app=_FlakyApp(), batch_size=1, batch_wait_ms=0, workers=1).start()
+        first = service.submit(synthetic_products(1)[0], request_id="a").result(timeout=5)
+        second = service.submit(synthetic_products(1)[0], request_id="b").result(timeout=5)
+    assert first == {"id": "a", "batch_size": 1, "status": "error", "error": "RuntimeError: batch exploded"}
+    assert second["status"] == "error" and second["error"] == "ValueError: node failed"
+    assert service.stats()["failed"] == 2
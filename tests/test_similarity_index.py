@@ -0,0 +1,69 @@
+import json
+import pytest
+from llm_provider import LocalLLM
+from similarity_index import SimilarityIndex, dedupe, question_embedder
+from agents import question_generation_agent, page_assembly_agent
+from agents.question_generation_agent import QuestionGenerationAgent
+from agents.page_assembly_agent import PageAssemblyAgent
+from agents.content_logic_block_agent import ContentLogicBlockAgent
+from agents.template_engine_agent import TemplateEngineAgent
+from main import RAW_PRODUCT_DATA
+
+
+@pytest.mark.parametrize("backend", ["numpy", "hnsw"])
+def test_index_returns_most_similar_first(backend):
+    if backend == "hnsw":
+        pytest.importorskip("hnswlib")
+    index = SimilarityIndex(backend=backend)
+    index.add(["vitamin c serum for dull skin", "oil free gel moisturizer", "mineral sunscreen spf 50"])
+    index.add(["retinol night cream"])
+    hits = index.search("sunscreen with spf", k=2)
+    assert hits[0][0] == 2 and hits[0][1] > hits[1][1]
+    assert len(index.search("anything", k=10)) == 4
+
+
+def test_dedupe_keeps_first_and_respects_minimum():
+    texts = ["What is the price in INR?", "What's the price in INR?", "How should I apply it?", "What is the price, in INR?"]
+    assert dedupe(texts, 0.85, embedder=question_embedder()) == [0, 2]
+    assert dedupe(texts, 0.85, min_keep=3, embedder=question_embedder()) == [0, 1, 2]
+
+
+class _Provider:
+    def __init__(self, reply=None):
+        self.reply = reply
+
+    def chat_json(self, prompt, temperature=0):
+        if self.reply is not None:
+            return self.reply
+        return LocalLLM().invoke([{"content": prompt}]).content
+
+    def ensure_json(self, text):
+        return json.loads(text)
+
+
+def test_question_agent_drops_near_duplicates(monkeypatch):
+    base = json.loads(_Provider().chat_json("Create at least 15\nProduct data: " + json.dumps(RAW_PRODUCT_DATA)))["items"]
+    items = base + [{"category": "Purchase", "question": "What's the price in INR?"}]
+    monkeypatch.setattr(question_generation_agent, "get_provider", lambda: _Provider(json.dumps({"count": len(items), "items": items})))
+    qs = QuestionGenerationAgent().run(RAW_PRODUCT_DATA)
+    assert qs["count"] == len(base)
+    assert "What's the price in INR?" not in [q["question"] for q in qs["items"]]
+
+
+def test_ungrounded_answers_are_logged_not_rewritten(monkeypatch):
+    monkeypatch.setattr(page_assembly_agent, "get_provider", lambda: _Provider("It is wonderful and everyone loves it."))
+    monkeypatch.setattr(page_assembly_agent, "FAQ_GROUNDING_CHECK", True)
+    events = []
+    monkeypatch.setattr(page_assembly_agent, "log_event", events.append)
+    agent = PageAssemblyAgent(
+        logic_blocks={"impl": ContentLogicBlockAgent().get_impl()},
+        templates=TemplateEngineAgent().run(),
+        faq_mode="embedding",
+        fast_path=False,
+    )
+    questions = {"count": 1, "items": [{"category": "Safety", "question": "Are there any side effects?"}]}
+    (entry,) = agent.build_faq_page(RAW_PRODUCT_DATA, questions)["qa"]
+    assert entry["source_field"] == "side_effects"
+    assert entry["a"] == "It is wonderful and everyone loves it."
+    (grounding,) = [e for e in events if e["type"] == "faq_grounding"]
+    assert [low["q"] for low in grounding["low_score"]] == ["Are there any side effects?"]
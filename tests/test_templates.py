@@ -8,3 +8,28 @@ def test_template_specs_required_fields():
     assert "required_fields" in faq
     assert "logic_dependencies" in faq
     assert "format_rules" in faq
+
+
+def test_enforce_uses_compiled_validator():
+    import pytest
+    from agents.template_engine_agent import compile_template
+    agent = TemplateEngineAgent()
+    registry = agent.run()
+    ids = ["comparison_logic"]
+    agent.enforce(registry, "comparison_page", {"product_a": {"product_name": "A"}, "product_b": {"product_name": "B"}}, ids)
+    agent.enforce(registry, "comparison_page", {"product_a": {"product_name": "A"}, "product_b": {"product_name": "B"}}, ids)
+    assert compile_template.cache_info().hits >= 1
+    with pytest.raises(ValueError, match="product_b.product_name"):
+        agent.enforce(registry, "comparison_page", {"product_a": {"product_name": "A"}, "product_b": {}}, ids)
+    with pytest.raises(ValueError, match="logic dependency"):
+        agent.enforce(registry, "comparison_page", {"product_a": {"product_name": "A"}, "product_b": {"product_name": "B"}}, [])
+
+
+def test_validate_batch_reports_each_bad_item():
+    from main import RAW_PRODUCT_DATA
+    from validation_agent import validate_batch
+    good = dict(RAW_PRODUCT_DATA)
+    bad = dict(RAW_PRODUCT_DATA, price_inr="cheap")
+    errors = validate_batch("product_model", [good, bad, good])
+    assert errors[0] is None and errors[2] is None
+    assert errors[1].startswith("price_inr")